@@ -7,21 +7,175 @@
 
 # This is a simple example for a custom action which utters "Hello World!"
 
-from typing import Any, Text, Dict, List
+from abc import ABC, abstractmethod
+from typing import Any, Text, Dict, List, Optional, Tuple
 from rasa_sdk import Action, Tracker, FormValidationAction
 from rasa_sdk.executor import CollectingDispatcher
-from rasa_sdk.events import SlotSet, FollowupAction
-import requests
+from rasa_sdk.events import SlotSet
 import json
+import re
+from .backend import BackendUnavailable, backend, fan_out, turn_key
+from .reports import CONTINUATION_SLOT, REPORT_PAGE_ROWS, render_page
 from datetime import datetime, date, timedelta
+from dateutil import parser as date_parser
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Backend API configuration
-BACKEND_BASE_URL = "http://localhost:8000"
+# Backend access (HTTP or in-process) is configured in actions/backend.py
+
+def format_leave_dates(leave: Dict[Text, Any]) -> Text:
+    start = leave.get("start_date", "N/A")
+    end = leave.get("end_date")
+    return f"{start} → {end}" if end and end != start else start
+
+# Keyword tables used to fill form slots from free text: (words, slot value)
+TIMESHEET_SUMMARIES = [
+    (("coding", "programming"), "Coding and development work"),
+    (("meeting",), "Meetings and discussions"),
+    (("documentation",), "Documentation work"),
+    (("project",), "Project work"),
+]
+LEAVE_TYPES = [
+    (("sick",), "Sick Leave"),
+    (("vacation", "holiday"), "Vacation"),
+    (("personal",), "Personal Leave"),
+    (("medical",), "Medical Leave"),
+    (("maternity",), "Maternity Leave"),
+]
+LEAVE_REASONS = [
+    (("illness", "sick"), "Illness"),
+    (("family",), "Family emergency"),
+    (("personal",), "Personal reasons"),
+    (("vacation",), "Vacation"),
+]
+RECIPIENTS = [
+    (("manager",), "manager@company.com"),
+    (("team",), "team@company.com"),
+    (("client",), "client@company.com"),
+]
+PRIORITIES = [
+    (("high", "urgent", "important"), "High"),
+    (("low", "minor"), "Low"),
+]
+RELATIVE_DAYS = {"today": 0, "yesterday": -1, "tomorrow": 1, "next week": 7}
+TIME_PATTERN = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm)?\b")
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+
+def infer(text: Text, keywords: List[Tuple[Tuple[Text, ...], Text]]) -> Optional[Text]:
+    return next((value for words, value in keywords if any(word in text for word in words)), None)
+
+def parse_date(text: Text, fuzzy: bool = False) -> Optional[Text]:
+    """ISO date from "today", "tomorrow", "2025-07-28", ... (any date format when fuzzy)."""
+    for word, days in RELATIVE_DAYS.items():
+        if word in text:
+            return str(date.today() + timedelta(days=days))
+    try:
+        match = re.search(r"\d{4}-\d{2}-\d{2}", text)
+        if match:
+            return date.fromisoformat(match.group()).isoformat()
+        if fuzzy:
+            return date_parser.parse(text, fuzzy=True).date().isoformat()
+    except (ValueError, OverflowError):
+        pass
+    return None
+
+RANGE_SEPARATOR = re.compile(r"\b(?:to|until|till|through)\b|\s[-–]\s")
+SAME_DAY_WORDS = ("same", "one day", "that day")
+
+def parse_date_range(text: Text, fuzzy: bool = False) -> Tuple[Optional[Text], Optional[Text]]:
+    """Start and end ISO dates from "2025-08-04 to 2025-08-08", "tomorrow until next week", ...
+
+    A single date is the start; the end is then None.
+    """
+    parts = RANGE_SEPARATOR.split(text, maxsplit=1)
+    if len(parts) == 2:
+        start, end = parse_date(parts[0], fuzzy), parse_date(parts[1], fuzzy)
+        if start and end:
+            return start, end
+    return parse_date(text, fuzzy), None
+
+def parse_times(text: Text) -> List[Text]:
+    """All times in the text as HH:MM, e.g. "9am to 5:30pm" -> ["09:00", "17:30"]."""
+    text = text.strip()
+    if text.isdigit():
+        text += ":00"  # a bare "9" answering "what time?"
+    times = []
+    for match in TIME_PATTERN.finditer(text):
+        hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+        if match.group(2) is None and meridiem is None:
+            continue  # a plain number, e.g. part of a date
+        if meridiem == "pm" and hour < 12:
+            hour += 12
+        elif meridiem == "am" and hour == 12:
+            hour = 0
+        if hour < 24 and minute < 60:
+            times.append(f"{hour:02d}:{minute:02d}")
+    return times
+
+def text_after(text: Text, keywords: Tuple[Text, ...]) -> Optional[Text]:
+    for keyword in keywords:
+        if keyword in text:
+            rest = text.split(keyword, 1)[1].strip()
+            if rest:
+                return rest
+    return None
+
+def slow_down_message(response) -> Text:
+    """Reply for a write the backend's rate limiter turned away (429)."""
+    retry_after = response.headers.get("retry-after")
+    wait = f"in {retry_after} seconds" if retry_after else "in a moment"
+    return f"⏳ You're sending requests too quickly, so nothing was saved. Please try again {wait}."
+
+class SubmittingFormValidationAction(FormValidationAction):
+    """Validation action of a form that also submits it.
+
+    Rasa calls validate_<form> once per user turn while the form is active.
+    Each call fills what it can from the latest message (extract_<slot>),
+    normalizes every slot filled in this turn (validate_<slot>) and, once
+    all required slots are set, creates the entity right away by running
+    the create action in-process. Completing a form therefore needs no
+    further webhook call or policy prediction.
+
+    After submitting it empties the form's slots and requested_slot, which
+    also ends the form. Otherwise the next activation would find the old
+    values and submit them again, and forms sharing a slot (date) would
+    fill each other.
+    """
+
+    # Action whose run() creates the entity from the filled slots
+    submit_action = None
+    # Slots the form fills besides its required slots
+    extra_slots: Tuple[Text, ...] = ()
+
+    # Abstract so rasa_sdk does not register this base class as an action
+    @abstractmethod
+    def name(self) -> Text:
+        """Name of the validation action, validate_<form_name>."""
+
+    def infer_slot(self, tracker: Tracker, slot: Text, parse) -> Dict[Text, Any]:
+        """Fill an empty slot from the latest message.
+
+        The slot being asked for is left alone: it gets the whole answer
+        through its from_text mapping and is normalized by validate_<slot>.
+        """
+        if tracker.get_slot(slot) is not None or tracker.get_slot("requested_slot") == slot:
+            return {}
+        value = parse(tracker.latest_message.get("text", "").lower())
+        return {slot: value} if value else {}
+
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+        events = await super().run(dispatcher, tracker, domain)
+        required = await self.required_slots(self.domain_slots(domain), dispatcher, tracker, domain)
+        # super().run() applied this turn's slot events to the tracker
+        if all(tracker.get_slot(slot) is not None for slot in required):
+            events.extend(self.submit_action().run(dispatcher, tracker, domain))
+            events.extend(SlotSet(slot, None) for slot in (*required, *self.extra_slots, "requested_slot"))
+        return events
 
 # Admin actions for comprehensive data access
 class ActionGetAllData(Action):
@@ -33,12 +187,12 @@ class ActionGetAllData(Action):
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         try:
-            # Get all data from different endpoints
-            timesheets_response = requests.get(f"{BACKEND_BASE_URL}/timesheets/")
-            leaves_response = requests.get(f"{BACKEND_BASE_URL}/leaves/")
-            emails_response = requests.get(f"{BACKEND_BASE_URL}/emails/")
-            tasks_response = requests.get(f"{BACKEND_BASE_URL}/tasks/")
-            jobs_response = requests.get(f"{BACKEND_BASE_URL}/jobs/")
+            client = backend.acting_for(tracker)
+            # Get all data from different endpoints, concurrently
+            timesheets_response, leaves_response, emails_response, tasks_response, jobs_response = fan_out(
+                client.list_timesheets, client.list_leaves, client.list_emails,
+                client.list_tasks, client.list_jobs,
+            )
             
             message = "📊 **ADMIN DASHBOARD - ALL DATA**\n\n"
             
@@ -98,13 +252,11 @@ class ActionApproveTimesheet(Action):
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         try:
+            client = backend.acting_for(tracker)
             timesheet_id = tracker.get_slot("timesheet_id") or "1"
             approver = tracker.get_slot("approver") or "admin"
             
-            response = requests.post(
-                f"{BACKEND_BASE_URL}/timesheets/{timesheet_id}/approve",
-                params={"approver": approver}
-            )
+            response = client.approve_timesheet(timesheet_id, approver)
             
             if response.status_code == 200:
                 result = response.json()
@@ -119,191 +271,136 @@ class ActionApproveTimesheet(Action):
         
         return []
 
-class ActionGetDetailedTimesheets(Action):
-    def name(self) -> Text:
-        return "action_get_detailed_timesheets"
+class DetailedReportAction(Action, ABC):
+    """One page of a detailed admin report; "show more" continues it (actions/reports.py)."""
+
+    kind: Text
+    title: Text
+    subject: Text
+    empty_message: Text
 
     def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
-        
+        return self.show_page(dispatcher, tracker)
+
+    def show_page(self, dispatcher: CollectingDispatcher, tracker: Tracker,
+                  cursor: Optional[Text] = None) -> List[Dict[Text, Any]]:
         try:
-            response = requests.get(f"{BACKEND_BASE_URL}/timesheets/")
-            
-            if response.status_code == 200:
-                timesheets = response.json()
-                if timesheets:
-                    message = "📊 **DETAILED TIMESHEETS REPORT**\n\n"
-                    
-                    # Group by user
-                    user_timesheets = {}
-                    for ts in timesheets:
-                        user = ts.get("user_id", "Unknown")
-                        if user not in user_timesheets:
-                            user_timesheets[user] = []
-                        user_timesheets[user].append(ts)
-                    
-                    for user, user_ts in user_timesheets.items():
-                        total_hours = sum(ts.get("total_hours", 0) for ts in user_ts)
-                        pending_count = len([ts for ts in user_ts if not ts.get("submitted", False)])
-                        
-                        message += f"👤 **{user}**: {len(user_ts)} entries, {total_hours}h total, {pending_count} pending\n"
-                        
-                        # Show recent entries
-                        recent_ts = sorted(user_ts, key=lambda x: x.get("date", ""), reverse=True)[:3]
-                        for ts in recent_ts:
-                            status = "✅" if ts.get("submitted") else "⏳"
-                            message += f"  {status} {ts.get('date', 'N/A')} | {ts.get('from_time', 'N/A')}-{ts.get('to_time', 'N/A')} | {ts.get('total_hours', 0)}h\n"
-                        message += "\n"
-                else:
-                    message = "📊 No timesheets found."
-            else:
-                message = "❌ Could not retrieve detailed timesheets."
-                
+            response = backend.acting_for(tracker).report(self.kind, cursor, REPORT_PAGE_ROWS)
+
+            if response.status_code != 200:
+                dispatcher.utter_message(text=f"❌ Could not retrieve {self.subject}.")
+                return [SlotSet(CONTINUATION_SLOT, None)]
+
+            page = response.json()
+            if not page.get("groups") and not cursor:
+                dispatcher.utter_message(text=self.empty_message)
+                return [SlotSet(CONTINUATION_SLOT, None)]
+
+            title = f"{self.title} (continued)\n\n" if cursor else f"{self.title}\n\n"
+            message, next_cursor = render_page(title, page, self.render_group)
             dispatcher.utter_message(text=message)
-            
+            return [SlotSet(CONTINUATION_SLOT, {"action": self.name(), "cursor": next_cursor} if next_cursor else None)]
+
         except Exception as e:
-            logger.error(f"Error getting detailed timesheets: {e}")
-            dispatcher.utter_message(text="❌ An error occurred while retrieving detailed timesheets.")
-        
+            logger.error(f"Error getting {self.subject}: {e}")
+            dispatcher.utter_message(text=f"❌ An error occurred while retrieving {self.subject}.")
+
         return []
 
-class ActionGetDetailedLeaves(Action):
+    @abstractmethod
+    def render_group(self, group: Dict[Text, Any]) -> List[Text]:
+        """Lines for one group of the report page."""
+
+class ActionGetDetailedTimesheets(DetailedReportAction):
+    kind = "timesheets"
+    title = "📊 **DETAILED TIMESHEETS REPORT**"
+    subject = "detailed timesheets"
+    empty_message = "📊 No timesheets found."
+
+    def name(self) -> Text:
+        return "action_get_detailed_timesheets"
+
+    def render_group(self, group: Dict[Text, Any]) -> List[Text]:
+        # One group per user, most recent entries first
+        totals = group.get("totals", {})
+        lines = [f"👤 **{group['key'] or 'Unknown'}**: {group['count']} entries, "
+                 f"{totals.get('hours', 0)}h total, {int(totals.get('pending', 0))} pending\n"]
+        for ts in group["items"]:
+            status = "✅" if ts.get("submitted") else "⏳"
+            lines.append(f"  {status} {ts.get('date', 'N/A')} | {ts.get('from_time', 'N/A')}-{ts.get('to_time', 'N/A')} | {ts.get('hours', 0)}h\n")
+        lines.append("\n")
+        return lines
+
+class ActionGetDetailedLeaves(DetailedReportAction):
+    kind = "leaves"
+    title = "🏖️ **DETAILED LEAVE REQUESTS REPORT**"
+    subject = "detailed leave requests"
+    empty_message = "🏖️ No leave requests found."
+
     def name(self) -> Text:
         return "action_get_detailed_leaves"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
-        
-        try:
-            response = requests.get(f"{BACKEND_BASE_URL}/leaves/")
-            
-            if response.status_code == 200:
-                leaves = response.json()
-                if leaves:
-                    message = "🏖️ **DETAILED LEAVE REQUESTS REPORT**\n\n"
-                    
-                    # Group by status
-                    status_groups = {}
-                    for leave in leaves:
-                        status = leave.get("status", "Unknown")
-                        if status not in status_groups:
-                            status_groups[status] = []
-                        status_groups[status].append(leave)
-                    
-                    for status, status_leaves in status_groups.items():
-                        message += f"📊 **{status}**: {len(status_leaves)} requests\n"
-                        
-                        # Show details for each status
-                        for leave in status_leaves[:5]:  # Show max 5 per status
-                            message += f"  👤 {leave.get('user_id', 'Unknown')} | {leave.get('date', 'N/A')} | {leave.get('leave_type', 'N/A')}\n"
-                        if len(status_leaves) > 5:
-                            message += f"  ... and {len(status_leaves) - 5} more\n"
-                        message += "\n"
-                else:
-                    message = "🏖️ No leave requests found."
-            else:
-                message = "❌ Could not retrieve detailed leave requests."
-                
-            dispatcher.utter_message(text=message)
-            
-        except Exception as e:
-            logger.error(f"Error getting detailed leaves: {e}")
-            dispatcher.utter_message(text="❌ An error occurred while retrieving detailed leave requests.")
-        
-        return []
+    def render_group(self, group: Dict[Text, Any]) -> List[Text]:
+        # One group per status
+        lines = [f"📊 **{group['key'] or 'Unknown'}**: {group['count']} requests\n"]
+        for leave in group["items"]:
+            lines.append(f"  👤 {leave.get('user_id', 'Unknown')} | {format_leave_dates(leave)} | {leave.get('leave_type', 'N/A')}\n")
+        lines.append("\n")
+        return lines
+
+class ActionGetDetailedEmails(DetailedReportAction):
+    kind = "emails"
+    title = "📧 **DETAILED EMAILS REPORT**"
+    subject = "detailed emails"
+    empty_message = "📧 No emails found."
 
-class ActionGetDetailedEmails(Action):
     def name(self) -> Text:
         return "action_get_detailed_emails"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
-        
-        try:
-            response = requests.get(f"{BACKEND_BASE_URL}/emails/")
-            
-            if response.status_code == 200:
-                emails = response.json()
-                if emails:
-                    message = "📧 **DETAILED EMAILS REPORT**\n\n"
-                    
-                    # Group by type/status
-                    type_groups = {}
-                    for email in emails:
-                        email_type = email.get("type", "Unknown")
-                        if email_type not in type_groups:
-                            type_groups[email_type] = []
-                        type_groups[email_type].append(email)
-                    
-                    for email_type, type_emails in type_groups.items():
-                        message += f"📊 **{email_type}**: {len(type_emails)} emails\n"
-                        
-                        # Show recent emails
-                        recent_emails = sorted(type_emails, key=lambda x: x.get("id", 0), reverse=True)[:3]
-                        for email in recent_emails:
-                            message += f"  📝 {email.get('subject', 'No subject')} | To: {email.get('recipient', 'N/A')} | Status: {email.get('status', 'N/A')}\n"
-                        message += "\n"
-                else:
-                    message = "📧 No emails found."
-            else:
-                message = "❌ Could not retrieve detailed emails."
-                
-            dispatcher.utter_message(text=message)
-            
-        except Exception as e:
-            logger.error(f"Error getting detailed emails: {e}")
-            dispatcher.utter_message(text="❌ An error occurred while retrieving detailed emails.")
-        
-        return []
+    def render_group(self, group: Dict[Text, Any]) -> List[Text]:
+        # One group per email type, most recent emails first
+        lines = [f"📊 **{group['key'] or 'Unknown'}**: {group['count']} emails\n"]
+        for email in group["items"]:
+            lines.append(f"  📝 {email.get('subject', 'No subject')} | To: {email.get('email', 'N/A')} | Status: {email.get('status', 'N/A')}\n")
+        lines.append("\n")
+        return lines
+
+class ActionGetDetailedTasks(DetailedReportAction):
+    kind = "tasks"
+    title = "📋 **DETAILED TASKS REPORT**"
+    subject = "detailed tasks"
+    empty_message = "📋 No tasks found."
 
-class ActionGetDetailedTasks(Action):
     def name(self) -> Text:
         return "action_get_detailed_tasks"
 
+    def render_group(self, group: Dict[Text, Any]) -> List[Text]:
+        # One group per priority
+        lines = [f"📊 **{group['key'] or 'Unknown'} Priority**: {group['count']} tasks\n"]
+        for task in group["items"]:
+            lines.append(f"  📝 {task.get('title', 'No title')} | Status: {task.get('status', 'N/A')} | User: {task.get('user_id', 'Unknown')}\n")
+        lines.append("\n")
+        return lines
+
+REPORT_ACTIONS = {action.name(): action for action in (
+    ActionGetDetailedTimesheets(), ActionGetDetailedLeaves(), ActionGetDetailedEmails(), ActionGetDetailedTasks(),
+)}
+
+class ActionShowMoreReport(Action):
+    def name(self) -> Text:
+        return "action_show_more_report"
+
     def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
-        
-        try:
-            response = requests.get(f"{BACKEND_BASE_URL}/tasks/")
-            
-            if response.status_code == 200:
-                tasks = response.json()
-                if tasks:
-                    message = "📋 **DETAILED TASKS REPORT**\n\n"
-                    
-                    # Group by priority
-                    priority_groups = {}
-                    for task in tasks:
-                        priority = task.get("priority", "Unknown")
-                        if priority not in priority_groups:
-                            priority_groups[priority] = []
-                        priority_groups[priority].append(task)
-                    
-                    for priority, priority_tasks in priority_groups.items():
-                        message += f"📊 **{priority} Priority**: {len(priority_tasks)} tasks\n"
-                        
-                        # Show tasks for each priority
-                        for task in priority_tasks[:5]:  # Show max 5 per priority
-                            message += f"  📝 {task.get('title', 'No title')} | Status: {task.get('status', 'N/A')} | User: {task.get('user_id', 'Unknown')}\n"
-                        if len(priority_tasks) > 5:
-                            message += f"  ... and {len(priority_tasks) - 5} more\n"
-                        message += "\n"
-                else:
-                    message = "📋 No tasks found."
-            else:
-                message = "❌ Could not retrieve detailed tasks."
-                
-            dispatcher.utter_message(text=message)
-            
-        except Exception as e:
-            logger.error(f"Error getting detailed tasks: {e}")
-            dispatcher.utter_message(text="❌ An error occurred while retrieving detailed tasks.")
-        
-        return []
+        continuation = tracker.get_slot(CONTINUATION_SLOT)
+        action = REPORT_ACTIONS.get((continuation or {}).get("action"))
+        if action is None:
+            dispatcher.utter_message(text="📊 There is nothing more to show.")
+            return [SlotSet(CONTINUATION_SLOT, None)]
+        return action.show_page(dispatcher, tracker, continuation["cursor"])
 
 class ActionCreateTimesheet(Action):
     def name(self) -> Text:
@@ -314,6 +411,7 @@ class ActionCreateTimesheet(Action):
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         try:
+            client = backend.acting_for(tracker)
             # Extract entities from user message
             user_id = tracker.get_slot("user_id") or "default_user"
             email = tracker.get_slot("email") or "user@example.com"
@@ -322,7 +420,7 @@ class ActionCreateTimesheet(Action):
             to_time = tracker.get_slot("to_time") or "17:00"
             task_summary = tracker.get_slot("task_summary") or "General work"
             
-            # Calculate total hours
+            # Estimate for the reply; the backend derives the stored hours from the interval
             try:
                 from_hour = int(from_time.split(":")[0])
                 to_hour = int(to_time.split(":")[0])
@@ -338,30 +436,31 @@ class ActionCreateTimesheet(Action):
                 "date": work_date,
                 "from_time": from_time,
                 "to_time": to_time,
-                "total_hours": total_hours,
                 "task_summary": task_summary,
+                "description": task_summary,
                 "submitted": False
             }
             
             # Call backend API with timeout
             try:
-                response = requests.post(
-                    f"{BACKEND_BASE_URL}/timesheets/",
-                    json=timesheet_data,
-                    headers={"Content-Type": "application/json"},
-                    timeout=5
-                )
+                response = client.create_timesheet(timesheet_data, idempotency_key=turn_key(tracker, self.name()))
                 
                 if response.status_code == 200:
                     result = response.json()
+                    total_hours = result.get("hours", total_hours)
                     message = f"✅ Timesheet created successfully!\n\n📅 Date: {work_date}\n⏰ Time: {from_time} - {to_time}\n⏱️ Total Hours: {total_hours}\n📝 Summary: {task_summary}\n🆔 ID: {result.get('id', 'N/A')}"
                     dispatcher.utter_message(text=message)
+                elif response.status_code == 409:
+                    message = f"⚠️ {response.json().get('detail', 'This timesheet overlaps an existing entry.')}"
+                    dispatcher.utter_message(text=message)
+                elif response.status_code == 429:
+                    dispatcher.utter_message(text=slow_down_message(response))
                 else:
                     # Fallback: Show success message even if backend fails
                     message = f"✅ Timesheet created successfully!\n\n📅 Date: {work_date}\n⏰ Time: {from_time} - {to_time}\n⏱️ Total Hours: {total_hours}\n📝 Summary: {task_summary}\n⚠️ Note: Backend connection issue, but data saved locally"
                     dispatcher.utter_message(text=message)
                     
-            except requests.exceptions.RequestException as e:
+            except BackendUnavailable as e:
                 # Fallback: Show success message even if backend is down
                 message = f"✅ Timesheet created successfully!\n\n📅 Date: {work_date}\n⏰ Time: {from_time} - {to_time}\n⏱️ Total Hours: {total_hours}\n📝 Summary: {task_summary}\n⚠️ Note: Backend connection issue, but data saved locally"
                 dispatcher.utter_message(text=message)
@@ -373,111 +472,56 @@ class ActionCreateTimesheet(Action):
         
         return []
 
-class ActionCollectTimesheetInfo(Action):
+class ValidateTimesheetForm(SubmittingFormValidationAction):
+    submit_action = ActionCreateTimesheet
+
     def name(self) -> Text:
-        return "action_collect_timesheet_info"
+        return "validate_timesheet_form"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
-        
-        # Get the latest user message to extract information
-        latest_message = tracker.latest_message.get('text', '').lower()
-        
-        # Extract entities from the latest message
-        entities = tracker.latest_message.get('entities', [])
-        
-        # Initialize slots to update
-        slots_to_set = []
-        
-        # Extract date
-        date_slot = tracker.get_slot("date")
-        if not date_slot:
-            # Check entities first
-            date_entity = next((e for e in entities if e['entity'] == 'date'), None)
-            if date_entity:
-                date_slot = date_entity['value']
-                slots_to_set.append(SlotSet("date", date_slot))
-            elif 'today' in latest_message:
-                date_slot = str(date.today())
-                slots_to_set.append(SlotSet("date", date_slot))
-            elif 'yesterday' in latest_message:
-                yesterday = date.today() - timedelta(days=1)
-                date_slot = str(yesterday)
-                slots_to_set.append(SlotSet("date", date_slot))
-            else:
-                dispatcher.utter_message(text="📅 What date did you work? (e.g., today, yesterday, or specific date like 2025-07-28)")
-                return slots_to_set
-        
-        # Extract from_time
+    def extract_date(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        return self.infer_slot(tracker, "date", parse_date)
+
+    def extract_from_time(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        return self.infer_slot(tracker, "from_time", lambda text: next(iter(parse_times(text)), None))
+
+    def extract_to_time(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        # Only a second time in the message is an end time ("9am to 5pm")
+        return self.infer_slot(tracker, "to_time", lambda text: next(iter(parse_times(text)[1:]), None))
+
+    def extract_task_summary(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        return self.infer_slot(tracker, "task_summary", lambda text: infer(text, TIMESHEET_SUMMARIES))
+
+    def validate_date(self, value: Any, dispatcher: CollectingDispatcher,
+                      tracker: Tracker, domain: Dict[Text, Any]) -> Dict[Text, Any]:
+        work_date = parse_date(str(value).lower(), fuzzy=True)
+        if not work_date:
+            dispatcher.utter_message(text="📅 I couldn't read that date. Try today, yesterday or a date like 2025-07-28.")
+        return {"date": work_date}
+
+    def validate_from_time(self, value: Any, dispatcher: CollectingDispatcher,
+                           tracker: Tracker, domain: Dict[Text, Any]) -> Dict[Text, Any]:
+        times = parse_times(str(value).lower())
+        if not times:
+            dispatcher.utter_message(text="⏰ Please give the start time like 9:00 or 9am.")
+            return {"from_time": None}
+        return {"from_time": times[0]}
+
+    def validate_to_time(self, value: Any, dispatcher: CollectingDispatcher,
+                         tracker: Tracker, domain: Dict[Text, Any]) -> Dict[Text, Any]:
+        times = parse_times(str(value).lower())
+        if not times:
+            dispatcher.utter_message(text="⏰ Please give the end time like 17:00 or 5pm.")
+            return {"to_time": None}
         from_time = tracker.get_slot("from_time")
-        if not from_time:
-            # Check entities first
-            time_entity = next((e for e in entities if e['entity'] == 'from_time'), None)
-            if time_entity:
-                from_time = time_entity['value']
-                slots_to_set.append(SlotSet("from_time", from_time))
-            elif any(word in latest_message for word in ['9am', '9:00', '09:00']):
-                from_time = "09:00"
-                slots_to_set.append(SlotSet("from_time", from_time))
-            elif any(word in latest_message for word in ['8am', '8:00', '08:00']):
-                from_time = "08:00"
-                slots_to_set.append(SlotSet("from_time", from_time))
-            elif any(word in latest_message for word in ['10am', '10:00', '10:00']):
-                from_time = "10:00"
-                slots_to_set.append(SlotSet("from_time", from_time))
-            else:
-                dispatcher.utter_message(text="⏰ What time did you start work? (e.g., 9:00, 9am, 08:00)")
-                return slots_to_set
-        
-        # Extract to_time
-        to_time = tracker.get_slot("to_time")
-        if not to_time:
-            # Check entities first
-            time_entity = next((e for e in entities if e['entity'] == 'to_time'), None)
-            if time_entity:
-                to_time = time_entity['value']
-                slots_to_set.append(SlotSet("to_time", to_time))
-            elif any(word in latest_message for word in ['5pm', '17:00', '5:00pm']):
-                to_time = "17:00"
-                slots_to_set.append(SlotSet("to_time", to_time))
-            elif any(word in latest_message for word in ['6pm', '18:00', '6:00pm']):
-                to_time = "18:00"
-                slots_to_set.append(SlotSet("to_time", to_time))
-            elif any(word in latest_message for word in ['4pm', '16:00', '4:00pm']):
-                to_time = "16:00"
-                slots_to_set.append(SlotSet("to_time", to_time))
-            else:
-                dispatcher.utter_message(text="⏰ What time did you finish work? (e.g., 17:00, 5pm, 18:00)")
-                return slots_to_set
-        
-        # Extract task_summary
-        task_summary = tracker.get_slot("task_summary")
-        if not task_summary:
-            # Check entities first
-            task_entity = next((e for e in entities if e['entity'] == 'task_summary'), None)
-            if task_entity:
-                task_summary = task_entity['value']
-                slots_to_set.append(SlotSet("task_summary", task_summary))
-            elif 'coding' in latest_message or 'programming' in latest_message:
-                task_summary = "Coding and development work"
-                slots_to_set.append(SlotSet("task_summary", task_summary))
-            elif 'meeting' in latest_message:
-                task_summary = "Meetings and discussions"
-                slots_to_set.append(SlotSet("task_summary", task_summary))
-            elif 'documentation' in latest_message:
-                task_summary = "Documentation work"
-                slots_to_set.append(SlotSet("task_summary", task_summary))
-            elif 'project' in latest_message:
-                task_summary = "Project work"
-                slots_to_set.append(SlotSet("task_summary", task_summary))
-            else:
-                dispatcher.utter_message(text="📝 What work did you do? (e.g., coding, meetings, documentation, project work)")
-                return slots_to_set
-        
-        # All information collected, create timesheet
-        slots_to_set.append(FollowupAction("action_create_timesheet"))
-        return slots_to_set
+        if from_time and times[-1] <= from_time:
+            dispatcher.utter_message(text=f"⏰ The end time has to be after the start time ({from_time}).")
+            return {"to_time": None}
+        return {"to_time": times[-1]}
+
+    def validate_task_summary(self, value: Any, dispatcher: CollectingDispatcher,
+                              tracker: Tracker, domain: Dict[Text, Any]) -> Dict[Text, Any]:
+        text = str(value).strip()
+        return {"task_summary": infer(text.lower(), TIMESHEET_SUMMARIES) or text or None}
 
 class ActionListTimesheets(Action):
     def name(self) -> Text:
@@ -488,7 +532,8 @@ class ActionListTimesheets(Action):
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         try:
-            response = requests.get(f"{BACKEND_BASE_URL}/timesheets/")
+            client = backend.acting_for(tracker)
+            response = client.list_timesheets()
             
             if response.status_code == 200:
                 timesheets = response.json()
@@ -496,7 +541,7 @@ class ActionListTimesheets(Action):
                     message = "📋 Your timesheets:\n\n"
                     for ts in timesheets[:5]:  # Show last 5
                         status = "✅ Approved" if ts.get("submitted") else "⏳ Pending"
-                        message += f"📅 {ts['date']} | {ts['from_time']}-{ts['to_time']} | {ts['total_hours']}h | {status}\n"
+                        message += f"📅 {ts['date']} | {ts['from_time']}-{ts['to_time']} | {ts.get('hours', 0)}h | {status}\n"
                     if len(timesheets) > 5:
                         message += f"\n... and {len(timesheets) - 5} more timesheets"
                 else:
@@ -521,17 +566,21 @@ class ActionCreateLeave(Action):
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         try:
+            client = backend.acting_for(tracker)
             # Extract entities
             user_id = tracker.get_slot("user_id") or "default_user"
             email = tracker.get_slot("email") or "user@example.com"
-            leave_date = tracker.get_slot("date") or str(date.today())
+            start_date = tracker.get_slot("start_date") or str(date.today())
+            end_date = tracker.get_slot("end_date") or start_date
             leave_type = tracker.get_slot("leave_type") or "Personal"
             reason = tracker.get_slot("reason") or "Personal leave"
+            leave_dates = format_leave_dates({"start_date": start_date, "end_date": end_date})
             
             leave_data = {
                 "user_id": user_id,
                 "email": email,
-                "date": leave_date,
+                "start_date": start_date,
+                "end_date": end_date,
                 "leave_type": leave_type,
                 "reason": reason,
                 "status": "Pending"
@@ -539,25 +588,22 @@ class ActionCreateLeave(Action):
             
             # Call backend API with timeout
             try:
-                response = requests.post(
-                    f"{BACKEND_BASE_URL}/leaves/",
-                    json=leave_data,
-                    headers={"Content-Type": "application/json"},
-                    timeout=5
-                )
+                response = client.create_leave(leave_data, idempotency_key=turn_key(tracker, self.name()))
                 
                 if response.status_code == 200:
                     result = response.json()
-                    message = f"✅ Leave request created successfully!\n\n📅 Date: {leave_date}\n🏷️ Type: {leave_type}\n📝 Reason: {reason}\n🆔 ID: {result.get('id', 'N/A')}"
+                    message = f"✅ Leave request created successfully!\n\n📅 Dates: {leave_dates}\n🏷️ Type: {leave_type}\n📝 Reason: {reason}\n🆔 ID: {result.get('id', 'N/A')}"
                     dispatcher.utter_message(text=message)
+                elif response.status_code == 429:
+                    dispatcher.utter_message(text=slow_down_message(response))
                 else:
                     # Fallback: Show success message even if backend fails
-                    message = f"✅ Leave request created successfully!\n\n📅 Date: {leave_date}\n🏷️ Type: {leave_type}\n📝 Reason: {reason}\n⚠️ Note: Backend connection issue, but data saved locally"
+                    message = f"✅ Leave request created successfully!\n\n📅 Dates: {leave_dates}\n🏷️ Type: {leave_type}\n📝 Reason: {reason}\n⚠️ Note: Backend connection issue, but data saved locally"
                     dispatcher.utter_message(text=message)
                     
-            except requests.exceptions.RequestException as e:
+            except BackendUnavailable as e:
                 # Fallback: Show success message even if backend is down
-                message = f"✅ Leave request created successfully!\n\n📅 Date: {leave_date}\n🏷️ Type: {leave_type}\n📝 Reason: {reason}\n⚠️ Note: Backend connection issue, but data saved locally"
+                message = f"✅ Leave request created successfully!\n\n📅 Dates: {leave_dates}\n🏷️ Type: {leave_type}\n📝 Reason: {reason}\n⚠️ Note: Backend connection issue, but data saved locally"
                 dispatcher.utter_message(text=message)
                 logger.warning(f"Backend connection failed for leave creation: {e}")
                 
@@ -567,100 +613,54 @@ class ActionCreateLeave(Action):
         
         return []
 
-class ActionCollectLeaveInfo(Action):
+class ValidateLeaveForm(SubmittingFormValidationAction):
+    submit_action = ActionCreateLeave
+
     def name(self) -> Text:
-        return "action_collect_leave_info"
+        return "validate_leave_form"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
-        
-        # Get the latest user message
-        latest_message = tracker.latest_message.get('text', '').lower()
-        
-        # Extract entities from the latest message
-        entities = tracker.latest_message.get('entities', [])
-        
-        # Initialize slots to update
-        slots_to_set = []
-        
-        # Extract date
-        date_slot = tracker.get_slot("date")
-        if not date_slot:
-            # Check entities first
-            date_entity = next((e for e in entities if e['entity'] == 'date'), None)
-            if date_entity:
-                date_slot = date_entity['value']
-                slots_to_set.append(SlotSet("date", date_slot))
-            elif 'today' in latest_message:
-                date_slot = str(date.today())
-                slots_to_set.append(SlotSet("date", date_slot))
-            elif 'tomorrow' in latest_message:
-                tomorrow = date.today() + timedelta(days=1)
-                date_slot = str(tomorrow)
-                slots_to_set.append(SlotSet("date", date_slot))
-            elif 'next week' in latest_message:
-                next_week = date.today() + timedelta(days=7)
-                date_slot = str(next_week)
-                slots_to_set.append(SlotSet("date", date_slot))
-            else:
-                dispatcher.utter_message(text="📅 When do you want to take leave? (e.g., tomorrow, next week, or specific date)")
-                return slots_to_set
-        
-        # Extract leave_type
-        leave_type = tracker.get_slot("leave_type")
-        if not leave_type:
-            # Check entities first
-            leave_entity = next((e for e in entities if e['entity'] == 'leave_type'), None)
-            if leave_entity:
-                leave_type = leave_entity['value']
-                slots_to_set.append(SlotSet("leave_type", leave_type))
-            elif 'sick' in latest_message:
-                leave_type = "Sick Leave"
-                slots_to_set.append(SlotSet("leave_type", leave_type))
-            elif 'vacation' in latest_message or 'holiday' in latest_message:
-                leave_type = "Vacation"
-                slots_to_set.append(SlotSet("leave_type", leave_type))
-            elif 'personal' in latest_message:
-                leave_type = "Personal Leave"
-                slots_to_set.append(SlotSet("leave_type", leave_type))
-            elif 'medical' in latest_message:
-                leave_type = "Medical Leave"
-                slots_to_set.append(SlotSet("leave_type", leave_type))
-            elif 'maternity' in latest_message:
-                leave_type = "Maternity Leave"
-                slots_to_set.append(SlotSet("leave_type", leave_type))
-            else:
-                dispatcher.utter_message(text="🏷️ What type of leave? (e.g., sick leave, vacation, personal leave)")
-                return slots_to_set
-        
-        # Extract reason
-        reason = tracker.get_slot("reason")
-        if not reason:
-            # Check entities first
-            reason_entity = next((e for e in entities if e['entity'] == 'reason'), None)
-            if reason_entity:
-                reason = reason_entity['value']
-                slots_to_set.append(SlotSet("reason", reason))
-            elif 'illness' in latest_message or 'sick' in latest_message:
-                reason = "Illness"
-                slots_to_set.append(SlotSet("reason", reason))
-            elif 'family' in latest_message:
-                reason = "Family emergency"
-                slots_to_set.append(SlotSet("reason", reason))
-            elif 'personal' in latest_message:
-                reason = "Personal reasons"
-                slots_to_set.append(SlotSet("reason", reason))
-            elif 'vacation' in latest_message:
-                reason = "Vacation"
-                slots_to_set.append(SlotSet("reason", reason))
-            else:
-                dispatcher.utter_message(text="📝 What's the reason for your leave?")
-                return slots_to_set
-        
-        # All information collected, create leave
-        slots_to_set.append(FollowupAction("action_create_leave"))
-        return slots_to_set
+    def extract_start_date(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        return self.infer_slot(tracker, "start_date", lambda text: parse_date_range(text)[0])
+
+    def extract_end_date(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        # Also picks the end out of a range given as the answer for the start
+        return self.infer_slot(tracker, "end_date", lambda text: parse_date_range(text)[1])
+
+    def extract_leave_type(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        return self.infer_slot(tracker, "leave_type", lambda text: infer(text, LEAVE_TYPES))
+
+    def extract_reason(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        return self.infer_slot(tracker, "reason", lambda text: infer(text, LEAVE_REASONS))
+
+    def validate_start_date(self, value: Any, dispatcher: CollectingDispatcher,
+                            tracker: Tracker, domain: Dict[Text, Any]) -> Dict[Text, Any]:
+        start_date = parse_date_range(str(value).lower(), fuzzy=True)[0]
+        if not start_date:
+            dispatcher.utter_message(text="📅 I couldn't read that date. Try tomorrow, next week or a date like 2025-07-28.")
+        return {"start_date": start_date}
+
+    def validate_end_date(self, value: Any, dispatcher: CollectingDispatcher,
+                          tracker: Tracker, domain: Dict[Text, Any]) -> Dict[Text, Any]:
+        text = str(value).lower()
+        start_date = parse_date_range(str(tracker.get_slot("start_date") or "").lower(), fuzzy=True)[0]
+        if start_date and any(word in text for word in SAME_DAY_WORDS):
+            return {"end_date": start_date}
+        end_date = parse_date(text, fuzzy=True)
+        if not end_date:
+            dispatcher.utter_message(text="📅 I couldn't read that date. Try a date like 2025-07-28, or \"same day\" for a one-day leave.")
+        elif start_date and end_date < start_date:
+            dispatcher.utter_message(text=f"📅 The leave can't end before it starts ({start_date}).")
+            end_date = None
+        return {"end_date": end_date}
+
+    def validate_leave_type(self, value: Any, dispatcher: CollectingDispatcher,
+                            tracker: Tracker, domain: Dict[Text, Any]) -> Dict[Text, Any]:
+        text = str(value).strip()
+        return {"leave_type": infer(text.lower(), LEAVE_TYPES) or text.title() or None}
+
+    def validate_reason(self, value: Any, dispatcher: CollectingDispatcher,
+                        tracker: Tracker, domain: Dict[Text, Any]) -> Dict[Text, Any]:
+        return {"reason": str(value).strip() or None}
 
 class ActionListLeaves(Action):
     def name(self) -> Text:
@@ -671,14 +671,15 @@ class ActionListLeaves(Action):
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         try:
-            response = requests.get(f"{BACKEND_BASE_URL}/leaves/")
+            client = backend.acting_for(tracker)
+            response = client.list_leaves()
             
             if response.status_code == 200:
                 leaves = response.json()
                 if leaves:
                     message = "📋 Your leave requests:\n\n"
                     for leave in leaves[:5]:  # Show last 5
-                        message += f"📅 {leave['date']} | {leave.get('leave_type', 'N/A')} | {leave.get('status', 'Pending')}\n"
+                        message += f"📅 {format_leave_dates(leave)} | {leave.get('leave_type', 'N/A')} | {leave.get('status', 'Pending')}\n"
                     if len(leaves) > 5:
                         message += f"\n... and {len(leaves) - 5} more leave requests"
                 else:
@@ -703,42 +704,39 @@ class ActionCreateEmail(Action):
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         try:
+            client = backend.acting_for(tracker)
             # Extract entities
             user_id = tracker.get_slot("user_id") or "default_user"
-            email = tracker.get_slot("email") or "user@example.com"
             recipient = tracker.get_slot("recipient") or "manager@company.com"
             subject = tracker.get_slot("subject") or "General inquiry"
             content = tracker.get_slot("content") or "Please review this email."
             
+            # EmailCreate: `email` is the address the email goes to, `message` its body
             email_data = {
                 "user_id": user_id,
-                "email": email,
-                "recipient": recipient,
+                "email": recipient,
                 "subject": subject,
-                "content": content,
+                "message": content,
                 "type": "outgoing",
                 "status": "Draft"
             }
             
             # Call backend API with timeout
             try:
-                response = requests.post(
-                    f"{BACKEND_BASE_URL}/emails/",
-                    json=email_data,
-                    headers={"Content-Type": "application/json"},
-                    timeout=5
-                )
+                response = client.create_email(email_data, idempotency_key=turn_key(tracker, self.name()))
                 
                 if response.status_code == 200:
                     result = response.json()
                     message = f"✅ Email created successfully!\n\n📧 To: {recipient}\n📝 Subject: {subject}\n📄 Content: {content[:50]}...\n🆔 ID: {result.get('id', 'N/A')}"
                     dispatcher.utter_message(text=message)
+                elif response.status_code == 429:
+                    dispatcher.utter_message(text=slow_down_message(response))
                 else:
                     # Fallback: Show success message even if backend fails
                     message = f"✅ Email created successfully!\n\n📧 To: {recipient}\n📝 Subject: {subject}\n📄 Content: {content[:50]}...\n⚠️ Note: Backend connection issue, but data saved locally"
                     dispatcher.utter_message(text=message)
                     
-            except requests.exceptions.RequestException as e:
+            except BackendUnavailable as e:
                 # Fallback: Show success message even if backend is down
                 message = f"✅ Email created successfully!\n\n📧 To: {recipient}\n📝 Subject: {subject}\n📄 Content: {content[:50]}...\n⚠️ Note: Backend connection issue, but data saved locally"
                 dispatcher.utter_message(text=message)
@@ -750,102 +748,38 @@ class ActionCreateEmail(Action):
         
         return []
 
-class ActionCollectEmailInfo(Action):
+class ValidateEmailForm(SubmittingFormValidationAction):
+    submit_action = ActionCreateEmail
+
     def name(self) -> Text:
-        return "action_collect_email_info"
+        return "validate_email_form"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
-        
-        # Get the latest user message
-        latest_message = tracker.latest_message.get('text', '').lower()
-        
-        # Extract entities from the latest message
-        entities = tracker.latest_message.get('entities', [])
-        
-        # Initialize slots to update
-        slots_to_set = []
-        
-        # Extract recipient
-        recipient = tracker.get_slot("recipient")
+    def extract_recipient(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        return self.infer_slot(tracker, "recipient", lambda text: next(iter(EMAIL_PATTERN.findall(text)), None)
+                               or infer(text, RECIPIENTS))
+
+    def extract_subject(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        return self.infer_slot(tracker, "subject",
+                               lambda text: next(iter((text_after(text, ("subject", "about")) or "").split()), None))
+
+    def extract_content(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        return self.infer_slot(tracker, "content", lambda text: text_after(text, ("content", "message")))
+
+    def validate_recipient(self, value: Any, dispatcher: CollectingDispatcher,
+                           tracker: Tracker, domain: Dict[Text, Any]) -> Dict[Text, Any]:
+        text = str(value).lower()
+        recipient = next(iter(EMAIL_PATTERN.findall(text)), None) or infer(text, RECIPIENTS)
         if not recipient:
-            # Check entities first
-            recipient_entity = next((e for e in entities if e['entity'] == 'recipient'), None)
-            if recipient_entity:
-                recipient = recipient_entity['value']
-                slots_to_set.append(SlotSet("recipient", recipient))
-            elif '@' in latest_message:
-                words = latest_message.split()
-                for word in words:
-                    if '@' in word and '.' in word:
-                        recipient = word
-                        slots_to_set.append(SlotSet("recipient", recipient))
-                        break
-            elif 'manager' in latest_message:
-                recipient = "manager@company.com"
-                slots_to_set.append(SlotSet("recipient", recipient))
-            elif 'team' in latest_message:
-                recipient = "team@company.com"
-                slots_to_set.append(SlotSet("recipient", recipient))
-            elif 'client' in latest_message:
-                recipient = "client@company.com"
-                slots_to_set.append(SlotSet("recipient", recipient))
-            else:
-                dispatcher.utter_message(text="📧 Who should I send the email to? (e.g., manager@company.com)")
-                return slots_to_set
-        
-        # Extract subject
-        subject = tracker.get_slot("subject")
-        if not subject:
-            # Check entities first
-            subject_entity = next((e for e in entities if e['entity'] == 'subject'), None)
-            if subject_entity:
-                subject = subject_entity['value']
-                slots_to_set.append(SlotSet("subject", subject))
-            elif 'subject' in latest_message or 'about' in latest_message:
-                # Try to extract subject after keywords
-                if 'subject' in latest_message:
-                    parts = latest_message.split('subject')
-                    if len(parts) > 1:
-                        subject = parts[1].strip().split()[0]
-                        slots_to_set.append(SlotSet("subject", subject))
-                elif 'about' in latest_message:
-                    parts = latest_message.split('about')
-                    if len(parts) > 1:
-                        subject = parts[1].strip().split()[0]
-                        slots_to_set.append(SlotSet("subject", subject))
-            else:
-                dispatcher.utter_message(text="📝 What should be the subject of the email?")
-                return slots_to_set
-        
-        # Extract content
-        content = tracker.get_slot("content")
-        if not content:
-            # Check entities first
-            content_entity = next((e for e in entities if e['entity'] == 'content'), None)
-            if content_entity:
-                content = content_entity['value']
-                slots_to_set.append(SlotSet("content", content))
-            elif 'content' in latest_message or 'message' in latest_message:
-                # Try to extract content after keywords
-                if 'content' in latest_message:
-                    parts = latest_message.split('content')
-                    if len(parts) > 1:
-                        content = parts[1].strip()
-                        slots_to_set.append(SlotSet("content", content))
-                elif 'message' in latest_message:
-                    parts = latest_message.split('message')
-                    if len(parts) > 1:
-                        content = parts[1].strip()
-                        slots_to_set.append(SlotSet("content", content))
-            else:
-                dispatcher.utter_message(text="📄 What should be the content of the email?")
-                return slots_to_set
-        
-        # All information collected, create email
-        slots_to_set.append(FollowupAction("action_create_email"))
-        return slots_to_set
+            dispatcher.utter_message(text="📧 Please give an email address, e.g. manager@company.com.")
+        return {"recipient": recipient}
+
+    def validate_subject(self, value: Any, dispatcher: CollectingDispatcher,
+                         tracker: Tracker, domain: Dict[Text, Any]) -> Dict[Text, Any]:
+        return {"subject": str(value).strip() or None}
+
+    def validate_content(self, value: Any, dispatcher: CollectingDispatcher,
+                         tracker: Tracker, domain: Dict[Text, Any]) -> Dict[Text, Any]:
+        return {"content": str(value).strip() or None}
 
 class ActionListEmails(Action):
     def name(self) -> Text:
@@ -856,14 +790,15 @@ class ActionListEmails(Action):
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         try:
-            response = requests.get(f"{BACKEND_BASE_URL}/emails/")
+            client = backend.acting_for(tracker)
+            response = client.list_emails()
             
             if response.status_code == 200:
                 emails = response.json()
                 if emails:
                     message = "📧 Your emails:\n\n"
                     for email in emails[:5]:  # Show last 5
-                        message += f"📝 {email.get('subject', 'No subject')} | {email.get('recipient', 'N/A')} | {email.get('status', 'Draft')}\n"
+                        message += f"📝 {email.get('subject', 'No subject')} | {email.get('email', 'N/A')} | {email.get('status', 'Draft')}\n"
                     if len(emails) > 5:
                         message += f"\n... and {len(emails) - 5} more emails"
                 else:
@@ -888,6 +823,7 @@ class ActionCreateTask(Action):
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         try:
+            client = backend.acting_for(tracker)
             # Extract entities
             user_id = tracker.get_slot("user_id") or "default_user"
             email = tracker.get_slot("email") or "user@example.com"
@@ -904,16 +840,14 @@ class ActionCreateTask(Action):
                 "status": "Pending"
             }
             
-            response = requests.post(
-                f"{BACKEND_BASE_URL}/tasks/",
-                json=task_data,
-                headers={"Content-Type": "application/json"}
-            )
+            response = client.create_task(task_data, idempotency_key=turn_key(tracker, self.name()))
             
             if response.status_code == 200:
                 result = response.json()
                 message = f"✅ Task created successfully!\n\n📋 Title: {title}\n📝 Description: {description}\n⚡ Priority: {priority}\n🆔 ID: {result['id']}"
                 dispatcher.utter_message(text=message)
+            elif response.status_code == 429:
+                dispatcher.utter_message(text=slow_down_message(response))
             else:
                 dispatcher.utter_message(text="❌ Sorry, I couldn't create the task.")
                 
@@ -923,68 +857,35 @@ class ActionCreateTask(Action):
         
         return []
 
-class ActionCollectTaskInfo(Action):
+class ValidateTaskForm(SubmittingFormValidationAction):
+    submit_action = ActionCreateTask
+    extra_slots = ("description", "priority")
+
     def name(self) -> Text:
-        return "action_collect_task_info"
+        return "validate_task_form"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
-        
-        # Check what information we already have
-        title = tracker.get_slot("title")
-        description = tracker.get_slot("description")
-        priority = tracker.get_slot("priority")
-        
-        # Get the latest user message
-        latest_message = tracker.latest_message.get('text', '').lower()
-        
-        # Try to extract title from message
-        if not title:
-            # Look for task-related keywords
-            task_keywords = ['task', 'create', 'add', 'new']
-            if any(keyword in latest_message for keyword in task_keywords):
-                # Try to extract what comes after these keywords
-                for keyword in task_keywords:
-                    if keyword in latest_message:
-                        parts = latest_message.split(keyword)
-                        if len(parts) > 1:
-                            potential_title = parts[1].strip().split()[0]
-                            if potential_title and len(potential_title) > 2:
-                                title = potential_title
-                                break
-        
+    def extract_title(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        def title_after_keyword(text):
+            # "add task deployment" -> "deployment"; short words are not titles
+            for keyword in ("task", "create", "add", "new"):
+                words = (text_after(text, (keyword,)) or "").split()
+                if words and len(words[0]) > 2:
+                    return words[0]
+            return None
+        return self.infer_slot(tracker, "title", title_after_keyword)
+
+    def validate_title(self, value: Any, dispatcher: CollectingDispatcher,
+                       tracker: Tracker, domain: Dict[Text, Any]) -> Dict[Text, Any]:
+        title = str(value).strip()
         if not title:
-            dispatcher.utter_message(text="📋 What should be the title of the task?")
-            return []
-        
-        # Try to extract description from message
-        if not description:
-            # If we have a title, use it as description or ask for more details
-            if title and title != "New task":
-                description = f"Task related to {title}"
-            else:
-                description = "General task"
-        
-        if not description:
-            dispatcher.utter_message(text="📝 What should be the description of the task?")
-            return []
-        
-        # Try to extract priority from message
-        if not priority:
-            if any(word in latest_message for word in ['high', 'urgent', 'important']):
-                priority = "High"
-            elif any(word in latest_message for word in ['low', 'minor']):
-                priority = "Low"
-            else:
-                priority = "Medium"
-        
-        if not priority:
-            dispatcher.utter_message(text="⚡ What priority should this task have? (High, Medium, Low)")
-            return []
-        
-        # All information collected, create task
-        return [FollowupAction("action_create_task")]
+            return {"title": None}
+        # Description and priority are not asked for; fill them like the create action expects
+        text = tracker.latest_message.get("text", "").lower()
+        return {
+            "title": title,
+            "description": tracker.get_slot("description") or f"Task related to {title}",
+            "priority": tracker.get_slot("priority") or infer(text, PRIORITIES) or "Medium",
+        }
 
 class ActionListTasks(Action):
     def name(self) -> Text:
@@ -995,7 +896,8 @@ class ActionListTasks(Action):
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         try:
-            response = requests.get(f"{BACKEND_BASE_URL}/tasks/")
+            client = backend.acting_for(tracker)
+            response = client.list_tasks()
             
             if response.status_code == 200:
                 tasks = response.json()
@@ -1027,12 +929,10 @@ class ActionSubmitPendingTimesheets(Action):
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         try:
+            client = backend.acting_for(tracker)
             approver = tracker.get_slot("approver") or "manager"
             
-            response = requests.post(
-                f"{BACKEND_BASE_URL}/timesheets/send-pending",
-                params={"approver": approver}
-            )
+            response = client.send_pending_timesheets(approver, idempotency_key=turn_key(tracker, self.name()))
             
             if response.status_code == 200:
                 timesheets = response.json()
@@ -1056,14 +956,15 @@ class ActionGetPendingTimesheets(Action):
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         try:
-            response = requests.get(f"{BACKEND_BASE_URL}/timesheets/pending")
+            client = backend.acting_for(tracker)
+            response = client.list_pending_timesheets()
             
             if response.status_code == 200:
                 timesheets = response.json()
                 if timesheets:
                     message = f"⏳ You have {len(timesheets)} pending timesheets:\n\n"
                     for ts in timesheets[:3]:  # Show first 3
-                        message += f"📅 {ts['date']} | {ts['from_time']}-{ts['to_time']} | {ts['total_hours']}h\n"
+                        message += f"📅 {ts['date']} | {ts['from_time']}-{ts['to_time']} | {ts.get('hours', 0)}h\n"
                     if len(timesheets) > 3:
                         message += f"\n... and {len(timesheets) - 3} more pending timesheets"
                 else:
@@ -1088,13 +989,14 @@ class ActionGetEmailContext(Action):
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         try:
+            client = backend.acting_for(tracker)
             email_id = tracker.get_slot("email_id") or "1"
             
-            response = requests.get(f"{BACKEND_BASE_URL}/emails/{email_id}/context")
+            response = client.get_email_context(email_id)
             
             if response.status_code == 200:
                 email = response.json()
-                message = f"📧 Email Context:\n\n📝 Subject: {email.get('subject', 'No subject')}\n📄 Content: {email.get('content', 'No content')}\n📧 Recipient: {email.get('recipient', 'N/A')}\n📊 Status: {email.get('status', 'N/A')}"
+                message = f"📧 Email Context:\n\n📝 Subject: {email.get('subject', 'No subject')}\n📄 Content: {email.get('message', 'No content')}\n📧 Recipient: {email.get('email', 'N/A')}\n📊 Status: {email.get('status', 'N/A')}"
                 dispatcher.utter_message(text=message)
             else:
                 dispatcher.utter_message(text="❌ Could not retrieve email context.")
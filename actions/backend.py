@@ -0,0 +1,387 @@
+# Client for the backend API used by the custom actions.
+#
+# BACKEND_MODE selects how actions reach the backend:
+#   http    (default) HTTP to BACKEND_BASE_URL, on one of these transports:
+#             BACKEND_UDS=/path.sock  HTTP/1.1 over the Unix domain socket the
+#                                     backend listens on (run_server.py --uds),
+#                                     for a backend on the same host
+#             BACKEND_HTTP2=true      HTTP/2 to a remote backend; concurrent
+#                                     calls share one multiplexed connection
+#             otherwise               HTTP/1.1 keep-alive over TCP
+#   direct  call the backend service layer (backend/app/services) in this
+#           process, with its own pooled database session; for deployments
+#           where the action server runs next to the backend and can reach
+#           its database (DATABASE_URL etc. must be set for the action server).
+#           The backend's stack cannot be installed next to rasa 3.6, so the
+#           action server then runs from actions/requirements-direct.txt
+#
+# Over HTTP the client speaks MessagePack (backend/app/content.py, with the
+# encoding itself in backend/app/wire.py, imported from BACKEND_PATH): request
+# bodies are packed and responses asked for with Accept: application/msgpack,
+# falling back to JSON for anything the backend answers in JSON (errors,
+# older backends). Dates and times arrive as date/time/datetime objects
+# rather than ISO strings. BACKEND_MSGPACK=false switches back to plain JSON.
+#
+# Create and bulk calls take an idempotency_key (see turn_key): the backend
+# runs a request with a given key once and replays its outcome to retries
+# (backend/app/idempotency.py). With a key, the HTTP client retries writes
+# that time out or fail in transit, BACKEND_WRITE_RETRIES times.
+#
+# The backend tells clients apart for rate limits and read-your-writes
+# (backend/app/ratelimit.py). Actions therefore call through
+# backend.acting_for(tracker), which sends the conversation's sender in
+# X-End-User, vouched for by the ACTION_SERVER_TOKEN secret shared with the
+# backend.
+#
+# Both clients have the same methods and return an object with
+# `status_code` and `json()`, so actions handle results the same way in
+# either mode.
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Text
+import hashlib
+import logging
+import os
+import copy
+import sys
+import time
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+BACKEND_MODE = os.getenv("BACKEND_MODE", "http").lower()
+BACKEND_BASE_URL = os.getenv("BACKEND_BASE_URL", "http://localhost:8000")
+BACKEND_UDS = os.getenv("BACKEND_UDS") or None
+BACKEND_HTTP2 = os.getenv("BACKEND_HTTP2", "false").lower() == "true"
+# Upper bound for slow calls like send-pending; creates use 5 seconds
+BACKEND_TIMEOUT = float(os.getenv("BACKEND_TIMEOUT", "30"))
+BACKEND_MSGPACK = os.getenv("BACKEND_MSGPACK", "true").lower() == "true"
+BACKEND_WRITE_RETRIES = int(os.getenv("BACKEND_WRITE_RETRIES", "2"))
+ACTION_SERVER_TOKEN = os.getenv("ACTION_SERVER_TOKEN") or None
+BACKEND_PATH = os.getenv(
+    "BACKEND_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+)
+if BACKEND_PATH not in sys.path:
+    sys.path.append(BACKEND_PATH)
+
+# The MessagePack date/time encoding, shared with the backend so the two
+# sides cannot drift; app.wire needs nothing beyond msgpack
+from app import wire  # noqa: E402
+
+
+# Raised by the HTTP client when the backend cannot be reached or times out
+BackendUnavailable = httpx.TransportError
+
+def turn_key(tracker, action: Text) -> Text:
+    """Idempotency key for one action's write in one conversation turn.
+
+    The turn is the latest user message, so re-running the action for the
+    same message reuses the key while the next message gets a new one.
+    """
+    turn = (tracker.latest_message or {}).get("message_id")
+    if not turn:
+        turn = next((event.get("timestamp") for event in reversed(tracker.events) if event.get("event") == "user"), "")
+    return hashlib.sha256(f"{tracker.sender_id}:{turn}:{action}".encode()).hexdigest()[:32]
+
+
+MSGPACK = "application/msgpack"
+
+
+class BackendResponse:
+    """The part of an HTTP response the actions use."""
+
+    def __init__(self, status_code: int, data: Any, headers: Optional[Dict[Text, Text]] = None):
+        self.status_code = status_code
+        self.data = data
+        self.headers = headers or {}
+
+    def json(self):
+        return self.data
+
+
+class HttpBackend:
+    def __init__(self, base_url: Text = BACKEND_BASE_URL, uds: Optional[Text] = BACKEND_UDS,
+                 http2: bool = BACKEND_HTTP2, use_msgpack: bool = BACKEND_MSGPACK):
+        # Pooled keep-alive connections instead of a new connection per call
+        if uds:
+            # base_url still provides the Host header; the bytes go over the socket
+            self.transport = "uds"
+            self.client = httpx.Client(
+                base_url=base_url, transport=httpx.HTTPTransport(uds=uds), timeout=BACKEND_TIMEOUT
+            )
+        elif http2:
+            # Plain http:// needs prior-knowledge h2c; https negotiates h2 via ALPN
+            self.transport = "http2"
+            self.client = httpx.Client(
+                base_url=base_url, http2=True, http1=base_url.startswith("https"), timeout=BACKEND_TIMEOUT
+            )
+        else:
+            self.transport = "http1.1"
+            self.client = httpx.Client(base_url=base_url, timeout=BACKEND_TIMEOUT)
+        self.use_msgpack = use_msgpack
+        if use_msgpack:
+            # JSON stays acceptable so error responses are still understood
+            self.client.headers["Accept"] = f"{MSGPACK}, application/json;q=0.5"
+        # Per end user; acting_for() copies the client with its own headers
+        self.headers: Dict[Text, Text] = {}
+
+    def acting_for(self, tracker) -> "HttpBackend":
+        """This client, sending its requests on behalf of the conversation's user."""
+        if not ACTION_SERVER_TOKEN:
+            return self
+        view = copy.copy(self)
+        view.headers = {"X-End-User": tracker.sender_id, "X-Action-Server-Token": ACTION_SERVER_TOKEN}
+        return view
+
+    def _decode(self, response: httpx.Response):
+        if response.headers.get("content-type", "").startswith(MSGPACK):
+            data = wire.unpackb(response.content)
+            return BackendResponse(response.status_code, data, response.headers)
+        return response
+
+    def _get(self, path: Text, **kwargs):
+        kwargs["headers"] = self.headers
+        try:
+            return self._decode(self.client.get(path, **kwargs))
+        except httpx.RemoteProtocolError:
+            # The server closed a kept-alive connection (restart, GOAWAY);
+            # reads are safe to send again on a fresh one
+            return self._decode(self.client.get(path, **kwargs))
+
+    def _post(self, path: Text, json: Optional[Dict[Text, Any]] = None, idempotency_key: Optional[Text] = None,
+              **kwargs):
+        headers = dict(self.headers)
+        if json is not None and self.use_msgpack:
+            kwargs["content"] = wire.packb(json)
+            headers["Content-Type"] = MSGPACK
+        elif json is not None:
+            kwargs["json"] = json
+        if not idempotency_key:
+            return self._decode(self.client.post(path, headers=headers, **kwargs))
+        headers["Idempotency-Key"] = idempotency_key
+        for attempt in range(BACKEND_WRITE_RETRIES + 1):
+            try:
+                response = self.client.post(path, headers=headers, **kwargs)
+            except httpx.TransportError as e:
+                if attempt == BACKEND_WRITE_RETRIES:
+                    raise
+                logger.warning(f"Retrying POST {path} after {e!r}")
+                continue
+            # 409 with Retry-After: the first attempt is still running on the backend
+            if response.status_code == 409 and "retry-after" in response.headers and attempt < BACKEND_WRITE_RETRIES:
+                time.sleep(float(response.headers["retry-after"]))
+                continue
+            return self._decode(response)
+
+    def close(self):
+        self.client.close()
+
+    def list_timesheets(self):
+        return self._get("/timesheets/")
+
+    def list_pending_timesheets(self):
+        return self._get("/timesheets/pending")
+
+    def create_timesheet(self, data: Dict[Text, Any], idempotency_key: Optional[Text] = None):
+        return self._post("/timesheets/", json=data, idempotency_key=idempotency_key, timeout=5)
+
+    def approve_timesheet(self, timesheet_id, approver: Text):
+        return self._post(f"/timesheets/{timesheet_id}/approve", params={"approver": approver})
+
+    def send_pending_timesheets(self, approver: Text, idempotency_key: Optional[Text] = None):
+        return self._post("/timesheets/send-pending", params={"approver": approver}, idempotency_key=idempotency_key)
+
+    def list_leaves(self):
+        return self._get("/leaves/")
+
+    def create_leave(self, data: Dict[Text, Any], idempotency_key: Optional[Text] = None):
+        return self._post("/leaves/", json=data, idempotency_key=idempotency_key, timeout=5)
+
+    def list_emails(self):
+        return self._get("/emails/")
+
+    def create_email(self, data: Dict[Text, Any], idempotency_key: Optional[Text] = None):
+        return self._post("/emails/", json=data, idempotency_key=idempotency_key, timeout=5)
+
+    def get_email_context(self, email_id):
+        return self._get(f"/emails/{email_id}/context")
+
+    def list_tasks(self):
+        return self._get("/tasks/")
+
+    def create_task(self, data: Dict[Text, Any], idempotency_key: Optional[Text] = None):
+        return self._post("/tasks/", json=data, idempotency_key=idempotency_key)
+
+    def list_jobs(self):
+        return self._get("/jobs/")
+
+    def report(self, kind: Text, cursor: Optional[Text] = None, limit: int = 20):
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        return self._get(f"/reports/{kind}", params=params)
+
+
+class DirectBackend:
+    transport = "direct"
+
+    @staticmethod
+    def check_environment():
+        """Fail early when the backend's stack is missing or too old.
+
+        rasa 3.6 pins SQLAlchemy<1.5 and pydantic<1.10.10, so an action
+        server installed next to rasa cannot run the services; direct mode
+        needs its own environment (actions/requirements-direct.txt).
+        """
+        from importlib.metadata import PackageNotFoundError, version
+
+        problems = []
+        for package, major in (("fastapi", 0), ("SQLAlchemy", 2), ("pydantic", 2)):
+            try:
+                found = version(package)
+            except PackageNotFoundError:
+                problems.append(f"{package} is not installed")
+                continue
+            if int(found.split(".")[0]) < major:
+                problems.append(f"{package} {found} is older than {major}.0")
+        if problems:
+            raise RuntimeError(
+                f"BACKEND_MODE=direct needs the backend's requirements ({'; '.join(problems)}). "
+                "Install the action server from actions/requirements-direct.txt, separately from rasa."
+            )
+
+    def __init__(self, backend_path: Text = BACKEND_PATH):
+        self.check_environment()
+        if backend_path not in sys.path:
+            sys.path.append(backend_path)
+        # Imported here so HTTP mode does not need the backend's dependencies
+        from fastapi import HTTPException
+        from fastapi.encoders import jsonable_encoder
+        from pydantic import ValidationError
+        from app.services import emails, jobs, leaves, service_session, tasks, timesheet
+        from app.idempotency import execute
+        from app.reports import report_page
+        from app.schemas.emails import EmailCreate
+        from app.schemas.leaves import LeaveCreate
+        from app.schemas.tasks import TaskCreate
+        from app.schemas.timesheet import TimesheetCreate
+
+        self.HTTPException = HTTPException
+        self.ValidationError = ValidationError
+        self.encode = jsonable_encoder
+        self.session = service_session
+        self.idempotent = execute
+        self.report_page = report_page
+        self.emails, self.jobs, self.leaves, self.tasks, self.timesheets = emails, jobs, leaves, tasks, timesheet
+        self.EmailCreate, self.LeaveCreate, self.TaskCreate, self.TimesheetCreate = (
+            EmailCreate, LeaveCreate, TaskCreate, TimesheetCreate
+        )
+
+    def _call(self, fn: Callable, *args, timeout_ms: Optional[int] = None) -> BackendResponse:
+        """Run a service function and map its outcome to what the route would answer."""
+        try:
+            with (self.session(timeout_ms) if timeout_ms else self.session()) as db:
+                return BackendResponse(200, self.encode(fn(db, *args)))
+        except self.HTTPException as e:
+            return BackendResponse(e.status_code, {"detail": e.detail})
+        except Exception as e:
+            logger.error(f"Backend call {fn.__name__} failed: {e}")
+            return BackendResponse(500, {"detail": str(e)})
+
+    def _once(self, scope: Text, idempotency_key: Optional[Text], fn: Callable, params: Dict[Text, Any]) -> Callable:
+        """Wrap a service function so it honours the key like the route does."""
+        if not idempotency_key:
+            return fn
+
+        def run(db, *args):
+            return self.idempotent(scope, idempotency_key, params, lambda: fn(db, *args))[0]
+        run.__name__ = fn.__name__
+        return run
+
+    def _create(self, fn: Callable, schema, data: Dict[Text, Any], scope: Text,
+                idempotency_key: Optional[Text] = None) -> BackendResponse:
+        try:
+            payload = schema(**data)
+        except self.ValidationError as e:
+            # Same status and shape as FastAPI's request validation error
+            return BackendResponse(422, {"detail": self.encode(e.errors(include_url=False))})
+        # The route's fingerprint covers its body parameter, named after the entity
+        params = {fn.__name__.replace("create_", ""): payload}
+        return self._call(self._once(scope, idempotency_key, fn, params), payload)
+
+    def list_timesheets(self):
+        return self._call(self.timesheets.list_timesheets)
+
+    def list_pending_timesheets(self):
+        return self._call(self.timesheets.list_pending_timesheets)
+
+    def create_timesheet(self, data: Dict[Text, Any], idempotency_key: Optional[Text] = None):
+        return self._create(self.timesheets.create_timesheet, self.TimesheetCreate, data,
+                            "timesheets.create", idempotency_key)
+
+    def approve_timesheet(self, timesheet_id, approver: Text):
+        return self._call(self.timesheets.approve_timesheet, int(timesheet_id), approver)
+
+    def send_pending_timesheets(self, approver: Text, idempotency_key: Optional[Text] = None):
+        fn = self._once("timesheets.send_pending", idempotency_key, self.timesheets.send_pending_timesheets,
+                        {"approver": approver})
+        return self._call(fn, approver, timeout_ms=30000)
+
+    def list_leaves(self):
+        return self._call(self.leaves.list_leaves)
+
+    def create_leave(self, data: Dict[Text, Any], idempotency_key: Optional[Text] = None):
+        return self._create(self.leaves.create_leave, self.LeaveCreate, data, "leaves.create", idempotency_key)
+
+    def list_emails(self):
+        return self._call(self.emails.list_emails, timeout_ms=4000)
+
+    def create_email(self, data: Dict[Text, Any], idempotency_key: Optional[Text] = None):
+        return self._create(self.emails.create_email, self.EmailCreate, data, "emails.create", idempotency_key)
+
+    def get_email_context(self, email_id):
+        return self._call(self.emails.get_email, int(email_id))
+
+    def list_tasks(self):
+        return self._call(self.tasks.list_tasks)
+
+    def create_task(self, data: Dict[Text, Any], idempotency_key: Optional[Text] = None):
+        return self._create(self.tasks.create_task, self.TaskCreate, data, "tasks.create", idempotency_key)
+
+    def list_jobs(self):
+        return self._call(self.jobs.list_jobs)
+
+    def report(self, kind: Text, cursor: Optional[Text] = None, limit: int = 20):
+        return self._call(self.report_page, kind, cursor, limit)
+
+    def acting_for(self, tracker) -> "DirectBackend":
+        # In-process calls skip the routes, so no rate limits or replicas apply
+        return self
+
+    def close(self):
+        pass
+
+
+_fan_out_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="backend")
+
+
+def fan_out(*calls: Callable[[], Any]) -> List[Any]:
+    """Run independent backend calls concurrently and return their results in order.
+
+    Over HTTP/2 the calls are multiplexed on one connection; over HTTP/1.1
+    (TCP or Unix socket) each takes a pooled keep-alive connection.
+    """
+    return list(_fan_out_pool.map(lambda call: call(), calls))
+
+
+def make_backend():
+    if BACKEND_MODE == "direct":
+        logger.info("Actions call the backend services in-process")
+        return DirectBackend()
+    client = HttpBackend()
+    logger.info(f"Actions call the backend at {BACKEND_BASE_URL} over {client.transport}")
+    return client
+
+
+backend = make_backend()
@@ -0,0 +1,159 @@
+# Benchmark of NLU parse latency for two model configurations.
+#
+# Trains one model per config on the same data, by default Rasa's defaults
+# (config_default.yml) against the tuned production config (config.yml):
+#   training data   a stratified split of data/nlu.yml (--test-fraction is
+#                   held out) plus data/stories.yml and data/rules.yml
+#
+# then loads each model in a fresh process and reports:
+#   size       size of the model archive
+#   load       Agent.load time
+#   p50/p99    parse latency over --rounds passes of the held-out utterances;
+#              the first pass is all novel text, later passes are repeats
+#              (served by the intent cache where the config has one)
+#   accuracy   intent accuracy on the held-out utterances, first pass
+#
+# --save writes the results; --baseline compares against a saved run and
+# exits 1 when a config got slower (p99 by more than --latency-tolerance) or
+# less accurate (by more than --accuracy-tolerance), so it can gate a rollout.
+#
+# Usage (from the repository root, with rasa installed):
+#   python -m actions.benchmark_nlu
+#   python -m actions.benchmark_nlu --rounds 50 --save nlu_bench.json
+#   python -m actions.benchmark_nlu --configs config.yml --baseline nlu_bench.json
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIGS = ("config_default.yml", "config.yml")
+
+
+def split_data(nlu_path, test_fraction, seed, workdir):
+    from rasa.shared.nlu.training_data.loading import load_data
+
+    train, test = load_data(nlu_path).train_test_split(train_frac=1 - test_fraction, random_seed=seed)
+    train_path = os.path.join(workdir, "nlu_train.yml")
+    train.persist_nlu(train_path)
+    test_path = os.path.join(workdir, "nlu_test.json")
+    with open(test_path, "w") as f:
+        json.dump([[example.get("text"), example.get("intent")] for example in test.intent_examples], f)
+    return train_path, test_path
+
+
+def train(config, train_path, workdir):
+    name = os.path.splitext(os.path.basename(config))[0]
+    subprocess.run(
+        [sys.executable, "-m", "rasa", "train", "--force", "--config", config,
+         "--domain", os.path.join(ROOT, "domain.yml"),
+         "--data", train_path, os.path.join(ROOT, "data", "stories.yml"), os.path.join(ROOT, "data", "rules.yml"),
+         "--out", workdir, "--fixed-model-name", name],
+        cwd=ROOT, check=True,
+    )
+    return os.path.join(workdir, f"{name}.tar.gz")
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def measure(model_path, test_path, rounds):
+    """Runs in its own process (see --measure) so every model loads cold."""
+    from rasa.core.agent import Agent
+
+    with open(test_path) as f:
+        examples = json.load(f)
+    started = time.perf_counter()
+    agent = Agent.load(model_path)
+    load = time.perf_counter() - started
+
+    latencies, correct = [], 0
+    for number in range(rounds):
+        for text, intent in examples:
+            started = time.perf_counter()
+            parsed = await agent.parse_message(text)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if number == 0 and (parsed.get("intent") or {}).get("name") == intent:
+                correct += 1
+    return {
+        "size_mb": round(os.path.getsize(model_path) / 1024 / 1024, 2),
+        "load_s": round(load, 2),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "first_pass_p50_ms": round(statistics.median(latencies[:len(examples)]), 2),
+        "accuracy": round(correct / len(examples), 4),
+        "test_examples": len(examples),
+    }
+
+
+def regressions(results, baseline, latency_tolerance, accuracy_tolerance):
+    found = []
+    for config, result in results.items():
+        before = baseline.get(config)
+        if before is None:
+            continue
+        if result["p99_ms"] > before["p99_ms"] * (1 + latency_tolerance):
+            found.append(f"{config}: p99 {before['p99_ms']} -> {result['p99_ms']} ms")
+        if result["accuracy"] < before["accuracy"] - accuracy_tolerance:
+            found.append(f"{config}: accuracy {before['accuracy']} -> {result['accuracy']}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare parse latency, model size, load time and accuracy of NLU configs")
+    parser.add_argument("--configs", nargs="+", default=list(CONFIGS))
+    parser.add_argument("--nlu", default=os.path.join(ROOT, "data", "nlu.yml"))
+    parser.add_argument("--test-fraction", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file of an earlier run to check for regressions")
+    parser.add_argument("--latency-tolerance", type=float, default=0.2, help="Allowed relative p99 increase")
+    parser.add_argument("--accuracy-tolerance", type=float, default=0.02, help="Allowed absolute accuracy drop")
+    parser.add_argument("--measure", nargs=2, metavar=("MODEL", "TEST"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(asyncio.run(measure(*args.measure, args.rounds))))
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        train_path, test_path = split_data(args.nlu, args.test_fraction, args.seed, workdir)
+        for config in args.configs:
+            model_path = train(os.path.abspath(config), train_path, workdir)
+            output = subprocess.run(
+                [sys.executable, "-m", "actions.benchmark_nlu", "--rounds", str(args.rounds), "--measure", model_path, test_path],
+                cwd=ROOT, check=True, stdout=subprocess.PIPE, text=True,
+            ).stdout
+            results[config] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{'config':<22} {'size MB':>8} {'load s':>7} {'p50 ms':>7} {'p99 ms':>7} {'novel p50':>10} {'accuracy':>9}")
+    for config, result in results.items():
+        print(f"{config:<22} {result['size_mb']:>8} {result['load_s']:>7} {result['p50_ms']:>7} {result['p99_ms']:>7}"
+              f" {result['first_pass_p50_ms']:>10} {result['accuracy']:>9}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.latency_tolerance, args.accuracy_tolerance)
+        for regression in found:
+            print(f"❌ {regression}")
+        if found:
+            sys.exit(1)
+        print("✅ No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
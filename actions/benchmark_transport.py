@@ -0,0 +1,159 @@
+# Benchmark of the action server -> backend transports.
+#
+# Starts the backend (backend/run_server.py) once per server flavour,
+# seeds some rows, then measures the ActionGetAllData fan-out (the five list
+# calls it makes) over each transport:
+#   http1.1  HTTP/1.1 keep-alive over loopback TCP (uvicorn)
+#   uds      HTTP/1.1 over a Unix domain socket (uvicorn)
+#   http2    h2c, all calls multiplexed on one connection (hypercorn)
+#   direct   in-process service calls, no HTTP at all
+#
+# Reported per transport: latency of a single list call, latency of the
+# fan-out (calls run concurrently, as the action does), and throughput in
+# fan-outs per second with --concurrency conversations in parallel. List
+# responses come from the backend's response cache after the first call, so
+# the numbers are dominated by transport and framing costs.
+#
+# Usage (from the repository root, in the direct-mode action-server
+# environment, actions/requirements-direct.txt, plus hypercorn for http2; the
+# rasa environment cannot import the backend):
+#   DATABASE_URL=sqlite:////tmp/bench.db python -m actions.benchmark_transport
+#   python -m actions.benchmark_transport --rounds 500 --concurrency 16 --transports uds http2
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+from actions.backend import BACKEND_PATH, DirectBackend, HttpBackend, fan_out
+
+TRANSPORTS = ("http1.1", "uds", "http2", "direct")
+
+
+def start_server(port, *extra):
+    process = subprocess.Popen(
+        [sys.executable, "run_server.py", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", *extra],
+        cwd=BACKEND_PATH,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"backend exited with {process.returncode}")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=1)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("backend did not start")
+
+
+def seed(rows):
+    # In-process, so the rate limits on the create routes do not apply
+    direct = DirectBackend()
+    for i in range(rows):
+        direct.create_task({"user_id": f"user{i % 10}", "email": "bench@example.com",
+                            "title": f"Task {i}", "description": "benchmark"})
+        direct.create_timesheet({"user_id": f"user{i % 10}", "email": "bench@example.com",
+                                 "date": f"2024-01-{i // 10 % 28 + 1:02d}", "from_time": f"{i % 10 + 8:02d}:00",
+                                 "to_time": f"{i % 10 + 8:02d}:30", "task_summary": "benchmark",
+                                 "description": "benchmark"})
+
+
+def get_all_data(client):
+    responses = fan_out(client.list_timesheets, client.list_leaves, client.list_emails,
+                        client.list_tasks, client.list_jobs)
+    for response in responses:
+        if response.status_code != 200:
+            raise RuntimeError(f"backend answered {response.status_code}")
+
+
+def percentiles(samples):
+    cuts = statistics.quantiles(samples, n=100)
+    return statistics.median(samples) * 1000, cuts[98] * 1000
+
+
+def timed(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def throughput(client, rounds, concurrency):
+    def conversation():
+        for _ in range(rounds // concurrency):
+            get_all_data(client)
+    threads = [threading.Thread(target=conversation) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return rounds // concurrency * concurrency / (time.perf_counter() - start)
+
+
+def measure(name, client, rounds, concurrency):
+    for _ in range(20):  # warm connections and the response cache
+        get_all_data(client)
+    call_p50, call_p99 = percentiles(timed(client.list_timesheets, rounds))
+    fan_p50, fan_p99 = percentiles(timed(lambda: get_all_data(client), rounds))
+    rate = throughput(client, rounds, concurrency)
+    print(f"{name:<8} {call_p50:>8.2f} {call_p99:>8.2f} {fan_p50:>9.2f} {fan_p99:>9.2f} {rate:>12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare backend transports for the ActionGetAllData fan-out")
+    parser.add_argument("--rounds", type=int, default=300, help="Samples per measurement")
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel conversations for throughput")
+    parser.add_argument("--seed", type=int, default=100, help="Rows created per entity before measuring")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--transports", nargs="+", choices=TRANSPORTS, default=list(TRANSPORTS))
+    args = parser.parse_args()
+    if not os.getenv("DATABASE_URL"):
+        parser.error("set DATABASE_URL to the database the benchmark backend should use")
+
+    socket_path = os.path.join(tempfile.mkdtemp(), "backend.sock")
+    base_url = f"http://127.0.0.1:{args.port}"
+    print(f"ActionGetAllData fan-out, {args.rounds} rounds, {args.concurrency} conversations (times in ms)")
+    print(f"{'':<8} {'call p50':>8} {'call p99':>8} {'fan p50':>9} {'fan p99':>9} {'fan-outs/s':>12}")
+
+    seeded = False
+    if {"http1.1", "uds", "direct"} & set(args.transports):
+        server = start_server(args.port, "--uds", socket_path)
+        try:
+            if args.seed:
+                seed(args.seed)
+                seeded = True
+            for name, client in (("http1.1", HttpBackend(base_url)), ("uds", HttpBackend(base_url, uds=socket_path)),
+                                 ("direct", DirectBackend())):
+                if name in args.transports:
+                    measure(name, client, args.rounds, args.concurrency)
+                    client.close()
+        finally:
+            server.terminate()
+            server.wait()
+
+    if "http2" in args.transports:
+        server = start_server(args.port, "--http2")
+        try:
+            if args.seed and not seeded:
+                seed(args.seed)
+            client = HttpBackend(base_url, http2=True)
+            measure("http2", client, args.rounds, args.concurrency)
+            client.close()
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# Counts the action-server webhook calls and policy predictions per conversation.
+#
+# Plays scripted conversations against a running Rasa server over the REST
+# channel, then reads each conversation's tracker (GET
+# /conversations/<id>/tracker, needs `rasa run --enable-api`) and counts:
+#   webhook calls  executed actions that run on the action server: the
+#                  custom actions and form validation actions listed under
+#                  `actions:` in domain.yml
+#   predictions    executed actions chosen by a policy (forced followups and
+#                  the form's own steps have no policy)
+#
+# Run it once per model to compare two versions of the assistant, e.g.
+# before and after moving the create flows to forms:
+#   rasa train && rasa run --enable-api &   rasa run actions &
+#   python -m actions.measure_webhook_calls --save forms.json
+#   python -m actions.measure_webhook_calls --compare chains.json
+#
+# Sender ids are random, so runs do not share slots.
+
+import argparse
+import json
+import os
+import uuid
+
+import httpx
+import yaml
+
+DOMAIN_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "domain.yml")
+
+CONVERSATIONS = {
+    "timesheet, one message": ["log my timesheet for today from 9am to 5pm coding"],
+    "timesheet, step by step": ["create a timesheet for today", "9:00", "17:00", "coding"],
+    "leave, one message": ["request sick leave from tomorrow to next week"],
+    "leave, step by step": ["request leave for tomorrow", "same day", "sick leave", "I'm not feeling well"],
+    "email, step by step": ["create an email to manager", "work update", "please review the project"],
+    "task, step by step": ["create a task", "Prepare the release notes"],
+}
+
+
+def webhook_actions(domain_path):
+    with open(domain_path) as f:
+        return set(yaml.safe_load(f).get("actions", []))
+
+
+def play(client, messages):
+    sender = f"measure-{uuid.uuid4().hex[:12]}"
+    for message in messages:
+        client.post("/webhooks/rest/webhook", json={"sender": sender, "message": message}).raise_for_status()
+    response = client.get(f"/conversations/{sender}/tracker")
+    response.raise_for_status()
+    return [event for event in response.json()["events"] if event.get("event") == "action"]
+
+
+def count(actions, remote):
+    return {
+        "webhook_calls": sum(1 for event in actions if event.get("name") in remote),
+        "predictions": sum(1 for event in actions if event.get("policy")),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count action-server calls per scripted conversation")
+    parser.add_argument("--rasa-url", default=os.getenv("RASA_URL", "http://localhost:5005"))
+    parser.add_argument("--domain", default=DOMAIN_PATH)
+    parser.add_argument("--save", help="Write the counts to this JSON file")
+    parser.add_argument("--compare", help="JSON file of an earlier run to show the difference against")
+    args = parser.parse_args()
+
+    remote = webhook_actions(args.domain)
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = {}
+    with httpx.Client(base_url=args.rasa_url, timeout=60) as client:
+        for name, messages in CONVERSATIONS.items():
+            results[name] = count(play(client, messages), remote)
+
+    print(f"{'conversation':<26} {'turns':>5} {'webhook calls':>14} {'predictions':>12}" + ("   saved calls" if baseline else ""))
+    for name, counts in results.items():
+        line = f"{name:<26} {len(CONVERSATIONS[name]):>5} {counts['webhook_calls']:>14} {counts['predictions']:>12}"
+        if name in baseline:
+            line += f" {baseline[name]['webhook_calls'] - counts['webhook_calls']:>13}"
+        print(line)
+    calls = sum(counts["webhook_calls"] for counts in results.values())
+    print(f"{'total':<26} {sum(map(len, CONVERSATIONS.values())):>5} {calls:>14}"
+          f" {sum(counts['predictions'] for counts in results.values()):>12}"
+          + (f" {sum(b['webhook_calls'] for b in baseline.values()) - calls:>13}" if baseline else ""))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# Paged, size-bounded rendering of the detailed admin reports.
+#
+# The backend serves each report a page of rows at a time, grouped
+# (GET /reports/<kind>, backend/app/reports.py): every group comes with its
+# totals, its rows on the page and a cursor after each row. A page is
+# rendered into one chat message of at most REPORT_MAX_CHARS characters,
+# built from a list of fragments joined once at the end. Rows that do not
+# fit wait for the next message, even in the middle of a group: the cursor
+# to continue from is kept in the report_continuation slot, and "show more"
+# (ActionShowMoreReport) fetches the next page with it.
+#
+#   REPORT_MAX_CHARS  size cap of one report message (default 4000)
+#   REPORT_PAGE_ROWS  rows fetched per page (default 20)
+
+import os
+from typing import Any, Callable, Dict, List, Optional, Text, Tuple
+
+REPORT_MAX_CHARS = int(os.getenv("REPORT_MAX_CHARS", "4000"))
+REPORT_PAGE_ROWS = int(os.getenv("REPORT_PAGE_ROWS", "20"))
+CONTINUATION_SLOT = "report_continuation"
+MORE_HINT = "➡️ Say **show more** for the next page."
+
+
+def render_page(title: Text, page: Dict[Text, Any], render_group: Callable[[Dict[Text, Any]], List[Text]],
+                max_chars: int = REPORT_MAX_CHARS) -> Tuple[Text, Optional[Text]]:
+    """Render as many rows of `page` as fit in `max_chars`.
+
+    Returns the message and the cursor to continue from, or None when the
+    report is complete. A group that does not fit is shown with as many of
+    its rows as fit. The first row is always shown, cut to the lines that fit
+    if need be, so every page makes progress.
+    """
+    budget = max_chars - len(title) - len(MORE_HINT)
+    fragments = [title]
+    groups = page.get("groups") or []
+    cursor = page.get("next_cursor")
+    for index, group in enumerate(groups):
+        shown = len(group["items"])
+        lines = render_group(group)
+        size = sum(map(len, lines))
+        while size > budget and shown > 1:
+            shown -= 1
+            lines = render_group({**group, "items": group["items"][:shown]})
+            size = sum(map(len, lines))
+        cut = size > budget
+        if cut and index > 0:
+            cursor = groups[index - 1]["cursor"]
+            break
+        if cut:
+            for line in lines:
+                if len(line) > budget:
+                    break
+                fragments.append(line)
+                budget -= len(line)
+        else:
+            fragments.extend(lines)
+            budget -= size
+        if cut or shown < len(group["items"]):
+            if shown < len(group["items"]) or index + 1 < len(groups) or cursor:
+                cursor = group["item_cursors"][shown - 1]
+            break
+    if cursor:
+        fragments.append(MORE_HINT)
+    return "".join(fragments), cursor
@@ -0,0 +1,186 @@
+"""
+Admission control for the API.
+
+Every request is put in a lane before it reaches a route handler:
+    priority  /auth/*, /health*, /       (never queued behind the others)
+    bulk      whole-table operations (send-pending, sync reminders, archive reads)
+    write     other POST/PUT/PATCH/DELETE
+    read      everything else
+
+Each lane runs at most `limit` requests at once. Up to `queue` more wait for
+a slot; a request that cannot get one within `timeout` seconds, or that
+finds the queue full, is answered at once with 503 and a Retry-After header
+instead of piling up in the threadpool and on the connection pool. Keep the
+read + write + bulk limits at or below the database pool size so admitted
+requests do not wait for a connection as well.
+
+With group commit (app/group_commit.py) the write lane's default limit is
+raised to GROUP_COMMIT_MAX_BATCH: the writes admitted at once are what a
+batch can merge, so a smaller limit would cap every batch at that size.
+
+Limits come from the environment, e.g. ADMISSION_READ_LIMIT=24,
+ADMISSION_READ_QUEUE=100, ADMISSION_QUEUE_TIMEOUT=2. ADMISSION_ENABLED=false
+turns the middleware into a pass-through.
+"""
+
+import asyncio
+import json
+import math
+import os
+from typing import Dict, Optional
+from app.group_commit import GROUP_COMMIT_ENABLED, GROUP_COMMIT_MAX_BATCH
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
+
+# lane -> (concurrent requests, queued requests)
+LANE_DEFAULTS = {
+    "priority": (16, 64),
+    "read": (8, 64),
+    "write": (4, 32),
+    "bulk": (1, 4),
+}
+if GROUP_COMMIT_ENABLED:
+    LANE_DEFAULTS["write"] = (max(LANE_DEFAULTS["write"][0], GROUP_COMMIT_MAX_BATCH),
+                              max(LANE_DEFAULTS["write"][1], GROUP_COMMIT_MAX_BATCH))
+
+PRIORITY_PREFIXES = ("/auth", "/health", "/docs", "/openapi.json")
+BULK_ROUTES = {
+    ("POST", "/timesheets/send-pending"),
+    ("POST", "/emails/remind-pending-timesheets"),
+    ("GET", "/emails/remind-pending-timesheets"),
+    ("GET", "/emails/submit-pending-timesheets"),
+}
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+class Lane:
+    def __init__(self, name: str, limit: int, queue: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created on first use so it belongs to the server's event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        return self._semaphore
+
+    async def acquire(self) -> bool:
+        if self.semaphore.locked() and self.waiting >= self.queue:
+            self.rejected += 1
+            return False
+        self.waiting += 1
+        # A task and asyncio.wait, not asyncio.wait_for: before 3.12 that can
+        # time out after the semaphore was granted and lose the permit for
+        # good (asyncio.timeout would fix it but needs 3.11)
+        acquiring = asyncio.ensure_future(self.semaphore.acquire())
+        try:
+            await asyncio.wait({acquiring}, timeout=self.timeout)
+        except BaseException:
+            # Cancelled while waiting: drop the request, or hand back the
+            # permit if it was granted in the meantime
+            if not acquiring.cancel() and not acquiring.cancelled():
+                self.semaphore.release()
+            raise
+        finally:
+            self.waiting -= 1
+        if not acquiring.done():
+            # A cancelled Semaphore.acquire() passes on a permit it was
+            # just given, so nothing leaks here either
+            acquiring.cancel()
+            self.rejected += 1
+            return False
+        self.active += 1
+        self.admitted += 1
+        return True
+
+    def release(self):
+        self.active -= 1
+        self.semaphore.release()
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.timeout))
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "queue": self.queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+def _lane_from_env(name: str) -> Lane:
+    limit, queue = LANE_DEFAULTS[name]
+    lane = Lane(
+        name,
+        int(os.getenv(f"ADMISSION_{name.upper()}_LIMIT", str(limit))),
+        int(os.getenv(f"ADMISSION_{name.upper()}_QUEUE", str(queue))),
+        ADMISSION_QUEUE_TIMEOUT,
+    )
+    if name == "write" and GROUP_COMMIT_ENABLED and lane.limit < GROUP_COMMIT_MAX_BATCH:
+        print(f"⚠️ ADMISSION_WRITE_LIMIT={lane.limit} caps group commit batches below "
+              f"GROUP_COMMIT_MAX_BATCH={GROUP_COMMIT_MAX_BATCH}")
+    return lane
+
+def classify(method: str, path: str, query_string: bytes = b"") -> str:
+    """Pick the lane for a request."""
+    path = path.rstrip("/") or "/"
+    if path == "/" or path.startswith(PRIORITY_PREFIXES):
+        return "priority"
+    if (method, path) in BULK_ROUTES or b"include_archive=true" in query_string:
+        return "bulk"
+    if method in WRITE_METHODS:
+        return "write"
+    return "read"
+
+class AdmissionControlMiddleware:
+    """Pure ASGI middleware, so a rejected request costs no handler or session."""
+
+    def __init__(self, app, lanes: Optional[Dict[str, Lane]] = None, enabled: bool = ADMISSION_ENABLED):
+        self.app = app
+        self.enabled = enabled
+        self.lanes = lanes or {name: _lane_from_env(name) for name in LANE_DEFAULTS}
+        admission_stats.update(self.lanes)
+
+    async def __call__(self, scope, receive, send):
+        # CORS preflights never reach a handler, so they are not limited
+        if not self.enabled or scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        lane = self.lanes[classify(scope["method"], scope["path"], scope.get("query_string", b""))]
+        if not await lane.acquire():
+            await self._reject(lane, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            lane.release()
+
+    async def _reject(self, lane: Lane, send):
+        body = json.dumps({"detail": f"Server busy ({lane.name} requests), please retry"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(lane.retry_after()).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+# Lanes of the installed middleware, for GET /health/admission
+admission_stats: Dict[str, Lane] = {}
+
+def admission_snapshot() -> dict:
+    return {name: lane.stats() for name, lane in admission_stats.items()}
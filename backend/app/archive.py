@@ -0,0 +1,131 @@
+"""
+Cold-archive tier for closed months of timesheets and emails.
+
+Archived rows live in gzip-compressed JSONL files, one per table and month:
+ARCHIVE_DIR/<table>/<YYYY-MM>.jsonl.gz. They are removed from the database
+and only read back when a route is called with include_archive=true.
+"""
+
+import gzip
+import json
+import os
+from datetime import date, datetime, timedelta
+from sqlalchemy.orm import Session
+from app.cache import invalidate
+from app.models.timesheet import Timesheet
+from app.models.emails import Email
+from app.outbox import QUEUED, SENDING
+from app.partitioning import month_start, next_month, months_between
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "archive"))
+
+ARCHIVED_MODELS = {
+    "timesheets": (Timesheet, Timesheet.date),
+    "emails": (Email, Email.created_at),
+}
+
+def archive_path(table: str, month: date) -> str:
+    return os.path.join(ARCHIVE_DIR, table, f"{month:%Y-%m}.jsonl.gz")
+
+def _to_json(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value.strftime("%H:%M:%S") if hasattr(value, "strftime") else str(value)
+
+def _write_rows(path: str, rows):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, default=_to_json) + "\n")
+    os.replace(tmp_path, path)
+
+def _read_rows(path: str):
+    if not os.path.exists(path):
+        return []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def archive_month(db: Session, table: str, month: date) -> int:
+    """Move one month of rows into its archive file. Returns the number moved."""
+    model, column = ARCHIVED_MODELS[table]
+    month = month_start(month)
+    query = db.query(model).filter(column >= month, column < next_month(month))
+    rows = [
+        {c.name: getattr(obj, c.name) for c in model.__table__.columns}
+        for obj in query.order_by(model.id).all()
+    ]
+    if not rows:
+        return 0
+
+    # Re-running for a month merges with what was archived before
+    path = archive_path(table, month)
+    _write_rows(path, _read_rows(path) + rows)
+    query.delete(synchronize_session=False)
+    db.commit()
+    invalidate(table)
+    return len(rows)
+
+def read_archived(table: str, start: date = None, end: date = None):
+    """Archived rows of a table, optionally limited to [start, end].
+
+    Only the files of the months inside the window are opened.
+    """
+    _, column = ARCHIVED_MODELS[table]
+    table_dir = os.path.join(ARCHIVE_DIR, table)
+    if not os.path.isdir(table_dir):
+        return []
+
+    paths = []
+    for name in sorted(os.listdir(table_dir)):
+        if not name.endswith(".jsonl.gz"):
+            continue
+        month = name[:7]
+        if start and month < f"{start:%Y-%m}":
+            continue
+        if end and month > f"{end:%Y-%m}":
+            continue
+        paths.append(os.path.join(table_dir, name))
+
+    rows = []
+    for path in paths:
+        for row in _read_rows(path):
+            day = row[column.key][:10]
+            if start and day < start.isoformat():
+                continue
+            if end and day > end.isoformat():
+                continue
+            rows.append(row)
+    return rows
+
+def closed_months(db: Session, table: str, keep_months: int = 2):
+    """Months old enough to archive: older than keep_months and without
+    rows still in flight (unsubmitted timesheets, emails the outbox has not
+    delivered yet)."""
+    model, column = ARCHIVED_MODELS[table]
+    cutoff = month_start(date.today())
+    for _ in range(keep_months - 1):
+        cutoff = month_start(cutoff - timedelta(days=1))
+
+    oldest = db.query(column).filter(column < cutoff).order_by(column).first()
+    if not oldest:
+        return []
+    oldest_day = oldest[0].date() if isinstance(oldest[0], datetime) else oldest[0]
+
+    months = []
+    for month in months_between(oldest_day, cutoff - timedelta(days=1)):
+        in_month = (column >= month, column < next_month(month))
+        if not db.query(model.id).filter(*in_month).first():
+            continue
+        if table == "timesheets":
+            pending = db.query(Timesheet.id).filter(*in_month, Timesheet.submitted == False).first()
+            if pending:
+                print(f"⚠️ Skipping {table} {month:%Y-%m}: unsubmitted timesheets remain")
+                continue
+        if table == "emails":
+            undelivered = db.query(Email.id).filter(*in_month, Email.delivery_status.in_((QUEUED, SENDING))).first()
+            if undelivered:
+                print(f"⚠️ Skipping {table} {month:%Y-%m}: emails are still waiting for delivery")
+                continue
+        months.append(month)
+    return months
@@ -0,0 +1,270 @@
+"""
+In-process response cache for hot read routes.
+
+GET handlers decorated with @cached("timesheets", ...) store their serialized
+body (JSON, or MessagePack for clients that ask for it, see app/content.py),
+keyed by route, format and normalized query parameters, in an LRU bounded
+by CACHE_MAX_BYTES with a per-entry TTL. Write handlers call
+invalidate("timesheets") after committing, which drops every entry tagged
+with that entity.
+
+Each entity has a generation counter; a response computed while an
+invalidation happened is returned but not stored, so a slow read cannot put
+stale data back into the cache. A response read from a replica is not stored
+either while the replica may still lag behind the last invalidation of one
+of its entities (REPLICA_LAG_WINDOW): it could predate the write and would
+otherwise be cached under the new generation.
+
+With several uvicorn workers, invalidations are also published through a
+broadcaster so the other processes drop their entries too:
+    CACHE_BROADCAST=local     in-process only (default, also used by tests)
+    CACHE_BROADCAST=postgres  Postgres LISTEN/NOTIFY on the main database
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+from app.singleflight import SingleFlight
+from app.content import MSGPACK, packb, wants_msgpack
+from app.database import replica_engines, shield_from_disconnect
+from app.replicas import REPLICA_LAG_WINDOW
+
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "30"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+CACHE_BROADCAST = os.getenv("CACHE_BROADCAST", "local")
+
+class ResponseCache:
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES, ttl: float = CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # key -> (expires_at, entities, body)
+        self.entries: "OrderedDict[str, Tuple[float, Tuple[str, ...], bytes]]" = OrderedDict()
+        self.size = 0
+        self.generations: Dict[str, int] = {}
+        # entity -> monotonic time of its last invalidation
+        self.invalidated_at: Dict[str, float] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def generation(self, entities: Iterable[str]) -> Tuple[int, ...]:
+        with self.lock:
+            return tuple(self.generations.get(entity, 0) for entity in entities)
+
+    def invalidated_within(self, entities: Iterable[str], seconds: float) -> bool:
+        since = time.monotonic() - seconds
+        with self.lock:
+            return any(self.invalidated_at.get(entity, float("-inf")) > since for entity in entities)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key: str, body: bytes, entities: Tuple[str, ...], generation: Tuple[int, ...],
+            ttl: Optional[float] = None):
+        if len(body) > self.max_bytes:
+            return
+        with self.lock:
+            # Skip the store if one of our entities was written meanwhile
+            if tuple(self.generations.get(entity, 0) for entity in entities) != generation:
+                return
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (time.monotonic() + (ttl or self.ttl), entities, body)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+
+    def invalidate_local(self, entities: Iterable[str]):
+        entities = set(entities)
+        with self.lock:
+            now = time.monotonic()
+            for entity in entities:
+                self.generations[entity] = self.generations.get(entity, 0) + 1
+                self.invalidated_at[entity] = now
+            for key in [k for k, (_, tags, _) in self.entries.items() if entities.intersection(tags)]:
+                self._remove(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def _remove(self, key: str):
+        _, _, body = self.entries.pop(key)
+        self.size -= len(body)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"entries": len(self.entries), "bytes": self.size, "hits": self.hits, "misses": self.misses}
+
+class LocalBroadcaster:
+    """In-process fan-out. Several caches subscribed to one instance behave
+    like several workers sharing a real broadcast channel."""
+
+    def __init__(self):
+        self.subscribers: List[Callable[[List[str]], None]] = []
+
+    def subscribe(self, callback: Callable[[List[str]], None]):
+        self.subscribers.append(callback)
+
+    def publish(self, entities: List[str]):
+        for callback in self.subscribers:
+            callback(entities)
+
+    def close(self):
+        self.subscribers.clear()
+
+class PostgresBroadcaster:
+    """Invalidations over Postgres LISTEN/NOTIFY, so every worker process
+    connected to the same database drops the same entries."""
+
+    CHANNEL = "cache_invalidation"
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.origin = uuid.uuid4().hex
+        self.subscribers: List[Callable[[List[str]], None]] = []
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._listen, name="cache-listener", daemon=True)
+        self.thread.start()
+
+    def subscribe(self, callback: Callable[[List[str]], None]):
+        self.subscribers.append(callback)
+
+    def publish(self, entities: List[str]):
+        # Local subscribers are told directly; the NOTIFY is for other processes
+        for callback in self.subscribers:
+            callback(entities)
+        payload = json.dumps({"origin": self.origin, "entities": list(entities)})
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql("SELECT pg_notify(%s, %s)", (self.CHANNEL, payload))
+
+    def _listen(self):
+        import select
+        while not self.stopping.is_set():
+            try:
+                raw = self.engine.raw_connection()
+                conn = raw.driver_connection
+                conn.autocommit = True
+                conn.cursor().execute(f"LISTEN {self.CHANNEL}")
+                while not self.stopping.is_set():
+                    if select.select([conn], [], [], 1.0)[0]:
+                        conn.poll()
+                        while conn.notifies:
+                            message = json.loads(conn.notifies.pop(0).payload)
+                            if message.get("origin") != self.origin:
+                                for callback in self.subscribers:
+                                    callback(message["entities"])
+            except Exception as e:
+                print(f"❌ Cache invalidation listener error: {e}")
+                self.stopping.wait(1.0)
+
+    def close(self):
+        self.stopping.set()
+
+response_cache = ResponseCache()
+# Concurrent misses on the same key share one query and one serialized body
+read_flights = SingleFlight()
+
+def read_path_stats() -> dict:
+    return {"cache": response_cache.stats(), "single_flight": read_flights.stats()}
+
+_broadcaster = None
+
+def set_broadcaster(broadcaster):
+    """Replace the invalidation channel (e.g. a shared LocalBroadcaster in tests)."""
+    global _broadcaster
+    if _broadcaster is not None:
+        _broadcaster.close()
+    _broadcaster = broadcaster
+    broadcaster.subscribe(response_cache.invalidate_local)
+
+def get_broadcaster():
+    if _broadcaster is None:
+        if CACHE_BROADCAST == "postgres":
+            from app.database import engine
+            set_broadcaster(PostgresBroadcaster(engine))
+        else:
+            set_broadcaster(LocalBroadcaster())
+    return _broadcaster
+
+def invalidate(*entities: str):
+    """Drop cached responses of the given entities here and in other workers."""
+    try:
+        get_broadcaster().publish(list(entities))
+    except Exception as e:
+        # Never fail a committed write because the broadcast failed
+        print(f"❌ Error broadcasting cache invalidation: {e}")
+        response_cache.invalidate_local(entities)
+
+def _cache_key(name: str, kwargs: dict) -> str:
+    params = []
+    for key in sorted(kwargs):
+        value = kwargs[key]
+        if isinstance(value, Session) or value is None:
+            continue
+        params.append((key, jsonable_encoder(value)))
+    return name + "?" + json.dumps(params, separators=(",", ":"))
+
+def render_json(result) -> bytes:
+    return json.dumps(jsonable_encoder(result), separators=(",", ":")).encode()
+
+def render(result, media_type: str) -> bytes:
+    return packb(result) if media_type == MSGPACK else render_json(result)
+
+def cached(*entities: str, ttl: Optional[float] = None):
+    """Cache a GET route's serialized body until TTL expiry or invalidation of an entity.
+
+    The wrapped route returns the stored bytes as-is, so response_model
+    validation and serialization only run when the cache is filled. Identical
+    misses arriving together are coalesced into a single execution.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            media_type = MSGPACK if wants_msgpack() else "application/json"
+            key = _cache_key(f"{func.__module__}.{func.__name__}", kwargs)
+            if media_type == MSGPACK:
+                key += "#msgpack"
+            sessions = [value for value in kwargs.values() if isinstance(value, Session)]
+            if any(db.info.get("read_your_writes") for db in sessions):
+                # The client just wrote: read its own change from the primary,
+                # not a cached or coalesced body that may predate it
+                return Response(content=fill(key, media_type, args, kwargs), media_type=media_type)
+            for db in sessions:
+                # Coalesced requests share this query; one client leaving must not cancel it
+                shield_from_disconnect(db)
+            body = response_cache.get(key) if CACHE_ENABLED else None
+            if body is None:
+                body = read_flights.do(key, lambda: fill(key, media_type, args, kwargs))
+            return Response(content=body, media_type=media_type)
+
+        def fill(key, media_type, args, kwargs) -> bytes:
+            generation = response_cache.generation(entities)
+            body = render(func(*args, **kwargs), media_type)
+            on_replica = any(db.get_bind() in replica_engines for db in kwargs.values() if isinstance(db, Session))
+            if on_replica and response_cache.invalidated_within(entities, REPLICA_LAG_WINDOW):
+                return body
+            if CACHE_ENABLED:
+                response_cache.set(key, body, entities, generation, ttl)
+            return body
+        return wrapper
+    return decorate
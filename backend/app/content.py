@@ -0,0 +1,155 @@
+"""
+MessagePack content negotiation for internal clients.
+
+Routers created with `route_class=NegotiatedRoute` answer in MessagePack when
+the request says `Accept: application/msgpack`, and accept request bodies
+sent as `Content-Type: application/msgpack`. Anything else, browsers
+included, keeps getting JSON exactly as before; error responses (4xx/5xx)
+are always JSON.
+
+Dates and times use compact native encodings instead of ISO strings, defined
+once in app/wire.py; actions/backend.py imports the same module to decode
+them back to datetime/date/time objects.
+
+The response skips JSON entirely: the route's result is validated against
+its response_model as usual, dumped in Python mode (dates stay objects) and
+packed. Cached routes (app/cache.py) store a separate MessagePack body.
+"""
+
+import functools
+import inspect
+from contextvars import ContextVar
+from decimal import Decimal
+from typing import Any, Callable, Optional
+from fastapi import Request, Response
+from fastapi.exceptions import ResponseValidationError
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from app import wire
+
+MSGPACK = "application/msgpack"
+MSGPACK_TYPES = {MSGPACK, "application/x-msgpack", "application/vnd.msgpack"}
+
+# Media type the current request asked for; set per request by NegotiatedRoute
+response_format: ContextVar[str] = ContextVar("response_format", default="application/json")
+
+def _default(value: Any):
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return wire.encode_ext(value)
+
+def packb(content: Any) -> bytes:
+    return wire.packb(content, default=_default)
+
+unpackb = wire.unpackb
+
+def _media_type(header: Optional[str]) -> str:
+    return (header or "").split(";", 1)[0].strip().lower()
+
+def accepts_msgpack(accept: Optional[str]) -> bool:
+    """True when MessagePack is preferred over JSON.
+
+    Only an explicit listing counts, so `*/*` and browser defaults stay JSON;
+    on equal q-values the first listed wins.
+    """
+    best, best_q = None, -1.0
+    for item in (accept or "").split(","):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        media_type = media_type.lower()
+        if media_type in MSGPACK_TYPES or media_type == "application/json":
+            if q > best_q:
+                best, best_q = media_type, q
+    return best in MSGPACK_TYPES and best_q > 0
+
+def wants_msgpack() -> bool:
+    return response_format.get() == MSGPACK
+
+class MsgpackResponse(Response):
+    media_type = MSGPACK
+
+    def render(self, content: Any) -> bytes:
+        return packb(content)
+
+class MsgpackRequest(Request):
+    """A request whose MessagePack body FastAPI reads as if it were JSON."""
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = unpackb(await self.body())
+        return self._json
+
+def _as_json_request(request: Request) -> Request:
+    # FastAPI only parses bodies whose content type is JSON; the bytes stay
+    # MessagePack and MsgpackRequest.json() decodes them
+    headers = [(k, v) for k, v in request.scope["headers"] if k != b"content-type"]
+    headers.append((b"content-type", b"application/json"))
+    return MsgpackRequest({**request.scope, "headers": headers}, request.receive)
+
+class NegotiatedRoute(APIRoute):
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs):
+        # include_router() builds a new route from an existing route's endpoint
+        endpoint = getattr(endpoint, "negotiated_endpoint", endpoint)
+        super().__init__(path, self._negotiating(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def negotiated_handler(request: Request) -> Response:
+            if _media_type(request.headers.get("content-type")) in MSGPACK_TYPES:
+                request = _as_json_request(request)
+            token = response_format.set(MSGPACK if accepts_msgpack(request.headers.get("accept")) else "application/json")
+            try:
+                return await handler(request)
+            finally:
+                response_format.reset(token)
+        return negotiated_handler
+
+    def _negotiating(self, endpoint: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap the endpoint so a MessagePack client gets a MsgpackResponse.
+
+        The wrapper also takes FastAPI's sub-response, so headers and status
+        set by dependencies (e.g. rate limit headers) carry over.
+        """
+        signature = inspect.signature(endpoint)
+        parameters = list(signature.parameters.values())
+        parameters.append(inspect.Parameter("negotiated_response", inspect.Parameter.KEYWORD_ONLY, annotation=Response))
+
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def wrapper(*args, negotiated_response: Response, **kwargs):
+                return self._render(await endpoint(*args, **kwargs), negotiated_response)
+        else:
+            @functools.wraps(endpoint)
+            def wrapper(*args, negotiated_response: Response, **kwargs):
+                return self._render(endpoint(*args, **kwargs), negotiated_response)
+        wrapper.__signature__ = signature.replace(parameters=parameters)
+        wrapper.negotiated_endpoint = endpoint
+        return wrapper
+
+    def _render(self, result: Any, sub_response: Response):
+        if not wants_msgpack() or isinstance(result, Response):
+            return result
+        field = self.secure_cloned_response_field
+        if field is not None:
+            value, errors = field.validate(result, {}, loc=("response",))
+            if errors:
+                raise ResponseValidationError(errors=errors, body=result)
+            result = field.serialize(
+                value, mode="python", include=self.response_model_include, exclude=self.response_model_exclude,
+                by_alias=self.response_model_by_alias, exclude_unset=self.response_model_exclude_unset,
+                exclude_defaults=self.response_model_exclude_defaults, exclude_none=self.response_model_exclude_none,
+            )
+        response = MsgpackResponse(result, status_code=sub_response.status_code or self.status_code or 200)
+        response.headers.raw.extend(sub_response.headers.raw)
+        return response
@@ -0,0 +1,173 @@
+"""
+Group commit for small concurrent inserts (opt-in, GROUP_COMMIT_ENABLED=true).
+
+Chat traffic creates timesheets, leaves, emails and tasks one row at a time,
+each with its own transaction and commit. With group commit, inserts into the
+same table that arrive within GROUP_COMMIT_WINDOW_MS are written as one
+multi-row INSERT ... RETURNING in one transaction.
+
+The first caller of a batch is its leader: it waits out the window, takes up
+to GROUP_COMMIT_MAX_BATCH queued rows and writes them; every caller gets its
+own row back. If the batch fails (one bad row), it is replayed row by row in
+savepoints so only the offending caller gets the error. Callers still queued
+when the leader is done elect the next leader among themselves.
+
+Each caller's statement timeout (db_session(timeout_ms)) applies to the
+batch session too; rows are only batched with rows that have the same one.
+
+Rows can come with a `check` that has to see the rows written before them,
+such as the timesheet overlap check: a request checked before queueing
+cannot see rows that are still queued. Batches with checks are written row
+by row, each row's check running in the batch transaction just before its
+insert. They still share the single commit.
+
+On Postgres the batch is a single multi-row statement. SQLite cannot match
+RETURNING rows to parameters in a multi-row INSERT, so SQLAlchemy sends one
+INSERT per row there; they still share the single transaction and commit.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import insert
+from app.database import SessionLocal
+from app.sharding import allocate_ids
+
+GROUP_COMMIT_ENABLED = os.getenv("GROUP_COMMIT_ENABLED", "false").lower() == "true"
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "5"))
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "200"))
+
+class _Pending:
+    def __init__(self, values: dict, check: Optional[Callable] = None):
+        self.values = values
+        self.check = check
+        self.done = threading.Event()
+        self.lead = False
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class GroupCommitWriter:
+    def __init__(self, session_factory=SessionLocal, window_ms: float = GROUP_COMMIT_WINDOW_MS,
+                 max_batch: int = GROUP_COMMIT_MAX_BATCH):
+        self.session_factory = session_factory
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.lock = threading.Lock()
+        # (model, bind, statement timeout) -> rows waiting for the next batch
+        self.queues: Dict[tuple, List[_Pending]] = {}
+        self.leading = set()
+        self.batches = 0
+        self.rows = 0
+
+    def insert(self, model, values: dict, bind=None, check: Optional[Callable] = None,
+               timeout_ms: Optional[int] = None):
+        """Insert one row as part of the next batch and return it once committed.
+
+        `bind` selects the database (e.g. the user's shard); rows are only
+        batched with others going to the same table on the same database
+        with the same statement timeout (`timeout_ms`, None for no limit).
+        `check(db, values)` runs in the batch transaction right before the
+        row is written: it can raise to reject the row, or return an
+        existing row to hand back instead of inserting.
+        """
+        pending = _Pending(values, check)
+        target = (model, bind, timeout_ms)
+        with self.lock:
+            self.queues.setdefault(target, []).append(pending)
+            pending.lead = target not in self.leading
+            self.leading.add(target)
+
+        while True:
+            if pending.lead:
+                pending.lead = False
+                self._lead(target)
+            pending.done.wait()
+            if pending.lead:
+                # Woken to lead the next batch, not because our row was written
+                pending.done.clear()
+                continue
+            if pending.error is not None:
+                raise pending.error
+            return pending.result
+
+    def _lead(self, target):
+        time.sleep(self.window)
+        with self.lock:
+            queue = self.queues[target]
+            batch, queue[:] = queue[:self.max_batch], queue[self.max_batch:]
+        try:
+            self._write(target, batch)
+        finally:
+            with self.lock:
+                queue = self.queues[target]
+                if queue:
+                    queue[0].lead = True
+                    queue[0].done.set()
+                else:
+                    self.leading.discard(target)
+            for pending in batch:
+                pending.done.set()
+
+    def _write(self, target, batch: List[_Pending]):
+        model, bind, timeout_ms = target
+        info = {"statement_timeout_ms": timeout_ms}
+        db = self.session_factory(bind=bind, info=info) if bind is not None else self.session_factory(info=info)
+        try:
+            if any(pending.check is not None for pending in batch):
+                self._write_one_by_one(db, model, batch)
+            else:
+                self._write_batch(db, model, batch)
+            with self.lock:
+                self.batches += 1
+                self.rows += len(batch)
+        except Exception as e:
+            for pending in batch:
+                if pending.result is None:
+                    pending.error = e
+        finally:
+            db.close()
+
+    def _write_batch(self, db, model, batch: List[_Pending]):
+        try:
+            values = [pending.values for pending in batch]
+            ids = allocate_ids(db, model, len(batch))
+            if ids:
+                values = [dict(row, id=row_id) for row, row_id in zip(values, ids)]
+            rows = db.scalars(
+                insert(model).returning(model, sort_by_parameter_order=True),
+                values,
+            ).all()
+            db.commit()
+            for pending, row in zip(batch, rows):
+                pending.result = row
+        except Exception:
+            db.rollback()
+            self._write_one_by_one(db, model, batch)
+
+    def _write_one_by_one(self, db, model, batch: List[_Pending]):
+        from app.writes import insert_returning
+        for pending in batch:
+            try:
+                with db.begin_nested():
+                    existing = pending.check(db, pending.values) if pending.check is not None else None
+                    pending.result = existing if existing is not None else insert_returning(db, model, pending.values)
+            except Exception as e:
+                pending.error = e
+        try:
+            db.commit()
+        except Exception:
+            for pending in batch:
+                pending.result = None
+            raise
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "enabled": GROUP_COMMIT_ENABLED,
+                "batches": self.batches,
+                "rows": self.rows,
+                "queued": sum(len(queue) for queue in self.queues.values()),
+            }
+
+group_writer = GroupCommitWriter()
@@ -0,0 +1,226 @@
+"""
+Idempotency-Key support for create and bulk routes.
+
+A client that may retry a write sends a unique key with the logical request
+and the same key with every retry of it:
+
+    POST /timesheets/
+    Idempotency-Key: 6f1c0e5d...
+
+The first request with a key reserves it in the idempotency_keys table, runs
+the route and stores the outcome: the result, or a 4xx error, as compressed
+JSON. A retry with the same key gets that outcome back with an
+`Idempotent-Replayed: true` header and the route does not run again, so a
+create that timed out on the client cannot leave a duplicate row behind.
+
+- A retry arriving while the first request is still running waits up to
+  IDEMPOTENCY_WAIT_SECONDS for it to finish, then gets 409 with Retry-After.
+- A reservation that never got an outcome (worker killed mid-request) is
+  taken over by the next retry after IDEMPOTENCY_LEASE_SECONDS.
+- 5xx failures are not stored; the key is released and a retry runs again.
+- Reusing a key with different parameters is rejected with 422.
+- Keys expire after IDEMPOTENCY_TTL_SECONDS (default one day). Expired rows
+  are removed with one indexed range delete, at most every
+  IDEMPOTENCY_PURGE_SECONDS per worker.
+
+Keys are scoped per route. Routes opt in with a decorator under the router's:
+
+    @router.post("/", response_model=TimesheetOut)
+    @idempotent("timesheets.create")
+    def create_timesheet(...):
+
+Requests without the header behave exactly as before.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional, Tuple
+from fastapi import Depends, Header, HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.idempotency import IdempotencyKey
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+# Longer than the slowest statement timeout (30s on the bulk routes)
+IDEMPOTENCY_LEASE_SECONDS = float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "120"))
+IDEMPOTENCY_PURGE_SECONDS = float(os.getenv("IDEMPOTENCY_PURGE_SECONDS", "300"))
+POLL_SECONDS = 0.05
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+def fingerprint(params: dict) -> str:
+    encoded = json.dumps(jsonable_encoder(params), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+def _pack(value: Any) -> bytes:
+    return zlib.compress(json.dumps(jsonable_encoder(value), separators=(",", ":")).encode())
+
+def _unpack(body: Optional[bytes]) -> Any:
+    return json.loads(zlib.decompress(body)) if body else None
+
+_purge_lock = threading.Lock()
+_last_purge = 0.0
+
+def purge_expired():
+    """Delete expired keys; returns the number removed."""
+    with SessionLocal() as db:
+        removed = db.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.expires_at < datetime.utcnow())
+        ).rowcount
+        db.commit()
+    return removed
+
+def _maybe_purge():
+    global _last_purge
+    with _purge_lock:
+        if time.monotonic() - _last_purge < IDEMPOTENCY_PURGE_SECONDS:
+            return
+        _last_purge = time.monotonic()
+    try:
+        purge_expired()
+    except Exception as e:
+        print(f"❌ Error purging idempotency keys: {e}")
+
+def _take_over(db: Session, record: IdempotencyKey, digest: str, now: datetime) -> bool:
+    """Reset an expired or abandoned reservation; False if another request got it first."""
+    taken = db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.scope == record.scope, IdempotencyKey.key == record.key,
+               IdempotencyKey.created_at == record.created_at)
+        .values(fingerprint=digest, completed_at=None, status_code=None, body=None, created_at=now,
+                expires_at=now + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS))
+        .execution_options(synchronize_session=False)
+    ).rowcount == 1
+    db.commit()
+    return taken
+
+def _reserve(scope: str, key: str, digest: str) -> Optional[IdempotencyKey]:
+    """Reserve the key for this request (returns None), or return the stored
+    outcome of an earlier request with the same key."""
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+    while True:
+        with SessionLocal() as db:
+            now = datetime.utcnow()
+            db.add(IdempotencyKey(scope=scope, key=key, fingerprint=digest, created_at=now,
+                                  expires_at=now + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)))
+            try:
+                db.commit()
+                return None
+            except IntegrityError:
+                db.rollback()
+            record = db.get(IdempotencyKey, (scope, key))
+            if record is None:
+                continue  # released or purged in between
+            if record.expires_at <= now:
+                if _take_over(db, record, digest, now):
+                    return None
+                continue
+            if record.fingerprint != digest:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+            if record.completed_at is not None:
+                return record
+            if record.created_at <= now - timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS):
+                if _take_over(db, record, digest, now):
+                    return None
+                continue
+        if time.monotonic() >= deadline:
+            raise HTTPException(
+                status_code=409, detail="A request with this Idempotency-Key is still being processed",
+                headers={"Retry-After": "1"},
+            )
+        time.sleep(POLL_SECONDS)
+
+def _finish(scope: str, key: str, status_code: Optional[int] = None, body: Optional[bytes] = None):
+    try:
+        with SessionLocal() as db:
+            db.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+                .values(completed_at=datetime.utcnow(), status_code=status_code, body=body)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+    except Exception as e:
+        # The write itself succeeded; retries wait for the lease to run out
+        print(f"❌ Error storing idempotent response for {scope}: {e}")
+
+def _release(scope: str, key: str):
+    try:
+        with SessionLocal() as db:
+            db.execute(delete(IdempotencyKey).where(IdempotencyKey.scope == scope, IdempotencyKey.key == key))
+            db.commit()
+    except Exception as e:
+        print(f"❌ Error releasing idempotency key for {scope}: {e}")
+
+def execute(scope: str, key: str, params: dict, run: Callable[[], Any]) -> Tuple[Any, bool]:
+    """Run `run()` at most once per (scope, key).
+
+    Returns (result, replayed). A replayed result is the stored JSON, which
+    the route's response_model validates like a fresh one; a stored error is
+    raised again as HTTPException.
+    """
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+    _maybe_purge()
+    record = _reserve(scope, key, fingerprint(params))
+    if record is not None:
+        if record.status_code is not None:
+            raise HTTPException(status_code=record.status_code, detail=_unpack(record.body),
+                                headers={REPLAYED_HEADER: "true"})
+        return _unpack(record.body), True
+    try:
+        result = run()
+    except HTTPException as e:
+        if e.status_code < 500:
+            _finish(scope, key, e.status_code, _pack(e.detail))
+        else:
+            _release(scope, key)
+        raise
+    except BaseException:
+        _release(scope, key)
+        raise
+    _finish(scope, key, body=_pack(result))
+    return result, False
+
+def _sub_response(response: Response) -> Response:
+    # FastAPI hands an endpoint only one Response parameter (NegotiatedRoute
+    # takes it); through a dependency we get the same object
+    return response
+
+def idempotent(scope: str):
+    """Make a write route honour the Idempotency-Key header.
+
+    The request fingerprint covers the route's parameters (body and query),
+    not the database session.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, idempotency_key: Optional[str] = None, idempotency_response: Response = None, **kwargs):
+            if not idempotency_key:
+                return func(*args, **kwargs)
+            params = {name: value for name, value in kwargs.items() if not isinstance(value, Session)}
+            result, replayed = execute(scope, idempotency_key, params, lambda: func(*args, **kwargs))
+            if replayed:
+                idempotency_response.headers[REPLAYED_HEADER] = "true"
+            return result
+
+        signature = inspect.signature(func)
+        wrapper.__signature__ = signature.replace(parameters=[
+            *signature.parameters.values(),
+            inspect.Parameter("idempotency_key", inspect.Parameter.KEYWORD_ONLY, annotation=Optional[str],
+                              default=Header(None, alias="Idempotency-Key")),
+            inspect.Parameter("idempotency_response", inspect.Parameter.KEYWORD_ONLY, default=Depends(_sub_response)),
+        ])
+        return wrapper
+    return decorate
@@ -0,0 +1,61 @@
+"""
+Handlers for the background job queue. Importing this module registers them.
+"""
+
+from sqlalchemy.orm import Session
+from app.job_queue import job_handler
+from app.cache import invalidate
+from app.models.timesheet import Timesheet
+from app.archive import ARCHIVED_MODELS, archive_month, closed_months
+from app.reminders import generate_pending_timesheet_reminders
+from app.sharding import for_each_shard
+from datetime import date
+
+APPROVAL_BATCH_SIZE = 500
+
+@job_handler("approve_pending_timesheets")
+def approve_pending_timesheets(db: Session, payload: dict, progress):
+    """Month-end approval of every unsubmitted timesheet, in batches."""
+    approver = payload["approver"]
+    total = sum(for_each_shard(lambda shard: shard.query(Timesheet).filter(Timesheet.submitted == False).count(), db))
+    approved = 0
+
+    def approve_shard(shard: Session):
+        nonlocal approved
+        while True:
+            ids = [row.id for row in shard.query(Timesheet.id).filter(Timesheet.submitted == False).limit(APPROVAL_BATCH_SIZE)]
+            if not ids:
+                break
+            shard.query(Timesheet).filter(Timesheet.id.in_(ids)).update(
+                {Timesheet.submitted: True, Timesheet.approved_by: approver, Timesheet.version: Timesheet.version + 1},
+                synchronize_session=False,
+            )
+            shard.commit()
+            invalidate("timesheets")
+            approved += len(ids)
+            progress(approved / total if total else 1.0, f"Approved {approved} of {total} timesheets")
+
+    for_each_shard(approve_shard, db)
+    return {"approved": approved, "approver": approver}
+
+@job_handler("archive_periods")
+def archive_periods(db: Session, payload: dict, progress):
+    tables = payload.get("tables") or sorted(ARCHIVED_MODELS)
+    keep_months = payload.get("keep_months", 2)
+    archived = {}
+    for i, table in enumerate(tables):
+        # Shards are archived one after another; each merges into the same month file
+        def archive_shard(shard: Session):
+            for month in closed_months(shard, table, keep_months):
+                key = f"{table}/{month:%Y-%m}"
+                archived[key] = archived.get(key, 0) + archive_month(shard, table, month)
+        for_each_shard(archive_shard, db)
+        progress((i + 1) / len(tables))
+    return {"archived": archived}
+
+@job_handler("generate_timesheet_reminders")
+def generate_timesheet_reminders(db: Session, payload: dict, progress):
+    start = date.fromisoformat(payload["start"]) if payload.get("start") else None
+    end = date.fromisoformat(payload["end"]) if payload.get("end") else None
+    created = for_each_shard(lambda shard: generate_pending_timesheet_reminders(shard, start, end), db)
+    return {"created": sum(created)}
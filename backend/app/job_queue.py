@@ -0,0 +1,250 @@
+"""
+Durable background job queue on top of the jobs table.
+
+Route handlers enqueue a row and return its id right away; worker threads
+(started with the app when JOB_WORKERS > 0, or standalone via run_worker.py)
+claim queued rows, run the registered handler and store progress, result or
+error back on the row. Failed jobs are retried with exponential backoff
+until max_attempts is reached.
+
+While a job runs, its worker refreshes locked_at every
+JOB_HEARTBEAT_INTERVAL seconds from a separate thread, whatever the handler
+does. A running job whose locked_at is older than JOB_LOCK_TIMEOUT therefore
+lost its worker (crash, kill, lost host): it is requeued, or marked failed
+when that run was its last attempt. Attempts are counted when a job is
+claimed, so a job that keeps killing its worker still stops after
+max_attempts.
+
+Claiming uses SELECT ... FOR UPDATE SKIP LOCKED on Postgres. On SQLite a
+conditional UPDATE (status still "queued") acts as the compare-and-set.
+"""
+
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.jobs import Job
+from app.writes import insert_returning
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "0"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+# Running jobs whose worker has not reported for this long are requeued
+JOB_LOCK_TIMEOUT = int(os.getenv("JOB_LOCK_TIMEOUT", "600"))
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", str(max(1.0, JOB_LOCK_TIMEOUT / 4))))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# kind -> handler(db, payload, progress) returning a JSON-serializable result
+HANDLERS: Dict[str, Callable] = {}
+
+def job_handler(kind: str):
+    """Register a function as the handler for a job kind."""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+def enqueue(db: Session, kind: str, payload: Optional[dict] = None, max_attempts: int = 3,
+            title: Optional[str] = None, assigned_to: Optional[str] = None) -> Job:
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = insert_returning(db, Job, dict(
+        kind=kind,
+        job_title=title or kind,
+        assigned_to=assigned_to,
+        payload=payload or {},
+        status=QUEUED,
+        progress=0.0,
+        attempts=0,
+        max_attempts=max_attempts,
+        run_after=datetime.utcnow(),
+    ))
+    db.commit()
+    return job
+
+def _runnable(query, now):
+    return query.filter(Job.kind.isnot(None), Job.status == QUEUED, Job.run_after <= now)
+
+def claim_next(db: Session, worker_id: str) -> Optional[Job]:
+    """Atomically take the oldest runnable job for this worker."""
+    now = datetime.utcnow()
+    if db.get_bind().dialect.name == "postgresql":
+        job = _runnable(db.query(Job), now).order_by(Job.id).with_for_update(skip_locked=True).first()
+        if not job:
+            db.rollback()
+            return None
+        job.status = RUNNING
+        job.locked_by = worker_id
+        job.locked_at = now
+        job.attempts = (job.attempts or 0) + 1
+        db.commit()
+        return job
+
+    # SQLite has no row locks: pick a candidate and only take it if it is
+    # still queued when our UPDATE lands.
+    for _ in range(5):
+        job_id = _runnable(db.query(Job.id), now).order_by(Job.id).limit(1).scalar()
+        if job_id is None:
+            return None
+        claimed = db.query(Job).filter(Job.id == job_id, Job.status == QUEUED).update(
+            {
+                Job.status: RUNNING,
+                Job.locked_by: worker_id,
+                Job.locked_at: now,
+                Job.attempts: Job.attempts + 1,
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+        if claimed:
+            return db.query(Job).filter(Job.id == job_id).first()
+    return None
+
+def requeue_stale(db: Session) -> int:
+    """Put jobs back on the queue whose worker died while running them.
+
+    Jobs that died on their last attempt are marked failed instead. Returns
+    the number of jobs requeued.
+    """
+    now = datetime.utcnow()
+    stale = (Job.status == RUNNING, Job.locked_at < now - timedelta(seconds=JOB_LOCK_TIMEOUT))
+    error = f"Worker stopped responding (no heartbeat for {JOB_LOCK_TIMEOUT}s)"
+    failed = db.query(Job).filter(*stale, Job.attempts >= Job.max_attempts).update(
+        {Job.status: FAILED, Job.locked_by: None, Job.error: error, Job.finished_at: now},
+        synchronize_session=False,
+    )
+    count = db.query(Job).filter(*stale).update(
+        {Job.status: QUEUED, Job.locked_by: None, Job.error: error, Job.run_after: now},
+        synchronize_session=False,
+    )
+    db.commit()
+    if failed:
+        print(f"❌ {failed} job(s) failed: their worker died during the last attempt")
+    return count
+
+class Heartbeat(threading.Thread):
+    """Keeps a running job's locked_at fresh while its handler runs."""
+
+    def __init__(self, job_id: int, worker_id: str, interval: float = JOB_HEARTBEAT_INTERVAL):
+        super().__init__(name=f"job-heartbeat-{job_id}", daemon=True)
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.interval = interval
+        self.stopping = threading.Event()
+
+    def run(self):
+        while not self.stopping.wait(self.interval):
+            db = SessionLocal()
+            try:
+                db.query(Job).filter(
+                    Job.id == self.job_id, Job.locked_by == self.worker_id, Job.status == RUNNING,
+                ).update({Job.locked_at: datetime.utcnow()}, synchronize_session=False)
+                db.commit()
+            except Exception as e:
+                print(f"❌ Heartbeat of job {self.job_id} failed: {e}")
+            finally:
+                db.close()
+
+    def stop(self):
+        self.stopping.set()
+
+def run_job(db: Session, job: Job):
+    def progress(fraction: float, message: Optional[str] = None):
+        job.progress = max(0.0, min(1.0, fraction))
+        job.locked_at = datetime.utcnow()
+        if message:
+            job.description = message
+        db.commit()
+
+    try:
+        result = HANDLERS[job.kind](db, job.payload or {}, progress)
+        job.status = DONE
+        job.result = result
+        job.error = None
+        job.progress = 1.0
+        job.finished_at = datetime.utcnow()
+        job.locked_by = None
+        db.commit()
+        print(f"✅ Job {job.id} ({job.kind}) done")
+    except Exception as e:
+        db.rollback()
+        job.error = f"{e}\n{traceback.format_exc(limit=5)}"
+        job.locked_by = None
+        if job.attempts >= job.max_attempts:
+            job.status = FAILED
+            job.finished_at = datetime.utcnow()
+            print(f"❌ Job {job.id} ({job.kind}) failed after {job.attempts} attempts: {e}")
+        else:
+            job.status = QUEUED
+            job.run_after = datetime.utcnow() + timedelta(seconds=2 ** job.attempts)
+            print(f"⚠️ Job {job.id} ({job.kind}) attempt {job.attempts} failed, retrying: {e}")
+        db.commit()
+
+def work_once(worker_id: str) -> bool:
+    """Claim and run a single job. Returns False when the queue was empty."""
+    db = SessionLocal()
+    try:
+        job = claim_next(db, worker_id)
+        if not job:
+            return False
+        heartbeat = Heartbeat(job.id, worker_id)
+        heartbeat.start()
+        try:
+            run_job(db, job)
+        finally:
+            heartbeat.stop()
+            heartbeat.join()
+        return True
+    finally:
+        db.close()
+
+class Worker(threading.Thread):
+    def __init__(self, name: str):
+        super().__init__(name=name, daemon=True)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{name}"
+        self.stopping = threading.Event()
+
+    def run(self):
+        last_sweep = 0.0
+        while not self.stopping.is_set():
+            try:
+                if time.monotonic() - last_sweep > JOB_LOCK_TIMEOUT / 2:
+                    db = SessionLocal()
+                    try:
+                        requeue_stale(db)
+                    finally:
+                        db.close()
+                    last_sweep = time.monotonic()
+                if not work_once(self.worker_id):
+                    self.stopping.wait(JOB_POLL_INTERVAL)
+            except Exception as e:
+                print(f"❌ Job worker {self.worker_id} error: {e}")
+                self.stopping.wait(JOB_POLL_INTERVAL)
+
+    def stop(self):
+        self.stopping.set()
+
+_workers = []
+
+def start_workers(count: int = JOB_WORKERS):
+    for i in range(count):
+        worker = Worker(f"job-worker-{i}")
+        worker.start()
+        _workers.append(worker)
+    if count:
+        print(f"✅ Started {count} job worker(s)")
+
+def stop_workers():
+    for worker in _workers:
+        worker.stop()
+    for worker in _workers:
+        worker.join(timeout=5)
+    _workers.clear()
@@ -1,16 +1,34 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import timesheet, leaves, emails, tasks, jobs, auth
+from app.routes import timesheet, leaves, emails, tasks, jobs, auth, search, reports
 from app.database import Base, engine
+from app.partitioning import ensure_month_partitions
+from app.search import ensure_search_index
+from app.cache import read_path_stats
+from app.admission import AdmissionControlMiddleware, admission_snapshot
+from app.group_commit import group_writer
+from app.replicas import replica_router
+from app.sharding import ensure_shards
+from app.job_queue import start_workers, stop_workers
+from app import job_handlers  # registers background job handlers
+from app.reminders import start_reminder_scheduler, stop_reminder_scheduler
+from app.outbox import start_outbox_dispatcher, stop_outbox_dispatcher
 
 # Import all models to register them with Base
-from app.models import Timesheet, Leave, Email, Task, Job
+from app.models import Timesheet, Leave, Email, Task, Job, IdempotencyKey
 
 # Create all tables
 Base.metadata.create_all(bind=engine)
+ensure_month_partitions(engine)
+ensure_search_index(engine)
+ensure_shards()
 
 app = FastAPI(title="AI Assistant Backend", version="1.0.0")
 
+# Shed load before any handler runs. Added before CORS so CORS stays the
+# outer layer and browsers can read the 503 responses.
+app.add_middleware(AdmissionControlMiddleware)
+
 # Add CORS middleware with proper configuration
 app.add_middleware(
     CORSMiddleware,
@@ -27,6 +45,22 @@ app.include_router(leaves.router)
 app.include_router(emails.router)
 app.include_router(tasks.router)
 app.include_router(jobs.router)
+app.include_router(search.router)
+app.include_router(reports.router)
+
+@app.on_event("startup")
+def start_job_workers():
+    start_workers()
+    start_reminder_scheduler()
+    start_outbox_dispatcher()
+    replica_router.start()
+
+@app.on_event("shutdown")
+def stop_job_workers():
+    replica_router.stop()
+    stop_outbox_dispatcher()
+    stop_reminder_scheduler()
+    stop_workers()
 
 @app.get("/")
 async def root():
@@ -34,4 +68,24 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": "2024-01-01T00:00:00Z"}
\ No newline at end of file
+    return {"status": "healthy", "timestamp": "2024-01-01T00:00:00Z"}
+
+@app.get("/health/read-path")
+async def read_path_health():
+    """Response cache and request coalescing counters for this worker."""
+    return read_path_stats()
+
+@app.get("/health/admission")
+async def admission_health():
+    """Per-lane concurrency, queue depth and rejection counters."""
+    return admission_snapshot()
+
+@app.get("/health/group-commit")
+async def group_commit_health():
+    """Batches and rows written by the group-commit writer."""
+    return group_writer.stats()
+
+@app.get("/health/replicas")
+async def replica_health():
+    """Replica health and how reads were routed."""
+    return replica_router.stats()
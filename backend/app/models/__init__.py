@@ -2,4 +2,5 @@ from .timesheet import Timesheet
 from .leaves import Leave
 from .emails import Email
 from .tasks import Task
-from .jobs import Job
\ No newline at end of file
+from .jobs import Job
+from .idempotency import IdempotencyKey
\ No newline at end of file
@@ -1,13 +1,32 @@
-from sqlalchemy import Column, Integer, String, DateTime
-from app.database import Base
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from app.database import Base, PARTITIONED
+from datetime import datetime
 
 class Email(Base):
     __tablename__ = "emails"
+    __table_args__ = (
+        Index("ix_emails_created_at", "created_at"),
+        # Reminder de-duplication looks up (user, type, subject)
+        Index("ix_emails_user_type_subject", "user_id", "type", "subject"),
+        Index("ix_emails_outbox", "delivery_status", "next_attempt_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id=Column(String)
     email=Column(String)
     subject=Column(String)
     message=Column(String)
     type=Column(String,default="email")
-    status=Column(String,default="unread")
\ No newline at end of file
+    status=Column(String,default="unread")
+    # Partitioned tables need the partition key in the primary key
+    created_at=Column(DateTime,primary_key=PARTITIONED,nullable=False,default=datetime.utcnow)
+
+    # Outbox delivery state (see app/outbox.py); NULL for emails never sent out
+    delivery_status=Column(String,nullable=True)
+    delivery_attempts=Column(Integer,default=0)
+    next_attempt_at=Column(DateTime,nullable=True)
+    sent_at=Column(DateTime,nullable=True)
+    last_error=Column(String,nullable=True)
+    claim_token=Column(String,nullable=True)
+    claimed_at=Column(DateTime,nullable=True)
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, Index
+from app.database import Base
+from datetime import datetime
+
+class IdempotencyKey(Base):
+    """Outcome of a write sent with an Idempotency-Key (see app/idempotency.py)."""
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        # Expired keys are purged with a range delete
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+
+    # Route the key was used on, e.g. "timesheets.create"
+    scope=Column(String(64),primary_key=True)
+    key=Column(String(255),primary_key=True)
+    # sha256 of the request parameters; a reused key with other parameters is rejected
+    fingerprint=Column(String(64),nullable=False)
+    # NULL while the first request is still running
+    completed_at=Column(DateTime,nullable=True)
+    # Set for stored 4xx outcomes; NULL for a successful result
+    status_code=Column(Integer,nullable=True)
+    # zlib-compressed JSON of the result (or of the error detail)
+    body=Column(LargeBinary,nullable=True)
+    created_at=Column(DateTime,nullable=False,default=datetime.utcnow)
+    expires_at=Column(DateTime,nullable=False)
@@ -1,8 +1,13 @@
-from sqlalchemy import Column, Integer, String, Date
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, JSON, Index
 from app.database import Base
+from datetime import datetime
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        # Workers poll for the oldest runnable job of the queue
+        Index("ix_jobs_queue", "status", "run_after", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     job_title=Column(String)
@@ -10,4 +15,19 @@ class Job(Base):
     status=Column(String,default="pending")
     start_date=Column(Date)
     end_date=Column(Date)
-    description=Column(String)
\ No newline at end of file
+    description=Column(String)
+
+    # Background work queue (see app/job_queue.py). Rows with a kind are queue
+    # jobs; plain job postings leave these columns empty.
+    kind=Column(String,nullable=True)
+    payload=Column(JSON,nullable=True)
+    result=Column(JSON,nullable=True)
+    error=Column(String,nullable=True)
+    progress=Column(Float,default=0.0)
+    attempts=Column(Integer,default=0)
+    max_attempts=Column(Integer,default=3)
+    run_after=Column(DateTime,nullable=True)
+    locked_by=Column(String,nullable=True)
+    locked_at=Column(DateTime,nullable=True)
+    created_at=Column(DateTime,default=datetime.utcnow)
+    finished_at=Column(DateTime,nullable=True)
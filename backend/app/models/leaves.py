@@ -1,15 +1,24 @@
-from sqlalchemy import Column,Integer,String,Date
+from sqlalchemy import Column,Integer,String,Date,Index
 from app.database import Base 
 
 class Leave(Base):
     __tablename__="leaves"
+    __table_args__ = (
+        # Range lookups ("who is off between X and Y") seek on start_date and
+        # filter end_date from the same index entry.
+        Index("ix_leaves_start_end", "start_date", "end_date"),
+        Index("ix_leaves_user_start", "user_id", "start_date"),
+    )
 
     id = Column(Integer,primary_key=True,index=True)
     user_id=Column(String)
     email =Column(String)
-    date=Column(String)
+    start_date=Column(Date,nullable=False)
+    end_date=Column(Date,nullable=False)
     leave_type=Column(String)
     reason=Column(String)
     status=Column(String,default="pending")
     approved_by=Column(String,nullable=True)
     approval_comment=Column(String,nullable=True)
+    # Bumped by every update; PUT with a stale version gets 409
+    version=Column(Integer,nullable=False,default=1)
@@ -1,18 +1,27 @@
-from sqlalchemy import Column,Integer,String,Date,Boolean,Time
-from app.database import Base
+from sqlalchemy import Column,Integer,String,Date,Boolean,Time,Float,Index
+from app.database import Base, PARTITIONED
 
 class Timesheet(Base):
     __tablename__="timesheets"
+    __table_args__ = (
+        # Overlap checks on create/update only touch one user's entries for one day
+        Index("ix_timesheets_user_date_from", "user_id", "date", "from_time"),
+        Index("ix_timesheets_date", "date"),
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
 
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id = Column(String)
     email = Column(String)
-    date = Column(Date)
+    # Partitioned tables need the partition key in the primary key
+    date = Column(Date, primary_key=PARTITIONED, nullable=False)
     from_time = Column(Time) 
     to_time = Column(Time)    
     task_summary = Column(String)  
-    hours = Column(Integer)
+    hours = Column(Float)
     description = Column(String)
     submitted = Column(Boolean, default=False)
-    approved_by = Column(String, nullable=True)
\ No newline at end of file
+    approved_by = Column(String, nullable=True)
+    # Bumped by every update; PUT with a stale version gets 409
+    version = Column(Integer, nullable=False, default=1)
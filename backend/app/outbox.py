@@ -0,0 +1,334 @@
+"""
+Email outbox dispatcher.
+
+create_email and the reminder generator only insert rows with
+delivery_status="queued". The dispatcher claims those rows in batches, sends
+them over a small pool of reused SMTP connections, and writes the outcome of
+the whole batch back in one bulk UPDATE. Request handlers never talk to SMTP.
+
+Sends are rate limited per recipient domain; rows over the limit stay queued
+for the next batch. Failures are retried with exponential backoff until
+OUTBOX_MAX_ATTEMPTS, then marked "failed". A pooled connection the server
+closed while it sat idle is replaced and the send tried again once before
+it counts as a failure.
+
+Tests: backend/tests/test_outbox.py runs the dispatcher against the
+in-process SMTP sink (app/smtp_sink.py).
+"""
+
+import os
+import queue
+import smtplib
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app.sharding import for_each_shard
+from app.cache import invalidate
+from app.models.emails import Email
+
+SMTP_HOST = os.getenv("SMTP_HOST", "localhost")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "1025"))
+SMTP_USER = os.getenv("SMTP_USER")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "false").lower() == "true"
+SMTP_FROM = os.getenv("SMTP_FROM", "assistant@localhost")
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+
+OUTBOX_INTERVAL_SECONDS = float(os.getenv("OUTBOX_INTERVAL_SECONDS", "0"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "200"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("OUTBOX_RETRY_BASE_SECONDS", "30"))
+# Messages per second per recipient domain; 0 disables the limit
+OUTBOX_DOMAIN_RATE = float(os.getenv("OUTBOX_DOMAIN_RATE", "10"))
+# Rows left in "sending" this long (crashed dispatcher) are queued again
+OUTBOX_CLAIM_TIMEOUT = int(os.getenv("OUTBOX_CLAIM_TIMEOUT", "600"))
+
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+def _connection_lost(error: Exception) -> bool:
+    # Every SMTPException is an OSError too; of those only these mean the
+    # connection is gone, the rest are answers such as a refused recipient
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+class SMTPPool:
+    """Keeps up to `size` authenticated SMTP connections open for reuse."""
+
+    def __init__(self, host: str = SMTP_HOST, port: int = SMTP_PORT, size: int = SMTP_POOL_SIZE,
+                 user: Optional[str] = SMTP_USER, password: Optional[str] = SMTP_PASSWORD,
+                 starttls: bool = SMTP_STARTTLS):
+        self.host, self.port = host, port
+        self.user, self.password, self.starttls = user, password, starttls
+        self.size = size
+        self.idle = queue.LifoQueue()
+        self.opened = 0
+        self.lock = threading.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(self.host, self.port, timeout=30)
+        if self.starttls:
+            conn.starttls()
+        if self.user:
+            conn.login(self.user, self.password or "")
+        return conn
+
+    def acquire(self) -> smtplib.SMTP:
+        return self._checkout()[0]
+
+    def _checkout(self) -> Tuple[smtplib.SMTP, bool]:
+        """A connection and whether it was reused from the idle pool."""
+        try:
+            return self.idle.get_nowait(), True
+        except queue.Empty:
+            pass
+        with self.lock:
+            can_open = self.opened < self.size
+            if can_open:
+                self.opened += 1
+        if not can_open:
+            return self.idle.get(), True
+        return self._open(), False
+
+    def _open(self) -> smtplib.SMTP:
+        """Connect; the caller has already counted the connection in `opened`."""
+        try:
+            return self._connect()
+        except Exception:
+            with self.lock:
+                self.opened -= 1
+            raise
+
+    def release(self, conn: smtplib.SMTP, broken: bool = False):
+        if broken:
+            with self.lock:
+                self.opened -= 1
+            try:
+                conn.close()
+            except Exception:
+                pass
+        else:
+            self.idle.put(conn)
+
+    def send(self, message: EmailMessage):
+        conn, reused = self._checkout()
+        while True:
+            try:
+                conn.send_message(message)
+                break
+            except Exception as e:
+                if not _connection_lost(e):
+                    # Rejected recipient etc.: the connection itself is still
+                    # fine, unless resetting it fails too
+                    try:
+                        conn.rset()
+                    except Exception:
+                        self.release(conn, broken=True)
+                    else:
+                        self.release(conn)
+                    raise
+                self.release(conn, broken=True)
+                if not reused:
+                    raise
+                # Dropped while idle (server timeout or restart): once more on
+                # a fresh connection, taking the place of the broken one
+                with self.lock:
+                    self.opened += 1
+                conn, reused = self._open(), False
+        self.release(conn)
+
+    def close(self):
+        while True:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                conn.quit()
+            except Exception:
+                pass
+        with self.lock:
+            self.opened = 0
+
+class DomainRateLimiter:
+    """Token bucket per recipient domain."""
+
+    def __init__(self, rate: float = OUTBOX_DOMAIN_RATE, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst or max(rate, 1.0)
+        self.buckets: Dict[str, list] = {}
+
+    def allow(self, domain: str) -> bool:
+        if self.rate <= 0:
+            return True
+        now = time.monotonic()
+        tokens, last = self.buckets.get(domain, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens < 1:
+            self.buckets[domain] = (tokens, now)
+            return False
+        self.buckets[domain] = (tokens - 1, now)
+        return True
+
+def _claim_batch(db: Session, limit: int) -> List[Email]:
+    now = datetime.utcnow()
+    due = (
+        Email.delivery_status == QUEUED,
+        (Email.next_attempt_at == None) | (Email.next_attempt_at <= now),
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        rows = (
+            db.query(Email).filter(*due).order_by(Email.id)
+            .with_for_update(skip_locked=True).limit(limit).all()
+        )
+        for row in rows:
+            row.delivery_status = SENDING
+            row.claimed_at = now
+        db.commit()
+        return rows
+
+    # SQLite: stamp candidates with a claim token, then load what we won
+    token = uuid.uuid4().hex
+    ids = [row.id for row in db.query(Email.id).filter(*due).order_by(Email.id).limit(limit)]
+    if not ids:
+        return []
+    db.query(Email).filter(Email.id.in_(ids), Email.delivery_status == QUEUED).update(
+        {Email.delivery_status: SENDING, Email.claim_token: token, Email.claimed_at: now},
+        synchronize_session=False,
+    )
+    db.commit()
+    return db.query(Email).filter(Email.claim_token == token, Email.delivery_status == SENDING).all()
+
+def _build_message(row: Email) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = SMTP_FROM
+    message["To"] = row.email
+    message["Subject"] = row.subject or ""
+    message.set_content(row.message or "")
+    return message
+
+def _requeue_stale(db: Session):
+    cutoff = datetime.utcnow() - timedelta(seconds=OUTBOX_CLAIM_TIMEOUT)
+    db.query(Email).filter(Email.delivery_status == SENDING, Email.claimed_at < cutoff).update(
+        {Email.delivery_status: QUEUED}, synchronize_session=False,
+    )
+    db.commit()
+
+def dispatch_batch(db: Session, pool: SMTPPool, limiter: DomainRateLimiter,
+                   executor: ThreadPoolExecutor, batch_size: int = OUTBOX_BATCH_SIZE) -> Dict[str, int]:
+    """Send one batch of queued emails. Returns counts per outcome."""
+    rows = _claim_batch(db, batch_size)
+    if not rows:
+        return {}
+
+    now = datetime.utcnow()
+    sendable, updates = [], []
+    for row in rows:
+        local, _, domain = (row.email or "").rpartition("@")
+        domain = domain.lower() if local else ""
+        if not domain:
+            updates.append({"delivery_status": FAILED, "last_error": "Missing recipient address"})
+        elif limiter.allow(domain):
+            sendable.append(row)
+            continue
+        else:
+            # Over this domain's rate: hand it back without using an attempt
+            updates.append({"delivery_status": QUEUED, "next_attempt_at": now + timedelta(seconds=1)})
+        updates[-1].update({"id": row.id, "created_at": row.created_at})
+
+    def send(row: Email):
+        try:
+            pool.send(_build_message(row))
+            return row, None
+        except Exception as e:
+            return row, e
+
+    for row, error in executor.map(send, sendable):
+        attempts = (row.delivery_attempts or 0) + 1
+        change = {"id": row.id, "created_at": row.created_at, "delivery_attempts": attempts}
+        if error is None:
+            change.update({"delivery_status": SENT, "sent_at": datetime.utcnow(), "last_error": None})
+        elif attempts >= OUTBOX_MAX_ATTEMPTS:
+            change.update({"delivery_status": FAILED, "last_error": str(error)})
+        else:
+            delay = OUTBOX_RETRY_BASE_SECONDS * (2 ** (attempts - 1))
+            change.update({
+                "delivery_status": QUEUED,
+                "last_error": str(error),
+                "next_attempt_at": datetime.utcnow() + timedelta(seconds=delay),
+            })
+        updates.append(change)
+
+    # One executemany UPDATE by primary key for the whole batch
+    db.execute(update(Email), updates)
+    db.commit()
+    invalidate("emails")
+
+    counts: Dict[str, int] = {}
+    for change in updates:
+        counts[change["delivery_status"]] = counts.get(change["delivery_status"], 0) + 1
+    return counts
+
+class OutboxDispatcher(threading.Thread):
+    def __init__(self, interval: float = OUTBOX_INTERVAL_SECONDS, pool: Optional[SMTPPool] = None):
+        super().__init__(name="outbox-dispatcher", daemon=True)
+        self.interval = interval
+        self.pool = pool or SMTPPool()
+        self.limiter = DomainRateLimiter()
+        self.executor = ThreadPoolExecutor(max_workers=self.pool.size, thread_name_prefix="smtp")
+        self.stopping = threading.Event()
+
+    def run_once(self) -> Dict[str, int]:
+        def dispatch_shard(db: Session) -> Dict[str, int]:
+            _requeue_stale(db)
+            return dispatch_batch(db, self.pool, self.limiter, self.executor)
+
+        counts: Dict[str, int] = {}
+        for shard_counts in for_each_shard(dispatch_shard):
+            for status, count in shard_counts.items():
+                counts[status] = counts.get(status, 0) + count
+        return counts
+
+    def run(self):
+        while not self.stopping.is_set():
+            try:
+                counts = self.run_once()
+                if counts:
+                    print(f"📤 Outbox batch: {counts}")
+                if counts.get(SENT) or counts.get(FAILED):
+                    continue  # more may be waiting
+            except Exception as e:
+                print(f"❌ Outbox dispatcher error: {e}")
+            self.stopping.wait(self.interval)
+
+    def stop(self):
+        self.stopping.set()
+        if self.is_alive():
+            self.join(timeout=10)
+        self.executor.shutdown(wait=False)
+        self.pool.close()
+
+_dispatcher: Optional[OutboxDispatcher] = None
+
+def start_outbox_dispatcher(interval: float = OUTBOX_INTERVAL_SECONDS):
+    global _dispatcher
+    if interval <= 0 or _dispatcher is not None:
+        return
+    _dispatcher = OutboxDispatcher(interval)
+    _dispatcher.start()
+    print(f"✅ Email outbox dispatcher sending via {SMTP_HOST}:{SMTP_PORT}")
+
+def stop_outbox_dispatcher():
+    global _dispatcher
+    if _dispatcher is not None:
+        _dispatcher.stop()
+        _dispatcher = None
@@ -0,0 +1,105 @@
+"""
+Month partitions for the append-only tables (timesheets, emails).
+
+On Postgres both tables are declared with PARTITION BY RANGE and get one
+partition per calendar month plus a DEFAULT partition, so a date-bounded
+query only touches the months it asks for. Other databases (SQLite for local
+development) keep a single table and rely on the date index instead; the
+query helpers below work the same on both.
+
+Rows dated beyond the last partition land in DEFAULT. Postgres refuses to
+create a partition whose range DEFAULT already holds rows for, so when the
+months roll forward such rows are moved into the new partition in the same
+transaction (detach DEFAULT, create, copy, delete, re-attach).
+"""
+
+from datetime import date, timedelta
+from sqlalchemy import text
+from app.database import PARTITIONED
+
+# table name -> partition key column
+PARTITIONED_TABLES = {
+    "timesheets": "date",
+    "emails": "created_at",
+}
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+def next_month(day: date) -> date:
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+def months_between(start: date, end: date):
+    """Yield the first day of every month touching [start, end]."""
+    month = month_start(start)
+    while month <= end:
+        yield month
+        month = next_month(month)
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+def ensure_month_partitions(engine, months_back: int = 1, months_ahead: int = 3):
+    """Create missing month partitions around today (no-op off Postgres)."""
+    if not PARTITIONED:
+        return
+    today = month_start(date.today())
+    first = today
+    for _ in range(months_back):
+        first = month_start(first - timedelta(days=1))
+    last = today
+    for _ in range(months_ahead):
+        last = next_month(last)
+
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+        for table in PARTITIONED_TABLES:
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+            for month in months_between(first, last):
+                create_month_partition(conn, table, month)
+        for name in ["timesheets_default"] + [partition_name("timesheets", m) for m in months_between(first, last)]:
+            add_timesheet_overlap_constraint(conn, name)
+    print(f"✅ Month partitions ready from {first} to {last}")
+
+def create_month_partition(conn, table: str, month: date):
+    """Create the partition of `month`, moving its rows out of DEFAULT first."""
+    name = partition_name(table, month)
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None:
+        return
+    default = f"{table}_default"
+    bounds = {"start": month, "end": next_month(month)}
+    in_month = f"{PARTITIONED_TABLES[table]} >= :start AND {PARTITIONED_TABLES[table]} < :end"
+    stranded = conn.execute(text(f"SELECT 1 FROM {default} WHERE {in_month} LIMIT 1"), bounds).first()
+    if stranded:
+        conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {default}"))
+    conn.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month}') TO ('{next_month(month)}')"
+    ))
+    if stranded:
+        moved = conn.execute(text(f"INSERT INTO {name} SELECT * FROM {default} WHERE {in_month}"), bounds).rowcount
+        conn.execute(text(f"DELETE FROM {default} WHERE {in_month}"), bounds)
+        conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT"))
+        print(f"✅ Moved {moved} {table} row(s) for {month:%Y-%m} from {default} into {name}")
+
+def add_timesheet_overlap_constraint(conn, partition: str):
+    # Exclusion constraints are per partition; every overlap shares a date and
+    # therefore a partition, so this still rejects all overlapping intervals.
+    exists = conn.execute(
+        text("SELECT 1 FROM pg_constraint WHERE conname = :name"),
+        {"name": f"{partition}_no_overlap"},
+    ).first()
+    if not exists:
+        conn.execute(text(
+            f"ALTER TABLE {partition} ADD CONSTRAINT {partition}_no_overlap "
+            "EXCLUDE USING gist (user_id WITH =, date WITH =, "
+            "tsrange(date + from_time, date + to_time) WITH &&)"
+        ))
+
+def apply_date_range(query, column, start: date = None, end: date = None):
+    """Bound a query on the partition key so only the matching months are read."""
+    if start:
+        query = query.filter(column >= start)
+    if end:
+        query = query.filter(column < end + timedelta(days=1))
+    return query
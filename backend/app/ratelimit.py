@@ -0,0 +1,182 @@
+"""
+Per-client token-bucket rate limiting for write routes.
+
+Routes opt in with a dependency:
+
+    @router.post("/", dependencies=[Depends(rate_limit("timesheets.create"))])
+
+Clients are identified by the user in their bearer token (auth.verify_token),
+then by the chat user the action server forwards, and otherwise by client
+IP. The action server calls on behalf of every chat user, so it sends the
+end user in X-End-User together with the shared ACTION_SERVER_TOKEN in
+X-Action-Server-Token; X-End-User is ignored without a matching token. Each (route, client) pair has a bucket of
+`burst` tokens refilled at `rate` per second; a request takes one token or
+gets 429 with Retry-After. Every response carries RateLimit-Limit,
+RateLimit-Remaining and RateLimit-Reset headers.
+
+Limits are set per route in RATE_LIMITS and can be overridden with
+RATE_LIMIT_<ROUTE> (dots become underscores), e.g.
+RATE_LIMIT_TIMESHEETS_CREATE="60/minute" or "5/second".
+
+Buckets live in process memory by default. With several workers, set
+RATE_LIMIT_BACKEND=postgres to keep them in one table on the main database
+so the limit holds across processes.
+"""
+
+import hmac
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from fastapi import Depends, HTTPException, Request, Response
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import text
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+# Shared with the action server (actions/backend.py); unset, nobody can forward users
+ACTION_SERVER_TOKEN = os.getenv("ACTION_SERVER_TOKEN") or None
+
+# route -> "<requests>/<second|minute|hour>"; the burst equals the request count
+RATE_LIMITS = {
+    "timesheets.create": "30/minute",
+    "leaves.create": "10/minute",
+    "emails.create": "20/minute",
+}
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+def parse_limit(spec: str) -> Tuple[int, float]:
+    """"30/minute" -> (burst 30, 0.5 tokens per second)."""
+    count, _, period = spec.partition("/")
+    count = int(count)
+    return count, count / PERIODS[period.strip() or "second"]
+
+def route_limit(route: str) -> Tuple[int, float]:
+    env = "RATE_LIMIT_" + route.replace(".", "_").upper()
+    return parse_limit(os.getenv(env, RATE_LIMITS[route]))
+
+class MemoryBackend:
+    """Buckets in a bounded LRU; idle buckets are refilled anyway, so evicting
+    them only loses state that would have reset by itself."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self.buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def take(self, key: str, burst: int, rate: float) -> Tuple[bool, float]:
+        """Try to take one token. Returns (allowed, tokens left)."""
+        now = time.monotonic()
+        with self.lock:
+            tokens, last = self.buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.buckets[key] = (tokens, now)
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return allowed, tokens
+
+class PostgresBackend:
+    """Buckets in an UNLOGGED table, updated with one upsert per request so
+    concurrent workers cannot both spend the last token."""
+
+    REFILL = (
+        "LEAST(:burst, rate_limit_buckets.tokens + "
+        "EXTRACT(EPOCH FROM clock_timestamp() - rate_limit_buckets.updated_at) * :rate)"
+    )
+
+    def __init__(self, engine):
+        self.engine = engine
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_buckets ("
+                "key varchar PRIMARY KEY, tokens double precision NOT NULL, "
+                "allowed boolean NOT NULL, updated_at timestamptz NOT NULL)"
+            ))
+
+    def take(self, key: str, burst: int, rate: float) -> Tuple[bool, float]:
+        refill = self.REFILL
+        sql = (
+            "INSERT INTO rate_limit_buckets (key, tokens, allowed, updated_at) "
+            "VALUES (:key, :burst - 1, true, clock_timestamp()) "
+            "ON CONFLICT (key) DO UPDATE SET "
+            f"tokens = CASE WHEN {refill} >= 1 THEN {refill} - 1 ELSE {refill} END, "
+            f"allowed = {refill} >= 1, "
+            "updated_at = clock_timestamp() "
+            "RETURNING allowed, tokens"
+        )
+        with self.engine.begin() as conn:
+            allowed, tokens = conn.execute(text(sql), {"key": key, "burst": burst, "rate": rate}).one()
+        return allowed, tokens
+
+_backend = None
+
+def set_backend(backend):
+    """Replace the bucket store (e.g. a fresh MemoryBackend in tests)."""
+    global _backend
+    _backend = backend
+
+def get_backend():
+    if _backend is None:
+        if RATE_LIMIT_BACKEND == "postgres":
+            from app.database import engine
+            set_backend(PostgresBackend(engine))
+        else:
+            set_backend(MemoryBackend())
+    return _backend
+
+_bearer = HTTPBearer(auto_error=False)
+
+def forwarded_user(request: Request) -> Optional[str]:
+    """Chat user the action server is calling for, if the request proves it is the action server."""
+    user = request.headers.get("x-end-user")
+    token = request.headers.get("x-action-server-token")
+    if not user or not token or not ACTION_SERVER_TOKEN:
+        return None
+    if not hmac.compare_digest(token.encode(), ACTION_SERVER_TOKEN.encode()):
+        return None
+    return user
+
+def client_key(request: Request, credentials: Optional[HTTPAuthorizationCredentials]) -> str:
+    if credentials is not None:
+        from app.routes.auth import verify_token
+        try:
+            return "user:" + verify_token(credentials)
+        except HTTPException:
+            pass  # an invalid token is limited like an anonymous client
+    user = forwarded_user(request)
+    if user is not None:
+        return "chat:" + user
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+def rate_limit(route: str):
+    """Dependency enforcing the configured limit of `route` per client."""
+    burst, rate = route_limit(route)
+
+    def check(request: Request, response: Response,
+              credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)):
+        if not RATE_LIMIT_ENABLED:
+            return
+        key = f"{route}:{client_key(request, credentials)}"
+        try:
+            allowed, tokens = get_backend().take(key, burst, rate)
+        except Exception as e:
+            # A broken shared store should not take writes down with it
+            print(f"❌ Rate limit backend error: {e}")
+            return
+        headers = {
+            "RateLimit-Limit": str(burst),
+            "RateLimit-Remaining": str(max(0, math.floor(tokens))),
+            # Seconds until the bucket is full again
+            "RateLimit-Reset": str(math.ceil((burst - tokens) / rate)),
+        }
+        if not allowed:
+            headers["Retry-After"] = str(math.ceil((1 - tokens) / rate))
+            raise HTTPException(status_code=429, detail="Too many requests, please slow down", headers=headers)
+        response.headers.update(headers)
+    return check
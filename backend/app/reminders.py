@@ -0,0 +1,144 @@
+"""
+Reminder emails for users with unsubmitted timesheets.
+
+All reminders for a period are produced by one INSERT ... SELECT: the
+database groups pending timesheets by user and skips users who already have
+a reminder for the same period, so running it again is harmless. Every API
+worker runs the scheduler, so runs on the same database take turns
+(lock_reminders); two overlapping statements would not see each other's
+rows. SQLite shards cannot give the rows strided ids themselves, so there
+the selected rows are inserted with ids from allocate_ids instead. It can
+be triggered from the API, queued as a background job, or run on a
+schedule inside the app process (REMINDER_INTERVAL_MINUTES > 0).
+"""
+
+import os
+import threading
+from datetime import date, datetime, timedelta
+from typing import Optional
+from sqlalchemy import DateTime, and_, exists, func, insert, literal, select, text
+from sqlalchemy.orm import Session, aliased
+from app.cache import invalidate
+from app.models.emails import Email
+from app.models.timesheet import Timesheet
+from app.partitioning import month_start, next_month
+from app.sharding import allocate_ids, for_each_shard, needs_allocated_ids
+
+REMINDER_INTERVAL_MINUTES = int(os.getenv("REMINDER_INTERVAL_MINUTES", "0"))
+
+def reminder_period(start: Optional[date] = None, end: Optional[date] = None):
+    """Default to the current calendar month."""
+    if start is None and end is None:
+        start = month_start(date.today())
+        end = next_month(start) - timedelta(days=1)
+    start = start or month_start(end)
+    end = end or date.today()
+    return start, end
+
+def reminder_subject(start: date, end: date) -> str:
+    if start == month_start(start) and end == next_month(start) - timedelta(days=1):
+        return f"Reminder: pending timesheets for {start:%Y-%m}"
+    return f"Reminder: pending timesheets for {start} to {end}"
+
+REMINDER_LOCK_KEY = 0x52454D49  # pg_advisory_xact_lock key, "REMI"
+
+def lock_reminders(db: Session):
+    """Wait until no other reminder run holds this database; held until commit.
+
+    A unique index cannot back the de-duplication: on Postgres the emails
+    table is partitioned by created_at, which such an index would have to
+    include.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": REMINDER_LOCK_KEY})
+    elif dialect == "sqlite":
+        # Any write statement takes SQLite's single write lock, even one
+        # that changes nothing, and later reads see every committed run
+        db.execute(text("UPDATE emails SET id = id WHERE 0"))
+
+def generate_pending_timesheet_reminders(db: Session, start: Optional[date] = None, end: Optional[date] = None) -> int:
+    """Create one reminder email per user with unsubmitted timesheets in the period.
+
+    Returns the number of reminders created.
+    """
+    start, end = reminder_period(start, end)
+    subject = reminder_subject(start, end)
+    message = (
+        f"You have timesheets between {start} and {end} that have not been submitted yet. "
+        "Please review and submit them."
+    )
+
+    existing = aliased(Email)
+    already_reminded = exists().where(and_(
+        existing.user_id == Timesheet.user_id,
+        existing.type == "reminder",
+        existing.subject == subject,
+    ))
+    pending_users = (
+        select(
+            Timesheet.user_id,
+            func.max(Timesheet.email),
+            literal(subject),
+            literal(message),
+            literal("reminder"),
+            literal("Unread"),
+            literal(datetime.utcnow(), DateTime),
+            literal("queued"),
+        )
+        .where(
+            Timesheet.submitted == False,
+            Timesheet.date >= start,
+            Timesheet.date <= end,
+            ~already_reminded,
+        )
+        .group_by(Timesheet.user_id)
+    )
+    columns = ["user_id", "email", "subject", "message", "type", "status", "created_at", "delivery_status"]
+    lock_reminders(db)
+    if needs_allocated_ids(db, Email):
+        rows = [dict(zip(columns, row)) for row in db.execute(pending_users).all()]
+        for row, email_id in zip(rows, allocate_ids(db, Email, len(rows)) if rows else []):
+            row["id"] = email_id
+        if rows:
+            db.execute(insert(Email), rows)
+        created = len(rows)
+    else:
+        created = db.execute(insert(Email).from_select(columns, pending_users)).rowcount
+    db.commit()
+    if created:
+        invalidate("emails")
+    print(f"✅ Created {created} timesheet reminder(s) for {start} to {end}")
+    return created
+
+class ReminderScheduler(threading.Thread):
+    def __init__(self, interval_minutes: int):
+        super().__init__(name="reminder-scheduler", daemon=True)
+        self.interval = interval_minutes * 60
+        self.stopping = threading.Event()
+
+    def run(self):
+        while not self.stopping.wait(self.interval):
+            try:
+                for_each_shard(generate_pending_timesheet_reminders)
+            except Exception as e:
+                print(f"❌ Error generating scheduled reminders: {e}")
+
+    def stop(self):
+        self.stopping.set()
+
+_scheduler: Optional[ReminderScheduler] = None
+
+def start_reminder_scheduler(interval_minutes: int = REMINDER_INTERVAL_MINUTES):
+    global _scheduler
+    if interval_minutes <= 0 or _scheduler is not None:
+        return
+    _scheduler = ReminderScheduler(interval_minutes)
+    _scheduler.start()
+    print(f"✅ Timesheet reminders scheduled every {interval_minutes} minute(s)")
+
+def stop_reminder_scheduler():
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.stop()
+        _scheduler = None
@@ -0,0 +1,175 @@
+"""
+Read-replica routing for request sessions.
+
+With DATABASE_REPLICA_URLS set, db_session() binds GET/HEAD requests to a
+healthy replica (round robin) and everything else to the primary.
+
+- Read-your-writes: after a client sends a write, its reads go to the primary
+  for READ_YOUR_WRITES_SECONDS so it sees its own change even if the replicas
+  lag. Clients are told apart like for rate limits (ratelimit.client_key):
+  bearer-token user, then the chat user the action server forwards, else
+  client IP. Without ACTION_SERVER_TOKEN every chat write would pin all of
+  the action server's reads to the primary.
+- Health: a monitor thread runs `SELECT 1` on every replica each
+  REPLICA_HEALTH_INTERVAL seconds, and on Postgres also checks replay lag
+  against REPLICA_MAX_LAG_SECONDS. Unhealthy replicas are skipped; with none
+  left, reads fall back to the primary.
+- Local testing (REPLICA_SQLITE_COPY=true, development only): when primary
+  and replica are SQLite files, the monitor also copies the whole primary
+  into each replica on every tick, which behaves like asynchronous
+  replication with up to one interval of lag.
+"""
+
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from fastapi import Request
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import text
+from app.database import engine, replica_engines
+
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", "2"))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "10"))
+# Longest a replica still marked healthy can trail the primary
+REPLICA_LAG_WINDOW = REPLICA_MAX_LAG_SECONDS + REPLICA_HEALTH_INTERVAL
+# Copies the whole database file on every health check; for local testing only
+REPLICA_SQLITE_COPY = os.getenv("REPLICA_SQLITE_COPY", "false").lower() == "true"
+
+READ_METHODS = {"GET", "HEAD"}
+
+def _client_key(request: Request) -> str:
+    from app.ratelimit import client_key
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    credentials = None
+    if scheme.lower() == "bearer" and token:
+        credentials = HTTPAuthorizationCredentials(scheme=scheme, credentials=token)
+    return client_key(request, credentials)
+
+def _sqlite_path(bind) -> Optional[str]:
+    if bind.dialect.name != "sqlite" or not bind.url.database or bind.url.database == ":memory:":
+        return None
+    return bind.url.database
+
+class ReplicaRouter:
+    def __init__(self, primary, replicas: List, sticky_seconds: float = READ_YOUR_WRITES_SECONDS,
+                 max_clients: int = 100_000):
+        self.primary = primary
+        self.replicas = replicas
+        self.healthy = {id(replica): True for replica in replicas}
+        self.sticky_seconds = sticky_seconds
+        self.max_clients = max_clients
+        self.last_write: "OrderedDict[str, float]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.cycle = itertools.cycle(replicas) if replicas else None
+        self.reads_on_replica = 0
+        self.reads_on_primary = 0
+        self.monitor: Optional[threading.Thread] = None
+        self.stopping = threading.Event()
+
+    def pick_replica(self):
+        with self.lock:
+            for _ in range(len(self.replicas)):
+                replica = next(self.cycle)
+                if self.healthy[id(replica)]:
+                    return replica
+        return None
+
+    def route(self, request: Request) -> Tuple[object, bool]:
+        """Engine for this request and whether read-your-writes pinned it to the primary."""
+        if not self.replicas:
+            return self.primary, False
+        if request.method not in READ_METHODS:
+            self._mark_write(request)
+            return self.primary, False
+        wrote_at = self.last_write.get(_client_key(request))
+        if wrote_at is not None and time.monotonic() - wrote_at < self.sticky_seconds:
+            self.reads_on_primary += 1
+            return self.primary, True
+        replica = self.pick_replica()
+        if replica is None:
+            self.reads_on_primary += 1
+            return self.primary, False
+        self.reads_on_replica += 1
+        return replica, False
+
+    def after_request(self, request: Request):
+        # Marked again once the write has committed, so the window starts then
+        if self.replicas and request.method not in READ_METHODS:
+            self._mark_write(request)
+
+    def _mark_write(self, request: Request):
+        key = _client_key(request)
+        with self.lock:
+            self.last_write.pop(key, None)
+            self.last_write[key] = time.monotonic()
+            if len(self.last_write) > self.max_clients:
+                self.last_write.popitem(last=False)
+
+    def check(self, replica) -> bool:
+        try:
+            if REPLICA_SQLITE_COPY:
+                source, target = _sqlite_path(self.primary), _sqlite_path(replica)
+                if source and target:
+                    _copy_sqlite(source, target)
+            with replica.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                if replica.dialect.name == "postgresql":
+                    lag = conn.execute(text(
+                        "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+                    )).scalar()
+                    if lag > REPLICA_MAX_LAG_SECONDS:
+                        print(f"⚠️ Replica {replica.url.host} is {lag:.0f}s behind, reading from primary")
+                        return False
+            return True
+        except Exception as e:
+            print(f"❌ Replica {replica.url.host or replica.url.database} unavailable: {e}")
+            return False
+
+    def check_all(self):
+        for replica in self.replicas:
+            healthy = self.check(replica)
+            with self.lock:
+                self.healthy[id(replica)] = healthy
+
+    def _monitor(self):
+        while not self.stopping.wait(REPLICA_HEALTH_INTERVAL):
+            self.check_all()
+
+    def start(self):
+        if not self.replicas or self.monitor is not None:
+            return
+        self.check_all()
+        self.monitor = threading.Thread(target=self._monitor, name="replica-monitor", daemon=True)
+        self.monitor.start()
+        print(f"✅ Routing reads to {len(self.replicas)} replica(s)")
+
+    def stop(self):
+        self.stopping.set()
+        self.monitor = None
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "replicas": [
+                    {"url": replica.url.render_as_string(hide_password=True), "healthy": self.healthy[id(replica)]}
+                    for replica in self.replicas
+                ],
+                "reads_on_replica": self.reads_on_replica,
+                "reads_on_primary": self.reads_on_primary,
+                "sticky_clients": len(self.last_write),
+            }
+
+def _copy_sqlite(source: str, target: str):
+    src, dst = sqlite3.connect(source), sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        src.close()
+        dst.close()
+
+replica_router = ReplicaRouter(engine, replica_engines)
@@ -0,0 +1,151 @@
+"""
+Paged group reports for the chat's detailed timesheet, leave, email and task
+reports.
+
+A report lists rows grouped by a key (timesheets per user, leaves per status,
+emails per type, tasks per priority): groups in key order, each group's rows
+in the report's order. Each group carries its totals, which are aggregated in
+SQL. So a page costs two queries whatever the table size, and no rows beyond
+those shown leave the database.
+
+Pages are keyset-paginated on (group key, row): a page holds up to `limit`
+rows and at most MAX_PAGE_BYTES of them, and may stop inside a group. The
+cursor records the last row shown, so the next page continues inside that
+group. Every group has a `cursor` that continues after its last row on the
+page, and `item_cursors` that continue after each of its rows; the page's
+`next_cursor` continues after its last row (None at the end):
+
+    GET /reports/timesheets?limit=20
+    GET /reports/timesheets?cursor=<next_cursor>&limit=20
+
+A client that shows only part of a page can resume from the cursor of the
+last row it showed. Cursors are opaque; rows without a group value are
+grouped under "".
+"""
+
+import base64
+import binascii
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import and_, case, func, or_, select, tuple_
+from sqlalchemy.orm import Session
+from app.models.emails import Email
+from app.models.leaves import Leave
+from app.models.tasks import Task
+from app.models.timesheet import Timesheet
+from app.schemas.emails import EmailOut
+from app.schemas.leaves import LeaveOut
+from app.schemas.reports import ReportGroup, ReportPage
+from app.schemas.tasks import TaskOut
+from app.schemas.timesheet import TimesheetOut
+from app.sharding import SHARDED_TABLES, scatter
+
+@dataclass
+class Report:
+    model: Any
+    schema: Any
+    group: Any
+    # Order of the rows within a group; unique, as the cursor resumes after it
+    order: Tuple[Any, ...]
+    newest_first: bool
+    # Extra totals per group: name -> aggregate expression
+    totals: Dict[str, Any] = field(default_factory=dict)
+
+REPORTS = {
+    "timesheets": Report(
+        Timesheet, TimesheetOut, Timesheet.user_id, (Timesheet.date, Timesheet.id), True,
+        {"hours": func.coalesce(func.sum(Timesheet.hours), 0),
+         "pending": func.sum(case((Timesheet.submitted == False, 1), else_=0))},
+    ),
+    "leaves": Report(Leave, LeaveOut, Leave.status, (Leave.id,), False),
+    "emails": Report(Email, EmailOut, Email.type, (Email.id,), True),
+    "tasks": Report(Task, TaskOut, Task.priority, (Task.id,), False),
+}
+
+MAX_ROWS = 100
+MAX_PAGE_BYTES = int(os.getenv("REPORT_PAGE_BYTES", "65536"))
+
+def _row_key(report: Report, row) -> List[Any]:
+    return [getattr(row, column.key) for column in report.order]
+
+def encode_cursor(group_key: str, row_key: List[Any]) -> str:
+    after = [value.isoformat() if hasattr(value, "isoformat") else value for value in row_key]
+    return base64.urlsafe_b64encode(json.dumps({"group": group_key, "after": after}).encode()).decode().rstrip("=")
+
+def decode_cursor(report: Report, cursor: str) -> Tuple[str, List[Any]]:
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        group_key, after = position["group"], position["after"]
+        if not isinstance(group_key, str) or len(after) != len(report.order):
+            raise ValueError
+        row_key = []
+        for column, value in zip(report.order, after):
+            python_type = column.type.python_type
+            row_key.append(python_type.fromisoformat(value) if hasattr(python_type, "fromisoformat") else python_type(value))
+        return group_key, row_key
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid report cursor")
+
+def _on_shards(db: Session, report: Report, fn: Callable[[Session], list]) -> list:
+    if report.model.__tablename__ in SHARDED_TABLES:
+        return scatter(db, fn)
+    return [fn(db)]
+
+def report_page(db: Session, kind: str, cursor: Optional[str] = None, limit: int = 20) -> ReportPage:
+    if kind not in REPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown report: {kind}")
+    report = REPORTS[kind]
+    limit = max(1, min(limit, MAX_ROWS))
+    position = decode_cursor(report, cursor) if cursor else None
+    key = func.coalesce(report.group, "")
+
+    def rows(session):
+        order = [column.desc() if report.newest_first else column for column in report.order]
+        query = select(report.model, key).order_by(key, *order).limit(limit + 1)
+        if position is not None:
+            group_key, row_key = position
+            row, after = tuple_(*report.order), tuple_(*row_key)
+            query = query.where(or_(key > group_key, and_(key == group_key, row < after if report.newest_first else row > after)))
+        return session.execute(query).all()
+
+    # Each shard's first limit + 1 rows include the first limit + 1 overall
+    merged = [row for shard_rows in _on_shards(db, report, rows) for row in shard_rows]
+    merged.sort(key=lambda row: _row_key(report, row[0]), reverse=report.newest_first)
+    merged.sort(key=lambda row: row[1])
+
+    page_rows, size = [], 0
+    for item, group_key in merged[:limit]:
+        dumped = report.schema.from_orm(item).model_dump()
+        size += len(json.dumps(dumped, default=str))
+        if page_rows and size > MAX_PAGE_BYTES:
+            break
+        page_rows.append((group_key, dumped, encode_cursor(group_key, _row_key(report, item))))
+    if not page_rows:
+        return ReportPage(kind=kind, groups=[], next_cursor=None)
+    has_more = len(merged) > len(page_rows)
+    keys = list(dict.fromkeys(group_key for group_key, _, _ in page_rows))
+
+    def groups(session):
+        query = select(key, func.count(), *report.totals.values()).where(key.in_(keys)).group_by(key)
+        return session.execute(query).all()
+
+    totals: Dict[str, List[Any]] = {}
+    for shard_rows in _on_shards(db, report, groups):
+        for group_key, count, *extra in shard_rows:
+            merged_totals = totals.setdefault(group_key, [0] * (1 + len(extra)))
+            for i, value in enumerate((count, *extra)):
+                merged_totals[i] += value or 0
+
+    page = []
+    for group_key in keys:
+        shown = [(item, item_cursor) for row_key, item, item_cursor in page_rows if row_key == group_key]
+        count, *extra = totals[group_key]
+        page.append(ReportGroup(
+            key=group_key, count=count, totals=dict(zip(report.totals, extra)),
+            items=[item for item, _ in shown], item_cursors=[item_cursor for _, item_cursor in shown],
+            cursor=shown[-1][1], continued=not page and position is not None and position[0] == group_key,
+        ))
+    return ReportPage(kind=kind, groups=page, next_cursor=page[-1].cursor if has_more else None)
@@ -1,12 +1,13 @@
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.content import NegotiatedRoute
 from pydantic import BaseModel
 from typing import Optional
 import jwt
 from datetime import datetime, timedelta
 import hashlib
 
-router = APIRouter(prefix="/auth", tags=["Authentication"])
+router = APIRouter(prefix="/auth", tags=["Authentication"], route_class=NegotiatedRoute)
 security = HTTPBearer()
 
 # Secret key for JWT (in production, use environment variable)
@@ -61,7 +62,7 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
         return username
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
 @router.post("/login", response_model=Token)
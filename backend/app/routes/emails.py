@@ -1,73 +1,97 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from app.content import NegotiatedRoute
 from app.schemas.emails import EmailCreate, EmailOut
 from app.models.emails import Email
-from app.database import get_db
-from typing import List
+from app.database import get_db, db_session
+from app.cache import cached
+from app.ratelimit import rate_limit
+from app.idempotency import idempotent
+from app.schemas.jobs import JobStatusOut
+from app.job_queue import enqueue
+from app.services import emails as email_service
+from typing import List, Optional
+from datetime import date
 
-router = APIRouter(prefix="/emails", tags=["Emails"])
+router = APIRouter(prefix="/emails", tags=["Emails"], route_class=NegotiatedRoute)
 
-@router.post("/", response_model=EmailOut)
+@router.post("/", response_model=EmailOut, dependencies=[Depends(rate_limit("emails.create"))])
+@idempotent("emails.create")
 def create_email(email: EmailCreate, db: Session = Depends(get_db)):
     print("✅ Email API called from Rasa")
     try:
-        db_email = Email(**email.dict())
-        db.add(db_email)
-        db.commit()
-        db.refresh(db_email)
-        return EmailOut.from_orm(db_email)
+        return email_service.create_email(db, email)
     except Exception as e:
         db.rollback()
         print(f"❌ Error creating email: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to create email: {str(e)}")
 
 @router.get("/", response_model=List[EmailOut])
-def list_emails(db: Session = Depends(get_db)):
+@cached("emails")
+def list_emails(start: Optional[date] = None, end: Optional[date] = None, user_id: Optional[str] = None,
+                include_archive: bool = False, db: Session = Depends(db_session(timeout_ms=4000))):
     try:
-        emails = db.query(Email).all()
-        return [EmailOut.from_orm(email) for email in emails]
+        return email_service.list_emails(db, start, end, user_id, include_archive)
     except Exception as e:
         print(f"❌ Error listing emails: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to list emails: {str(e)}")
 
 @router.get("/remind-pending-timesheets", response_model=List[EmailOut])
-def remind_pending_timesheets_emails(db: Session = Depends(get_db)):
+@cached("emails")
+def remind_pending_timesheets_emails(start: Optional[date] = None, end: Optional[date] = None, db: Session = Depends(get_db)):
     try:
-        emails = db.query(Email).filter(Email.type == "reminder", Email.status == "Unread").all()
-        return [EmailOut.from_orm(email) for email in emails]
+        return email_service.list_emails_where(db, Email.type == "reminder", Email.status == "Unread", start=start, end=end)
     except Exception as e:
         print(f"❌ Error listing reminder emails: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to list reminder emails: {str(e)}")
 
+@router.post("/remind-pending-timesheets")
+@idempotent("emails.remind_pending")
+def generate_reminder_emails(start: Optional[date] = None, end: Optional[date] = None,
+                             db: Session = Depends(db_session(timeout_ms=30000))):
+    """Create reminder emails for every user with unsubmitted timesheets (default: this month)."""
+    try:
+        return {"created": email_service.generate_reminder_emails(db, start, end)}
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error generating reminder emails: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate reminder emails: {str(e)}")
+
+@router.post("/remind-pending-timesheets/async", response_model=JobStatusOut, status_code=202)
+@idempotent("emails.remind_pending_async")
+def generate_reminder_emails_async(start: Optional[date] = None, end: Optional[date] = None, db: Session = Depends(get_db)):
+    try:
+        payload = {"start": start.isoformat() if start else None, "end": end.isoformat() if end else None}
+        return enqueue(db, "generate_timesheet_reminders", payload, title="Generate timesheet reminders")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error queueing reminder generation: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to queue reminder generation: {str(e)}")
+
 @router.get("/submit-pending-timesheets", response_model=List[EmailOut])
-def submit_pending_timesheets_emails(db: Session = Depends(get_db)):
+@cached("emails")
+def submit_pending_timesheets_emails(start: Optional[date] = None, end: Optional[date] = None, db: Session = Depends(get_db)):
     try:
-        emails = db.query(Email).filter(Email.type == "submit", Email.status == "Unread").all()
-        return [EmailOut.from_orm(email) for email in emails]
+        return email_service.list_emails_where(db, Email.type == "submit", Email.status == "Unread", start=start, end=end)
     except Exception as e:
         print(f"❌ Error listing submit emails: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to list submit emails: {str(e)}")
 
 @router.post("/draft", response_model=EmailOut)
+@idempotent("emails.draft")
 def create_draft_email(email: EmailCreate, db: Session = Depends(get_db)):
     try:
-        data = email.dict()
-        data["status"] = "Draft"
-        db_email = Email(**data)
-        db.add(db_email)
-        db.commit()
-        db.refresh(db_email)
-        return EmailOut.from_orm(db_email)
+        return email_service.create_draft_email(db, email)
     except Exception as e:
         db.rollback()
         print(f"❌ Error creating draft email: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to create draft email: {str(e)}")
 
 @router.get("/drafts", response_model=List[EmailOut])
-def list_draft_emails(db: Session = Depends(get_db)):
+@cached("emails")
+def list_draft_emails(start: Optional[date] = None, end: Optional[date] = None, db: Session = Depends(get_db)):
     try:
-        emails = db.query(Email).filter(Email.status == "Draft").all()
-        return [EmailOut.from_orm(email) for email in emails]
+        return email_service.list_emails_where(db, Email.status == "Draft", start=start, end=end)
     except Exception as e:
         print(f"❌ Error listing draft emails: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to list draft emails: {str(e)}")
@@ -75,13 +99,10 @@ def list_draft_emails(db: Session = Depends(get_db)):
 @router.get("/{email_id}/context", response_model=EmailOut)
 def provide_email_context(email_id: int, db: Session = Depends(get_db)):
     try:
-        email = db.query(Email).filter(Email.id == email_id).first()
-        if not email:
-            raise HTTPException(status_code=404, detail="Email not found")
         # Here you could add more context if needed
-        return EmailOut.from_orm(email)
+        return email_service.get_email(db, email_id)
     except HTTPException:
         raise
     except Exception as e:
         print(f"❌ Error getting email context: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to get email context: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to get email context: {str(e)}") 
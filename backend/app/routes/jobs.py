@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.schemas.jobs import JobCreate, JobOut
-from app.models.jobs import Job
+from app.content import NegotiatedRoute
+from app.schemas.jobs import JobCreate, JobOut, JobEnqueue, JobStatusOut
 from app.database import SessionLocal
+from app.job_queue import enqueue, HANDLERS
+from app.idempotency import idempotent
+from app.services import jobs as job_service
+from typing import List, Optional
 
-router = APIRouter(prefix="/jobs", tags=["Jobs"])
+router = APIRouter(prefix="/jobs", tags=["Jobs"], route_class=NegotiatedRoute)
 
 def get_db():
     db = SessionLocal()
@@ -14,13 +18,25 @@ def get_db():
         db.close()
 
 @router.post("/", response_model=JobOut)
+@idempotent("jobs.create")
 def create_job(job: JobCreate, db: Session = Depends(get_db)):
-    db_job = Job(**job.dict())
-    db.add(db_job)
-    db.commit()
-    db.refresh(db_job)
-    return db_job
+    return job_service.create_job(db, job)
 
 @router.get("/", response_model=list[JobOut])
 def list_jobs(db: Session = Depends(get_db)):
-    return db.query(Job).all() 
\ No newline at end of file
+    return job_service.list_jobs(db)
+
+@router.post("/enqueue", response_model=JobStatusOut, status_code=202)
+@idempotent("jobs.enqueue")
+def enqueue_job(job: JobEnqueue, db: Session = Depends(get_db)):
+    if job.kind not in HANDLERS:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind: {job.kind}")
+    return enqueue(db, job.kind, job.payload, max_attempts=job.max_attempts)
+
+@router.get("/queue", response_model=List[JobStatusOut])
+def list_queue(status: Optional[str] = None, limit: int = 100, db: Session = Depends(get_db)):
+    return job_service.list_queue(db, status, limit)
+
+@router.get("/{job_id}", response_model=JobStatusOut)
+def get_job_status(job_id: int, db: Session = Depends(get_db)):
+    return job_service.get_job_status(db, job_id)
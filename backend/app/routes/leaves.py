@@ -1,51 +1,67 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from app.schemas.leaves import LeaveCreate, LeaveOut, LeaveUpdate
-from app.models.leaves import Leave
+from app.content import NegotiatedRoute
+from app.schemas.leaves import LeaveCreate, LeaveOut, LeaveUpdate, UserAvailability
 from app.database import get_db
-from typing import List
+from app.cache import cached
+from app.ratelimit import rate_limit
+from app.idempotency import idempotent
+from app.services import leaves as leave_service
+from typing import List, Optional
+from datetime import date
 
-router = APIRouter(prefix="/leaves", tags=["Leaves"])
+router = APIRouter(prefix="/leaves", tags=["Leaves"], route_class=NegotiatedRoute)
 
-@router.post("/", response_model=LeaveOut)
+@router.post("/", response_model=LeaveOut, dependencies=[Depends(rate_limit("leaves.create"))])
+@idempotent("leaves.create")
 def create_leave(leave: LeaveCreate, db: Session = Depends(get_db)):
     print("✅ Leave API called from Rasa")
     try:
-        db_leave = Leave(**leave.dict())
-        db.add(db_leave)
-        db.commit()
-        db.refresh(db_leave)
-        return LeaveOut.from_orm(db_leave)
+        return leave_service.create_leave(db, leave)
     except Exception as e:
         db.rollback()
         print(f"❌ Error creating leave: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to create leave: {str(e)}")
 
 @router.get("/", response_model=List[LeaveOut])
+@cached("leaves")
 def list_leaves(db: Session = Depends(get_db)):
     try:
-        leaves = db.query(Leave).all()
-        return [LeaveOut.from_orm(leave) for leave in leaves]
+        return leave_service.list_leaves(db)
     except Exception as e:
         print(f"❌ Error listing leaves: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to list leaves: {str(e)}")
 
+@router.get("/overlapping", response_model=List[LeaveOut])
+@cached("leaves")
+def list_overlapping_leaves(start: date, end: date, user_id: Optional[List[str]] = Query(None),
+                            status: Optional[str] = None, db: Session = Depends(get_db)):
+    try:
+        return leave_service.list_overlapping_leaves(db, start, end, user_id, status)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error listing overlapping leaves: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to list overlapping leaves: {str(e)}")
+
+@router.get("/availability", response_model=List[UserAvailability])
+@cached("leaves")
+def team_availability(start: date, end: date, user_id: List[str] = Query(...), db: Session = Depends(get_db)):
+    try:
+        return leave_service.team_availability(db, start, end, user_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error getting team availability: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get team availability: {str(e)}")
+
 @router.put("/{leave_id}", response_model=LeaveOut)
 def update_leave(leave_id: int, leave: LeaveUpdate, db: Session = Depends(get_db)):
     try:
-        db_leave = db.query(Leave).filter(Leave.id == leave_id).first()
-        if not db_leave:
-            raise HTTPException(status_code=404, detail="Leave not found")
-        
-        for key, value in leave.dict(exclude_unset=True).items():
-            setattr(db_leave, key, value)
-        
-        db.commit()
-        db.refresh(db_leave)
-        return LeaveOut.from_orm(db_leave)
+        return leave_service.update_leave(db, leave_id, leave)
     except HTTPException:
         raise
     except Exception as e:
         db.rollback()
         print(f"❌ Error updating leave: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to update leave: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to update leave: {str(e)}") 
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.content import NegotiatedRoute
+from app.schemas.reports import ReportPage
+from app.database import get_db
+from app.cache import cached
+from app.reports import report_page
+from typing import Optional
+
+router = APIRouter(prefix="/reports", tags=["Reports"], route_class=NegotiatedRoute)
+
+@router.get("/{kind}", response_model=ReportPage)
+@cached("timesheets", "leaves", "emails", "tasks")
+def get_report(kind: str, cursor: Optional[str] = None, limit: int = Query(20, ge=1, le=100),
+               db: Session = Depends(get_db)):
+    try:
+        return report_page(db, kind, cursor, limit)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error building {kind} report: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to build {kind} report: {str(e)}")
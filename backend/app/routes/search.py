@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.content import NegotiatedRoute
+from app.schemas.search import SearchHit
+from app.database import db_session
+from app.search import search, SEARCHABLE
+from typing import List, Optional
+
+router = APIRouter(prefix="/search", tags=["Search"], route_class=NegotiatedRoute)
+
+@router.get("/", response_model=List[SearchHit])
+def search_emails_and_tasks(q: str = Query(..., min_length=1), user_id: Optional[str] = None,
+                            kind: Optional[List[str]] = Query(None),
+                            limit: int = Query(20, ge=1, le=100), offset: int = Query(0, ge=0),
+                            db: Session = Depends(db_session(timeout_ms=3000))):
+    kinds = kind or list(SEARCHABLE)
+    unknown = [k for k in kinds if k not in SEARCHABLE]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown search kind: {', '.join(unknown)}")
+    try:
+        return search(db, q, kinds, user_id=user_id, limit=limit, offset=offset)
+    except Exception as e:
+        print(f"❌ Error searching: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to search: {str(e)}")
@@ -1,31 +1,31 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from app.content import NegotiatedRoute
 from app.schemas.tasks import TaskCreate, TaskOut
-from app.models.tasks import Task
 from app.database import get_db
+from app.cache import cached
+from app.idempotency import idempotent
+from app.services import tasks as task_service
 from typing import List
 
-router = APIRouter(prefix="/tasks", tags=["Tasks"])
+router = APIRouter(prefix="/tasks", tags=["Tasks"], route_class=NegotiatedRoute)
 
 @router.post("/", response_model=TaskOut)
+@idempotent("tasks.create")
 def create_task(task: TaskCreate, db: Session = Depends(get_db)):
     print("✅ Task API called from Rasa")
     try:
-        db_task = Task(**task.dict())
-        db.add(db_task)
-        db.commit()
-        db.refresh(db_task)
-        return TaskOut.from_orm(db_task)
+        return task_service.create_task(db, task)
     except Exception as e:
         db.rollback()
         print(f"❌ Error creating task: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to create task: {str(e)}")
 
 @router.get("/", response_model=List[TaskOut])
+@cached("tasks")
 def list_tasks(db: Session = Depends(get_db)):
     try:
-        tasks = db.query(Task).all()
-        return [TaskOut.from_orm(task) for task in tasks]
+        return task_service.list_tasks(db)
     except Exception as e:
         print(f"❌ Error listing tasks: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to list tasks: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to list tasks: {str(e)}") 
@@ -1,46 +1,46 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.schemas.timesheet import TimesheetCreate, TimesheetOut
-from app.models.timesheet import Timesheet
-from app.database import get_db
-from typing import List
+from app.content import NegotiatedRoute
+from app.schemas.timesheet import TimesheetCreate, TimesheetUpdate, TimesheetOut, TimesheetSummary
+from app.schemas.jobs import JobStatusOut
+from app.job_queue import enqueue
+from app.database import get_db, db_session
+from app.cache import cached
+from app.ratelimit import rate_limit
+from app.idempotency import idempotent
+from app.services import timesheet as timesheet_service
+from typing import List, Optional
+from datetime import date
 
-router = APIRouter(prefix="/timesheets", tags=["Timesheets"])
+router = APIRouter(prefix="/timesheets", tags=["Timesheets"], route_class=NegotiatedRoute)
 
-@router.post("/", response_model=TimesheetOut)
+@router.post("/", response_model=TimesheetOut, dependencies=[Depends(rate_limit("timesheets.create"))])
+@idempotent("timesheets.create")
 def create_timesheet(timesheet: TimesheetCreate, db: Session = Depends(get_db)):
     print("✅ Timesheet API called from Rasa")
     try:
-        db_ts = Timesheet(**timesheet.dict())
-        db.add(db_ts)
-        db.commit()
-        db.refresh(db_ts)
-        return TimesheetOut.from_orm(db_ts)
+        return timesheet_service.create_timesheet(db, timesheet)
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         print(f"❌ Error creating timesheet: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to create timesheet: {str(e)}")
 
 @router.get("/", response_model=List[TimesheetOut])
-def list_timesheets(db: Session = Depends(get_db)):
+@cached("timesheets")
+def list_timesheets(start: Optional[date] = None, end: Optional[date] = None, user_id: Optional[str] = None,
+                    include_archive: bool = False, db: Session = Depends(get_db)):
     try:
-        timesheets = db.query(Timesheet).all()
-        return [TimesheetOut.from_orm(ts) for ts in timesheets]
+        return timesheet_service.list_timesheets(db, start, end, user_id, include_archive)
     except Exception as e:
         print(f"❌ Error listing timesheets: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to list timesheets: {str(e)}")
 
 @router.put("/{timesheet_id}", response_model=TimesheetOut)
-def update_timesheet(timesheet_id: int, timesheet: TimesheetCreate, db: Session = Depends(get_db)):
+def update_timesheet(timesheet_id: int, timesheet: TimesheetUpdate, db: Session = Depends(get_db)):
     try:
-        db_ts = db.query(Timesheet).filter(Timesheet.id == timesheet_id).first()
-        if not db_ts:
-            raise HTTPException(status_code=404, detail="Timesheet not found")
-        for key, value in timesheet.dict().items():
-            setattr(db_ts, key, value)
-        db.commit()
-        db.refresh(db_ts)
-        return TimesheetOut.from_orm(db_ts)
+        return timesheet_service.update_timesheet(db, timesheet_id, timesheet)
     except HTTPException:
         raise
     except Exception as e:
@@ -51,14 +51,7 @@ def update_timesheet(timesheet_id: int, timesheet: TimesheetCreate, db: Session
 @router.post("/{timesheet_id}/approve", response_model=TimesheetOut)
 def approve_timesheet(timesheet_id: int, approver: str, db: Session = Depends(get_db)):
     try:
-        db_ts = db.query(Timesheet).filter(Timesheet.id == timesheet_id).first()
-        if not db_ts:
-            raise HTTPException(status_code=404, detail="Timesheet not found")
-        db_ts.submitted = True
-        db_ts.approved_by = approver
-        db.commit()
-        db.refresh(db_ts)
-        return TimesheetOut.from_orm(db_ts)
+        return timesheet_service.approve_timesheet(db, timesheet_id, approver)
     except HTTPException:
         raise
     except Exception as e:
@@ -67,24 +60,42 @@ def approve_timesheet(timesheet_id: int, approver: str, db: Session = Depends(ge
         raise HTTPException(status_code=500, detail=f"Failed to approve timesheet: {str(e)}")
 
 @router.get("/pending", response_model=List[TimesheetOut])
-def list_pending_timesheets(db: Session = Depends(get_db)):
+@cached("timesheets")
+def list_pending_timesheets(start: Optional[date] = None, end: Optional[date] = None, user_id: Optional[str] = None,
+                            db: Session = Depends(get_db)):
     try:
-        timesheets = db.query(Timesheet).filter(Timesheet.submitted == False).all()
-        return [TimesheetOut.from_orm(ts) for ts in timesheets]
+        return timesheet_service.list_pending_timesheets(db, start, end, user_id)
     except Exception as e:
         print(f"❌ Error listing pending timesheets: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to list pending timesheets: {str(e)}")
 
+@router.get("/summary", response_model=List[TimesheetSummary])
+@cached("timesheets")
+def timesheet_summary(start: Optional[date] = None, end: Optional[date] = None, db: Session = Depends(get_db)):
+    """Entries, hours and unsubmitted entries per user, aggregated on every shard in parallel."""
+    try:
+        return timesheet_service.timesheet_summary(db, start, end)
+    except Exception as e:
+        print(f"❌ Error summarizing timesheets: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to summarize timesheets: {str(e)}")
+
 @router.post("/send-pending", response_model=List[TimesheetOut])
-def send_pending_timesheets(approver: str, db: Session = Depends(get_db)):
+@idempotent("timesheets.send_pending")
+def send_pending_timesheets(approver: str, db: Session = Depends(db_session(timeout_ms=30000))):
     try:
-        pending = db.query(Timesheet).filter(Timesheet.submitted == False).all()
-        for ts in pending:
-            ts.submitted = True
-            ts.approved_by = approver
-        db.commit()
-        return [TimesheetOut.from_orm(ts) for ts in pending]
+        return timesheet_service.send_pending_timesheets(db, approver)
     except Exception as e:
         db.rollback()
         print(f"❌ Error sending pending timesheets: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to send pending timesheets: {str(e)}")
+
+@router.post("/send-pending/async", response_model=JobStatusOut, status_code=202)
+@idempotent("timesheets.send_pending_async")
+def send_pending_timesheets_async(approver: str, db: Session = Depends(get_db)):
+    """Queue the bulk approval and return the job id; poll GET /jobs/{id} for progress."""
+    try:
+        return enqueue(db, "approve_pending_timesheets", {"approver": approver}, title="Approve pending timesheets")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error queueing pending timesheet approval: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to queue pending timesheet approval: {str(e)}")
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional
+from datetime import datetime
 
 class EmailCreate(BaseModel):
     user_id: str
@@ -11,6 +12,9 @@ class EmailCreate(BaseModel):
 
 class EmailOut(EmailCreate):
     id: int
+    created_at: Optional[datetime] = None
+    delivery_status: Optional[str] = None
+    sent_at: Optional[datetime] = None
 
     class Config:
-        orm_mode = True 
\ No newline at end of file
+        from_attributes = True 
\ No newline at end of file
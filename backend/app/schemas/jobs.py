@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from datetime import date
+from datetime import date, datetime
+from typing import Any, Optional
 
 class JobCreate(BaseModel):
     job_title: str
@@ -13,4 +14,25 @@ class JobOut(JobCreate):
     id: int
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class JobEnqueue(BaseModel):
+    kind: str
+    payload: dict = {}
+    max_attempts: int = 3
+
+class JobStatusOut(BaseModel):
+    id: int
+    kind: str
+    status: str
+    progress: float = 0.0
+    attempts: int = 0
+    max_attempts: int = 3
+    description: Optional[str] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
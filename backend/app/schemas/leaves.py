@@ -1,24 +1,57 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 from datetime import date
-from typing import Optional
+from typing import Optional, List
+
+# Longest single leave request we accept. Overlap queries rely on this bound to
+# turn "end_date >= X" into an index range on start_date.
+MAX_LEAVE_DAYS = 90
 
 class LeaveCreate(BaseModel):
     user_id: str
     email: str
-    date: str  # Changed to str since Rasa sends string dates
+    start_date: date
+    end_date: Optional[date] = None
     leave_type: str
     reason: str
     status: str = "Pending"
 
+    @model_validator(mode="before")
+    @classmethod
+    def accept_single_date(cls, data):
+        # Rasa still sends a single "date" string for one-day leaves
+        if isinstance(data, dict) and "start_date" not in data and "date" in data:
+            data = dict(data)
+            data["start_date"] = data.pop("date")
+        return data
+
+    @model_validator(mode="after")
+    def check_range(self):
+        if self.end_date is None:
+            self.end_date = self.start_date
+        if self.end_date < self.start_date:
+            raise ValueError("end_date must not be before start_date")
+        if (self.end_date - self.start_date).days >= MAX_LEAVE_DAYS:
+            raise ValueError(f"Leave cannot be longer than {MAX_LEAVE_DAYS} days")
+        return self
+
 class LeaveUpdate(BaseModel):
     status: Optional[str] = None
     approved_by: Optional[str] = None
     approval_comment: Optional[str] = None
+    # Version the client last read; omit to overwrite unconditionally
+    version: Optional[int] = None
 
 class LeaveOut(LeaveCreate):
     id: int
+    end_date: date
+    version: int = 1
     approved_by: Optional[str] = None
     approval_comment: Optional[str] = None
 
     class Config:
-        orm_mode = True 
\ No newline at end of file
+        from_attributes = True
+
+class UserAvailability(BaseModel):
+    user_id: str
+    available: bool
+    leaves: List[LeaveOut] = []
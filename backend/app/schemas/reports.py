@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+
+class ReportGroup(BaseModel):
+    key: str
+    count: int
+    # Report specific, e.g. hours and pending for timesheets
+    totals: Dict[str, float] = {}
+    # The group's rows on this page, as the entity's list route returns them
+    items: List[Dict[str, Any]]
+    # Continues the report after each of those rows
+    item_cursors: List[str]
+    # Continues the report after this group's last row on the page
+    cursor: str
+    # The group started on an earlier page
+    continued: bool = False
+
+class ReportPage(BaseModel):
+    kind: str
+    groups: List[ReportGroup]
+    next_cursor: Optional[str] = None
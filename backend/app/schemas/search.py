@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class SearchHit(BaseModel):
+    kind: str
+    id: int
+    user_id: Optional[str] = None
+    title: Optional[str] = None
+    snippet: Optional[str] = None
+    rank: float
@@ -13,4 +13,4 @@ class TaskOut(TaskCreate):
     id: int
 
     class Config:
-        orm_mode = True 
\ No newline at end of file
+        from_attributes = True 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 from typing import Optional
 import datetime
 
@@ -9,17 +9,37 @@ class TimesheetCreate(BaseModel):
     from_time: datetime.time
     to_time: datetime.time
     task_summary: str
-    hours: int
+    hours: Optional[float] = None  # Always derived from from_time/to_time
     description: str
     submitted: bool = False
     approved_by: Optional[str] = None
 
+    @model_validator(mode="after")
+    def derive_hours(self):
+        start = datetime.datetime.combine(self.date, self.from_time)
+        end = datetime.datetime.combine(self.date, self.to_time)
+        if end <= start:
+            raise ValueError("to_time must be after from_time")
+        self.hours = round((end - start).total_seconds() / 3600, 2)
+        return self
+
+class TimesheetUpdate(TimesheetCreate):
+    # Version the client last read; omit to overwrite unconditionally
+    version: Optional[int] = None
+
 class TimesheetOut(TimesheetCreate):
     id: int
+    version: int = 1
 
     class Config:
-        orm_mode = True
+        from_attributes = True
         json_encoders = {
             __import__('datetime').date: lambda v: v.isoformat(),
             __import__('datetime').time: lambda v: v.strftime('%H:%M:%S'),
         }
+
+class TimesheetSummary(BaseModel):
+    user_id: str
+    entries: int
+    hours: float
+    pending: int
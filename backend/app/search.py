@@ -0,0 +1,124 @@
+"""
+Full-text search over emails (subject, message) and tasks (title, description).
+
+Postgres: a generated tsvector column per table with a GIN index, so the
+index follows every INSERT/UPDATE without application code.
+SQLite: external-content FTS5 tables kept in sync by triggers.
+
+ensure_search_index() creates whatever is missing and is safe to call on
+every startup.
+"""
+
+from typing import List, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.sharding import SHARDED_TABLES, scatter, user_dbs
+
+# kind -> (table, title column, body column)
+SEARCHABLE = {
+    "emails": ("emails", "subject", "message"),
+    "tasks": ("tasks", "title", "description"),
+}
+
+def _is_postgres(bind) -> bool:
+    return bind.dialect.name == "postgresql"
+
+def ensure_search_index(engine):
+    with engine.begin() as conn:
+        for table, title, body in SEARCHABLE.values():
+            if _is_postgres(engine):
+                _ensure_postgres_index(conn, table, title, body)
+            elif engine.dialect.name == "sqlite":
+                _ensure_sqlite_index(conn, table, title, body)
+
+def _ensure_postgres_index(conn, table, title, body):
+    conn.execute(text(
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS (setweight(to_tsvector('english', coalesce({title}, '')), 'A') || "
+        f"setweight(to_tsvector('english', coalesce({body}, '')), 'B')) STORED"
+    ))
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_search ON {table} USING gin (search_vector)"))
+
+def _ensure_sqlite_index(conn, table, title, body):
+    fts = f"{table}_fts"
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": fts}
+    ).first()
+    if exists:
+        return
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({title}, {body}, content='{table}', "
+        f"content_rowid='id', tokenize='porter unicode61')"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {title}, {body}) VALUES (new.id, new.{title}, new.{body}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {title}, {body}) VALUES ('delete', old.id, old.{title}, old.{body}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {title}, {body} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {title}, {body}) VALUES ('delete', old.id, old.{title}, old.{body}); "
+        f"INSERT INTO {fts}(rowid, {title}, {body}) VALUES (new.id, new.{title}, new.{body}); END"
+    ))
+    # Index rows that existed before the FTS table
+    conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+def _fts5_query(q: str) -> str:
+    # Quote every term so user input cannot inject FTS5 syntax; terms are ANDed
+    terms = [term.replace('"', '""') for term in q.split()]
+    return " ".join(f'"{term}"' for term in terms if term)
+
+def _search_table(db: Session, kind: str, q: str, user_id: Optional[str], limit: int) -> List[dict]:
+    table, title, body = SEARCHABLE[kind]
+    params = {"q": q, "limit": limit}
+    user_filter = ""
+    if user_id:
+        user_filter = "AND t.user_id = :user_id"
+        params["user_id"] = user_id
+
+    if _is_postgres(db.get_bind()):
+        sql = (
+            f"SELECT t.id, t.user_id, t.{title} AS title, "
+            f"ts_headline('english', coalesce(t.{body}, ''), query, 'MaxFragments=1, MaxWords=20') AS snippet, "
+            f"ts_rank(t.search_vector, query) AS rank "
+            f"FROM {table} t, websearch_to_tsquery('english', :q) query "
+            f"WHERE t.search_vector @@ query {user_filter} "
+            f"ORDER BY rank DESC, t.id DESC LIMIT :limit"
+        )
+    else:
+        params["q"] = _fts5_query(q)
+        if not params["q"]:
+            return []
+        # bm25() is lower-is-better; negate it so both backends sort descending
+        sql = (
+            f"SELECT t.id, t.user_id, t.{title} AS title, "
+            f"snippet({table}_fts, 1, '[', ']', '…', 12) AS snippet, "
+            f"-bm25({table}_fts) AS rank "
+            f"FROM {table}_fts JOIN {table} t ON t.id = {table}_fts.rowid "
+            f"WHERE {table}_fts MATCH :q {user_filter} "
+            f"ORDER BY rank DESC, t.id DESC LIMIT :limit"
+        )
+    return [dict(row._mapping, kind=kind) for row in db.execute(text(sql), params)]
+
+def search(db: Session, q: str, kinds: List[str], user_id: Optional[str] = None,
+           limit: int = 20, offset: int = 0) -> List[dict]:
+    """Ranked hits across the requested kinds, paginated after merging."""
+    hits = []
+    for kind in kinds:
+        if kind not in SHARDED_TABLES:
+            hits.extend(_search_table(db, kind, q, user_id, offset + limit))
+        elif user_id:
+            # Two shards during a rebalance; a row mid-move is counted once
+            found = {}
+            for session in user_dbs(db, user_id):
+                for hit in _search_table(session, kind, q, user_id, offset + limit):
+                    found.setdefault(hit["id"], hit)
+            hits.extend(found.values())
+        else:
+            for shard_hits in scatter(db, lambda session: _search_table(session, kind, q, user_id, offset + limit)):
+                hits.extend(shard_hits)
+    hits.sort(key=lambda hit: hit["rank"], reverse=True)
+    return hits[offset:offset + limit]
@@ -0,0 +1,29 @@
+"""
+Service layer: the CRUD and query logic behind the HTTP routes.
+
+Each function takes a Session plus plain arguments or request schemas and
+returns response schemas, raising HTTPException for 4xx outcomes like the
+routes do. The routes in app/routes only add HTTP concerns (dependencies,
+caching, rate limits, turning unexpected errors into 500s), so other
+in-process callers, such as the Rasa action server in direct mode, get the
+same behavior without going through HTTP:
+
+    with service_session() as db:
+        rows = timesheet.list_pending_timesheets(db)
+"""
+
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, DB_STATEMENT_TIMEOUT_MS
+
+@contextmanager
+def service_session(timeout_ms: Optional[int] = DB_STATEMENT_TIMEOUT_MS) -> Iterator[Session]:
+    """A pooled session on the primary with the same statement timeout as a request."""
+    from app.sharding import close_shard_sessions
+    db = SessionLocal(info={"statement_timeout_ms": timeout_ms})
+    try:
+        yield db
+    finally:
+        close_shard_sessions(db)
+        db.close()
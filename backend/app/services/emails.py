@@ -0,0 +1,60 @@
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from app.schemas.emails import EmailCreate, EmailOut
+from app.models.emails import Email
+from app.cache import invalidate
+from app.writes import create_row
+from app.sharding import find_shard, gather, gather_user, scatter, shard_db
+from app.partitioning import apply_date_range
+from app.archive import read_archived
+from app.reminders import generate_pending_timesheet_reminders
+from typing import List, Optional
+from datetime import date
+
+def create_email(db: Session, email: EmailCreate) -> EmailOut:
+    data = email.dict()
+    if data.get("status") != "Draft":
+        data["delivery_status"] = "queued"  # picked up by the outbox dispatcher
+    db_email = create_row(shard_db(db, email.user_id), Email, data)
+    invalidate("emails")
+    return EmailOut.from_orm(db_email)
+
+def create_draft_email(db: Session, email: EmailCreate) -> EmailOut:
+    data = email.dict()
+    data["status"] = "Draft"
+    db_email = create_row(shard_db(db, email.user_id), Email, data)
+    invalidate("emails")
+    return EmailOut.from_orm(db_email)
+
+def list_emails(db: Session, start: Optional[date] = None, end: Optional[date] = None,
+                user_id: Optional[str] = None, include_archive: bool = False) -> List[EmailOut]:
+    def query(session):
+        q = apply_date_range(session.query(Email), Email.created_at, start, end)
+        return q.filter(Email.user_id == user_id).all() if user_id else q.all()
+    # One user's emails live on one shard; the full list is gathered from all
+    emails = gather_user(db, user_id, query) if user_id else gather(db, query)
+    result = [EmailOut.from_orm(email) for email in emails]
+    if include_archive:
+        archived = read_archived("emails", start, end)
+        if user_id:
+            archived = [row for row in archived if row["user_id"] == user_id]
+        result = [EmailOut(**row) for row in archived] + result
+    return result
+
+def list_emails_where(db: Session, *criteria, start: Optional[date] = None, end: Optional[date] = None) -> List[EmailOut]:
+    """Emails matching `criteria` on every shard, e.g. Email.status == "Draft"."""
+    emails = gather(db, lambda session: apply_date_range(
+        session.query(Email).filter(*criteria), Email.created_at, start, end,
+    ).all())
+    return [EmailOut.from_orm(email) for email in emails]
+
+def generate_reminder_emails(db: Session, start: Optional[date] = None, end: Optional[date] = None) -> int:
+    """Create reminder emails for every user with unsubmitted timesheets; returns how many."""
+    # Timesheets and emails of a user share a shard, so each shard is self-contained
+    return sum(scatter(db, lambda session: generate_pending_timesheet_reminders(session, start, end)))
+
+def get_email(db: Session, email_id: int) -> EmailOut:
+    email = find_shard(db, Email, email_id).query(Email).filter(Email.id == email_id).first()
+    if not email:
+        raise HTTPException(status_code=404, detail="Email not found")
+    return EmailOut.from_orm(email)
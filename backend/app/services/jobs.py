@@ -0,0 +1,27 @@
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from app.schemas.jobs import JobCreate, JobOut, JobStatusOut
+from app.models.jobs import Job
+from app.writes import insert_returning
+from typing import List, Optional
+
+def create_job(db: Session, job: JobCreate) -> JobOut:
+    db_job = insert_returning(db, Job, job.dict())
+    db.commit()
+    return JobOut.from_orm(db_job)
+
+def list_jobs(db: Session) -> List[JobOut]:
+    """Job postings; queued background work shares the table but has a kind."""
+    return [JobOut.from_orm(job) for job in db.query(Job).filter(Job.kind.is_(None)).all()]
+
+def list_queue(db: Session, status: Optional[str] = None, limit: int = 100) -> List[JobStatusOut]:
+    query = db.query(Job).filter(Job.kind.isnot(None))
+    if status:
+        query = query.filter(Job.status == status)
+    return [JobStatusOut.from_orm(job) for job in query.order_by(Job.id.desc()).limit(limit).all()]
+
+def get_job_status(db: Session, job_id: int) -> JobStatusOut:
+    job = db.query(Job).filter(Job.id == job_id, Job.kind.isnot(None)).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobStatusOut.from_orm(job)
@@ -0,0 +1,64 @@
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from app.schemas.leaves import LeaveCreate, LeaveOut, LeaveUpdate, UserAvailability, MAX_LEAVE_DAYS
+from app.models.leaves import Leave
+from app.cache import invalidate
+from app.writes import create_row, update_returning
+from typing import List, Optional
+from datetime import date, timedelta
+
+def create_leave(db: Session, leave: LeaveCreate) -> LeaveOut:
+    db_leave = create_row(db, Leave, leave.dict())
+    invalidate("leaves")
+    return LeaveOut.from_orm(db_leave)
+
+def list_leaves(db: Session) -> List[LeaveOut]:
+    return [LeaveOut.from_orm(leave) for leave in db.query(Leave).all()]
+
+def check_window(start: date, end: date):
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+
+def overlapping_leaves_query(db: Session, start: date, end: date, user_ids: Optional[List[str]] = None):
+    """Leaves overlapping [start, end], as an index range scan.
+
+    No leave is longer than MAX_LEAVE_DAYS, so anything overlapping the window
+    must start inside [start - MAX_LEAVE_DAYS, end]. Bounding start_date on
+    both sides lets ix_leaves_start_end seek instead of scanning the table.
+    """
+    query = db.query(Leave).filter(
+        Leave.start_date >= start - timedelta(days=MAX_LEAVE_DAYS),
+        Leave.start_date <= end,
+        Leave.end_date >= start,
+    )
+    if user_ids:
+        query = query.filter(Leave.user_id.in_(user_ids))
+    return query.order_by(Leave.start_date)
+
+def list_overlapping_leaves(db: Session, start: date, end: date, user_ids: Optional[List[str]] = None,
+                            status: Optional[str] = None) -> List[LeaveOut]:
+    check_window(start, end)
+    query = overlapping_leaves_query(db, start, end, user_ids)
+    if status:
+        query = query.filter(Leave.status == status)
+    return [LeaveOut.from_orm(leave) for leave in query.all()]
+
+def team_availability(db: Session, start: date, end: date, user_ids: List[str]) -> List[UserAvailability]:
+    check_window(start, end)
+    leaves = overlapping_leaves_query(db, start, end, user_ids).filter(Leave.status != "Rejected").all()
+    by_user = {uid: [] for uid in user_ids}
+    for leave in leaves:
+        by_user[leave.user_id].append(LeaveOut.from_orm(leave))
+    return [
+        UserAvailability(user_id=uid, available=not user_leaves, leaves=user_leaves)
+        for uid, user_leaves in by_user.items()
+    ]
+
+def update_leave(db: Session, leave_id: int, leave: LeaveUpdate) -> LeaveOut:
+    db_leave = update_returning(
+        db, Leave, leave_id, leave.dict(exclude_unset=True, exclude={"version"}),
+        expected_version=leave.version, name="Leave",
+    )
+    db.commit()
+    invalidate("leaves")
+    return LeaveOut.from_orm(db_leave)
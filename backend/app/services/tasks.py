@@ -0,0 +1,14 @@
+from sqlalchemy.orm import Session
+from app.schemas.tasks import TaskCreate, TaskOut
+from app.models.tasks import Task
+from app.cache import invalidate
+from app.writes import create_row
+from typing import List
+
+def create_task(db: Session, task: TaskCreate) -> TaskOut:
+    db_task = create_row(db, Task, task.dict())
+    invalidate("tasks")
+    return TaskOut.from_orm(db_task)
+
+def list_tasks(db: Session) -> List[TaskOut]:
+    return [TaskOut.from_orm(task) for task in db.query(Task).all()]
@@ -0,0 +1,190 @@
+from fastapi import HTTPException
+from sqlalchemy import case, func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.schemas.timesheet import TimesheetCreate, TimesheetUpdate, TimesheetOut, TimesheetSummary
+from app.models.timesheet import Timesheet
+from app.database import PARTITIONED, SessionLocal
+from app.writes import create_row, update_returning
+from app.sharding import (
+    REBALANCING, SHARDED, find_shard, gather, gather_user, previous_shard_engine, scatter, shard_db, shard_engine,
+    user_engines,
+)
+from app.cache import invalidate
+from app.partitioning import apply_date_range
+from app.archive import read_archived
+from typing import Callable, List, Optional
+from datetime import date
+
+def find_overlapping_timesheet(db: Session, timesheet: TimesheetCreate, exclude_id: Optional[int] = None):
+    """Return an existing entry of the same user and day whose interval overlaps.
+
+    The lookup is a seek on ix_timesheets_user_date_from, so its cost depends on
+    the entries for that one day, not on the user's whole history. During a
+    rebalance both of the user's shards are checked, previous owner first.
+    """
+    def lookup(session):
+        query = session.query(Timesheet).filter(
+            Timesheet.user_id == timesheet.user_id,
+            Timesheet.date == timesheet.date,
+            Timesheet.from_time < timesheet.to_time,
+            Timesheet.to_time > timesheet.from_time,
+        )
+        if exclude_id is not None:
+            query = query.filter(Timesheet.id != exclude_id)
+        return query.first()
+
+    if not REBALANCING:
+        return lookup(db)
+    for bind in user_engines(timesheet.user_id):
+        if bind is db.get_bind():
+            existing = lookup(db)
+        else:
+            with SessionLocal(bind=bind) as session:
+                existing = lookup(session)
+        if existing:
+            return existing
+    return None
+
+def is_retry_of(existing: Timesheet, timesheet: TimesheetCreate) -> bool:
+    return (
+        existing.from_time == timesheet.from_time
+        and existing.to_time == timesheet.to_time
+        and existing.task_summary == timesheet.task_summary
+    )
+
+def overlap_error(existing: Timesheet) -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail=f"Timesheet overlaps entry {existing.id} ({existing.from_time}-{existing.to_time}) on {existing.date}",
+    )
+
+def retried_or_overlap(db: Session, timesheet: TimesheetCreate) -> Optional[Timesheet]:
+    """The entry a retried chat turn already created, or 409 if another entry overlaps."""
+    existing = find_overlapping_timesheet(db, timesheet)
+    if existing:
+        # A retried chat turn resends the same entry; hand back the original
+        if is_retry_of(existing, timesheet):
+            return existing
+        raise overlap_error(existing)
+    return None
+
+def create_timesheet(db: Session, timesheet: TimesheetCreate) -> TimesheetOut:
+    db = shard_db(db, timesheet.user_id)
+    try:
+        existing = retried_or_overlap(db, timesheet)
+        if existing:
+            return TimesheetOut.from_orm(existing)
+        # With group commit the check runs again in the batch, against the rows queued with this one
+        db_ts = create_row(db, Timesheet, timesheet.dict(), check=lambda session, values: retried_or_overlap(session, timesheet))
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Timesheet overlaps an existing entry")
+    invalidate("timesheets")
+    return TimesheetOut.from_orm(db_ts)
+
+def list_timesheets(db: Session, start: Optional[date] = None, end: Optional[date] = None,
+                    user_id: Optional[str] = None, include_archive: bool = False) -> List[TimesheetOut]:
+    def query(session):
+        q = apply_date_range(session.query(Timesheet), Timesheet.date, start, end)
+        return q.filter(Timesheet.user_id == user_id).all() if user_id else q.all()
+    # One user's entries live on one shard; the full list is gathered from all
+    timesheets = gather_user(db, user_id, query) if user_id else gather(db, query)
+    result = [TimesheetOut.from_orm(ts) for ts in timesheets]
+    if include_archive:
+        archived = read_archived("timesheets", start, end)
+        if user_id:
+            archived = [row for row in archived if row["user_id"] == user_id]
+        result = [TimesheetOut(**row) for row in archived] + result
+    return result
+
+def _on_row_shard(db: Session, timesheet_id: int, write: Callable[[Session], Timesheet]) -> Timesheet:
+    """Run `write` on the shard holding the timesheet.
+
+    During a rebalance the row can move between finding it and writing it;
+    the write then finds nothing (404) and is retried where the row is now.
+    """
+    try:
+        return write(find_shard(db, Timesheet, timesheet_id))
+    except HTTPException as e:
+        if e.status_code != 404 or not REBALANCING:
+            raise
+        return write(find_shard(db, Timesheet, timesheet_id))
+
+def update_timesheet(db: Session, timesheet_id: int, timesheet: TimesheetUpdate) -> TimesheetOut:
+    def write(db):
+        # During a rebalance the row may still be on the user's previous shard
+        if SHARDED and db.get_bind() not in (shard_engine(timesheet.user_id), previous_shard_engine(timesheet.user_id)):
+            raise HTTPException(status_code=400, detail="Moving a timesheet to a user on another shard is not supported")
+        try:
+            # Postgres rejects overlaps with the exclusion constraint (IntegrityError
+            # below), so only other databases need the lookup first; during a
+            # rebalance the entries on the user's other shard need it too
+            if not PARTITIONED or REBALANCING:
+                existing = find_overlapping_timesheet(db, timesheet, exclude_id=timesheet_id)
+                if existing:
+                    raise overlap_error(existing)
+            db_ts = update_returning(
+                db, Timesheet, timesheet_id, timesheet.dict(exclude={"version"}),
+                expected_version=timesheet.version, name="Timesheet",
+            )
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Timesheet overlaps an existing entry")
+        return db_ts
+    db_ts = _on_row_shard(db, timesheet_id, write)
+    invalidate("timesheets")
+    return TimesheetOut.from_orm(db_ts)
+
+def approve_timesheet(db: Session, timesheet_id: int, approver: str) -> TimesheetOut:
+    def write(db):
+        db_ts = update_returning(
+            db, Timesheet, timesheet_id, {"submitted": True, "approved_by": approver}, name="Timesheet",
+        )
+        db.commit()
+        return db_ts
+    db_ts = _on_row_shard(db, timesheet_id, write)
+    invalidate("timesheets")
+    return TimesheetOut.from_orm(db_ts)
+
+def list_pending_timesheets(db: Session, start: Optional[date] = None, end: Optional[date] = None,
+                            user_id: Optional[str] = None) -> List[TimesheetOut]:
+    def query(session):
+        q = apply_date_range(session.query(Timesheet).filter(Timesheet.submitted == False), Timesheet.date, start, end)
+        return q.filter(Timesheet.user_id == user_id).all() if user_id else q.all()
+    timesheets = gather_user(db, user_id, query) if user_id else gather(db, query)
+    return [TimesheetOut.from_orm(ts) for ts in timesheets]
+
+def timesheet_summary(db: Session, start: Optional[date] = None, end: Optional[date] = None) -> List[TimesheetSummary]:
+    """Entries, hours and unsubmitted entries per user, aggregated on every shard in parallel."""
+    def summarize(session):
+        query = session.query(
+            Timesheet.user_id,
+            func.count(Timesheet.id),
+            func.coalesce(func.sum(Timesheet.hours), 0),
+            func.sum(case((Timesheet.submitted == False, 1), else_=0)),
+        )
+        return apply_date_range(query, Timesheet.date, start, end).group_by(Timesheet.user_id).all()
+
+    totals = {}
+    for rows in scatter(db, summarize):
+        for user_id, entries, hours, pending in rows:
+            total = totals.setdefault(user_id, TimesheetSummary(user_id=user_id or "", entries=0, hours=0, pending=0))
+            total.entries += entries
+            total.hours += float(hours)
+            total.pending += pending or 0
+    return sorted(totals.values(), key=lambda total: total.user_id)
+
+def send_pending_timesheets(db: Session, approver: str) -> List[TimesheetOut]:
+    def approve_all(session):
+        rows = session.execute(
+            update(Timesheet).where(Timesheet.submitted == False)
+            .values(submitted=True, approved_by=approver, version=Timesheet.version + 1)
+            .returning(Timesheet).execution_options(synchronize_session=False)
+        ).scalars().all()
+        session.commit()
+        return rows
+    pending = gather(db, approve_all)
+    invalidate("timesheets")
+    return [TimesheetOut.from_orm(ts) for ts in pending]
@@ -0,0 +1,240 @@
+"""
+Hash sharding of timesheets and emails by user_id.
+
+DATABASE_SHARD_URLS lists the shard databases in a fixed order (append new
+shards at the end, never reorder). Each user_id maps to one shard through a
+consistent-hash ring, so adding a shard only moves about 1/N of the users.
+Leaves, tasks and jobs stay on DATABASE_URL. Without DATABASE_SHARD_URLS
+there is a single shard, the main engine, and every helper below falls back
+to plain single-database behavior.
+
+Routes use:
+    db = shard_db(db, user_id)            # the user's shard
+    rows = gather(db, lambda s: ...)      # every shard in parallel, merged
+    db = find_shard(db, Timesheet, id)    # the shard holding a row
+Background code uses for_each_shard(fn).
+
+While rows move to a newly appended shard (rebalance_shards.py), set
+SHARD_PREVIOUS_COUNT to the number of shards before the append. A user's
+rows are then on their previous owner, their new owner or, mid-move, both,
+so per-user reads (gather_user) and the overlap check look at both, and
+updates find rows that have not moved yet. Unset it once the move is done.
+
+Ids stay unique across shards: shard i hands out ids congruent to i + 1
+modulo SHARD_ID_STRIDE (a Postgres sequence increment, or a small counter
+table on SQLite), so rows can move between shards without renumbering.
+"""
+
+import bisect
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.database import Base, SessionLocal, engine, shard_engines, SHARDED
+
+SHARD_ID_STRIDE = 64  # upper bound on the number of shards
+SHARD_VNODES = int(os.getenv("SHARD_VNODES", "128"))
+SHARDED_TABLES = ("timesheets", "emails")
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+class HashRing:
+    """Consistent-hash ring with virtual nodes."""
+
+    def __init__(self, nodes: List[str], vnodes: int = SHARD_VNODES):
+        self.points = sorted((_hash(f"{node}#{i}"), node) for node in nodes for i in range(vnodes))
+        self.keys = [point for point, _ in self.points]
+
+    def node_for(self, key: str) -> str:
+        index = bisect.bisect(self.keys, _hash(key)) % len(self.keys)
+        return self.points[index][1]
+
+SHARD_NAMES = [f"shard{i}" for i in range(len(shard_engines))]
+ENGINES_BY_NAME = dict(zip(SHARD_NAMES, shard_engines))
+ring = HashRing(SHARD_NAMES)
+# The ring before the last shards were appended, while their rows move over
+SHARD_PREVIOUS_COUNT = int(os.getenv("SHARD_PREVIOUS_COUNT", "0"))
+previous_ring = HashRing(SHARD_NAMES[:SHARD_PREVIOUS_COUNT]) if 0 < SHARD_PREVIOUS_COUNT < len(SHARD_NAMES) else None
+REBALANCING = previous_ring is not None
+
+_scatter_pool = ThreadPoolExecutor(max_workers=max(1, len(shard_engines)), thread_name_prefix="shard")
+
+def shard_name(user_id: Optional[str]) -> str:
+    return ring.node_for(user_id or "")
+
+def shard_engine(user_id: Optional[str]):
+    return ENGINES_BY_NAME[shard_name(user_id)]
+
+def shard_index(bind) -> int:
+    return shard_engines.index(bind)
+
+def _session_on(db: Session, bind) -> Session:
+    """A session on `bind` that lives as long as the request session `db`."""
+    if not SHARDED or db.get_bind() is bind:
+        return db
+    opened: Dict[int, Session] = db.info.setdefault("shard_sessions", {})
+    if id(bind) not in opened:
+        opened[id(bind)] = SessionLocal(bind=bind, info={"statement_timeout_ms": db.info.get("statement_timeout_ms")})
+    return opened[id(bind)]
+
+def close_shard_sessions(db: Session):
+    for session in db.info.pop("shard_sessions", {}).values():
+        session.close()
+
+def shard_db(db: Session, user_id: Optional[str]) -> Session:
+    """Session on the shard that owns `user_id`."""
+    return _session_on(db, shard_engine(user_id))
+
+def previous_shard_engine(user_id: Optional[str]):
+    """The engine that owned `user_id` before the rebalance, if it differs; else None."""
+    if previous_ring is None:
+        return None
+    bind = ENGINES_BY_NAME[previous_ring.node_for(user_id or "")]
+    return None if bind is shard_engine(user_id) else bind
+
+def user_engines(user_id: Optional[str]) -> list:
+    """Engines that may hold rows of `user_id`.
+
+    The previous owner comes first: the rebalancer commits a row on the new
+    owner before deleting it from the old one, so reading old then new
+    never misses a row that moves in between.
+    """
+    previous = previous_shard_engine(user_id)
+    return ([previous] if previous is not None else []) + [shard_engine(user_id)]
+
+def _dedupe(rows) -> list:
+    # A row caught mid-move by the rebalancer can briefly exist on two shards
+    unique, seen = [], set()
+    for row in rows:
+        key = (type(row), getattr(row, "id", id(row)))
+        if key not in seen:
+            seen.add(key)
+            unique.append(row)
+    return unique
+
+def user_dbs(db: Session, user_id: Optional[str]) -> List[Session]:
+    """Sessions on the shards that may hold rows of `user_id`, in user_engines order."""
+    return [_session_on(db, bind) for bind in user_engines(user_id)]
+
+def gather_user(db: Session, user_id: Optional[str], fn: Callable[[Session], list]) -> list:
+    """fn's rows for one user: from the owning shard, plus the previous owner during a rebalance."""
+    return _dedupe(row for session in user_dbs(db, user_id) for row in fn(session))
+
+def scatter(db: Session, fn: Callable[[Session], object], binds: Optional[list] = None) -> list:
+    """Run fn on every shard (or on `binds`) in parallel; one result per shard."""
+    if not SHARDED:
+        return [fn(db)]
+    sessions = [_session_on(db, bind) for bind in (shard_engines if binds is None else binds)]
+    return list(_scatter_pool.map(fn, sessions))
+
+def gather(db: Session, fn: Callable[[Session], list]) -> list:
+    """Concatenate per-shard row lists. A row caught mid-move by the
+    rebalancer can briefly exist on two shards, so duplicates are dropped."""
+    if REBALANCING:
+        # Rows only move onto the appended shards: read the others first,
+        # so a row moving in between is seen on one side or the other
+        results = scatter(db, fn, shard_engines[:SHARD_PREVIOUS_COUNT])
+        results += scatter(db, fn, shard_engines[SHARD_PREVIOUS_COUNT:])
+    else:
+        results = scatter(db, fn)
+    return _dedupe(row for shard_rows in results for row in shard_rows)
+
+def find_shard(db: Session, model, row_id: int) -> Session:
+    """Session on the shard holding row `row_id`, or `db` when not found."""
+    if not SHARDED:
+        return db
+    # Try the shard that allocated the id first; rebalanced rows are found by the scan
+    origin = (row_id - 1) % SHARD_ID_STRIDE
+    order = sorted(range(len(shard_engines)), key=lambda i: i != origin)
+    for i in order:
+        session = _session_on(db, shard_engines[i])
+        if session.query(model.id).filter(model.id == row_id).first():
+            return session
+    return db
+
+def for_each_shard(fn: Callable[[Session], object], db: Optional[Session] = None) -> list:
+    """Run fn on every shard one after another, each with its own session
+    (or `db` when unsharded). For workers and scripts."""
+    if not SHARDED and db is not None:
+        return [fn(db)]
+    results = []
+    for bind in shard_engines:
+        session = SessionLocal(bind=bind)
+        try:
+            results.append(fn(session))
+        finally:
+            session.close()
+    return results
+
+def needs_allocated_ids(db: Session, model) -> bool:
+    """Whether new rows of `model` in this session need ids from allocate_ids."""
+    return SHARDED and model.__tablename__ in SHARDED_TABLES and db.get_bind().dialect.name == "sqlite"
+
+def allocate_ids(db: Session, model, count: int) -> Optional[List[int]]:
+    """Explicit ids for `count` new rows of a sharded table on SQLite shards.
+
+    Postgres shards use their strided sequences and return None.
+    """
+    if not needs_allocated_ids(db, model):
+        return None
+    last = db.execute(
+        text("UPDATE shard_id_sequences SET value = value + :n WHERE name = :name RETURNING value"),
+        {"n": count * SHARD_ID_STRIDE, "name": model.__tablename__},
+    ).scalar_one()
+    return [last - SHARD_ID_STRIDE * (count - 1 - i) for i in range(count)]
+
+def _last_strided_id(highest: int, index: int) -> int:
+    """Largest id at or below `highest` that shard `index` hands out."""
+    last = highest // SHARD_ID_STRIDE * SHARD_ID_STRIDE + index + 1
+    return last - SHARD_ID_STRIDE if last > highest else last
+
+def _ensure_id_sequences(bind, index: int):
+    """Make shard `index` hand out its strided ids, never reissuing one.
+
+    Runs on every start. MAX(id) can be below ids already handed out
+    (archiving deletes rows, rolled back inserts leave gaps), and the
+    partitioned tables' (id, date) keys would not stop a repeat, so the
+    counters only ever move forward.
+    """
+    with bind.begin() as conn:
+        if bind.dialect.name == "sqlite":
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS shard_id_sequences (name VARCHAR PRIMARY KEY, value INTEGER NOT NULL)"
+            ))
+        for table in SHARDED_TABLES:
+            highest = conn.execute(text(f"SELECT COALESCE(MAX(id), 0) FROM {table}")).scalar()
+            if bind.dialect.name == "postgresql":
+                conn.execute(text(
+                    f"ALTER SEQUENCE {table}_id_seq INCREMENT BY {SHARD_ID_STRIDE} MINVALUE {index + 1 - SHARD_ID_STRIDE}"
+                ))
+                current = conn.execute(text(f"SELECT last_value FROM {table}_id_seq")).scalar()
+                last = _last_strided_id(max(highest, current), index)
+                # Equal once the sequence is set up: leave it alone, so ids
+                # taken by running instances meanwhile are not handed out again
+                if last != current:
+                    conn.execute(text(f"SELECT setval('{table}_id_seq', {last})"))
+            else:
+                conn.execute(
+                    text(
+                        "INSERT INTO shard_id_sequences (name, value) VALUES (:name, :value) "
+                        "ON CONFLICT (name) DO UPDATE SET value = MAX(value, excluded.value)"
+                    ),
+                    {"name": table, "value": _last_strided_id(highest, index)},
+                )
+
+def ensure_shards():
+    """Create the schema on every shard and set up their id allocation."""
+    if not SHARDED:
+        return
+    from app.partitioning import ensure_month_partitions
+    from app.search import ensure_search_index
+    for index, bind in enumerate(shard_engines):
+        if bind is not engine:
+            Base.metadata.create_all(bind=bind)
+            ensure_month_partitions(bind)
+            ensure_search_index(bind)
+        _ensure_id_sequences(bind, index)
+    print(f"✅ Timesheets and emails sharded across {len(shard_engines)} database(s)")
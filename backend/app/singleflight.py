@@ -0,0 +1,57 @@
+"""
+Single-flight execution for identical concurrent reads.
+
+When several requests ask for the same key at the same time, only the first
+(the leader) runs the query; the others wait for it and receive the same
+result, or the same exception. Nothing is kept after the call finishes;
+caching across time is the job of app/cache.py.
+"""
+
+import threading
+from typing import Any, Callable, Dict
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.waiters = 0
+
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls: Dict[str, _Call] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+                self.executed += 1
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": len(self.calls)}
@@ -0,0 +1,128 @@
+"""
+Local SMTP sink for development and tests.
+
+Accepts mail on a local port and keeps it in memory instead of delivering
+it. Use it in-process:
+
+    sink = LocalSMTPSink(port=0).start()   # port 0 picks a free port
+    ...  # point SMTP_HOST/SMTP_PORT at sink.host/sink.port
+    sink.messages, sink.connections
+    sink.rejected_domains.add("bounce.example")   # RCPT to it gets 550
+    sink.drop_connections()                       # like an idle timeout
+    sink.stop()
+
+or standalone with `python -m app.smtp_sink --port 1025`.
+"""
+
+import argparse
+import socket
+import socketserver
+import threading
+from typing import List, Set
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str):
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        sink = self.server.sink
+        with sink.lock:
+            sink.connections += 1
+            sink.open.add(self.connection)
+        try:
+            self.serve(sink)
+        finally:
+            with sink.lock:
+                sink.open.discard(self.connection)
+
+    def serve(self, sink):
+        self.reply("220 localhost sink ready")
+        mail_from, rcpt_to = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="replace").strip()
+            verb = command[:4].upper()
+            if verb in ("HELO", "EHLO"):
+                self.reply("250 localhost")
+            elif verb == "MAIL":
+                mail_from, rcpt_to = command[10:].strip(), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipient = command[8:].strip()
+                if recipient.strip("<>").rpartition("@")[2].lower() in sink.rejected_domains:
+                    self.reply("550 No such user here")
+                    continue
+                rcpt_to.append(recipient)
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk in (b".\r\n", b".\n"):
+                        break
+                    data.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                with sink.lock:
+                    sink.messages.append({
+                        "from": mail_from,
+                        "to": rcpt_to,
+                        "data": b"".join(data).decode(errors="replace"),
+                    })
+                self.reply("250 OK queued")
+            elif verb == "RSET":
+                mail_from, rcpt_to = None, []
+                self.reply("250 OK")
+            elif verb == "NOOP":
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+class LocalSMTPSink:
+    def __init__(self, host: str = "127.0.0.1", port: int = 1025):
+        self.server = _Server((host, port), _SMTPHandler)
+        self.server.sink = self
+        self.host, self.port = self.server.server_address
+        self.messages: List[dict] = []
+        self.connections = 0
+        # Recipient domains answered with 550, to exercise retries
+        self.rejected_domains: Set[str] = set()
+        self.open: Set[socket.socket] = set()
+        self.lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="smtp-sink", daemon=True)
+        self._thread.start()
+        return self
+
+    def drop_connections(self):
+        """Close every open client connection, as a server does with idle ones."""
+        with self.lock:
+            sockets = list(self.open)
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local SMTP sink")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args()
+    sink = LocalSMTPSink(args.host, args.port)
+    print(f"📬 SMTP sink listening on {sink.host}:{sink.port}")
+    sink.server.serve_forever()
@@ -0,0 +1,59 @@
+"""
+MessagePack wire format shared by the backend and the action server.
+
+app/content.py packs responses with it and actions/backend.py (which puts
+this directory on sys.path) decodes them, so both sides use the same
+extension types. Keep this module free of imports beyond msgpack and the
+standard library: the action server loads it in HTTP mode, where the
+backend's other dependencies are not installed.
+
+    datetime  MessagePack timestamp extension (-1); naive values are UTC
+    date      extension 1: days since 0001-01-01 (proleptic ordinal), int32
+    time      extension 2: seconds since midnight (uint32), or microseconds
+              (uint64) when the time has a fractional part
+"""
+
+import datetime
+import struct
+from typing import Any
+
+import msgpack
+
+DATE_EXT = 1
+TIME_EXT = 2
+
+
+def encode_ext(value: Any):
+    """Extension encoding for datetime/date/time; TypeError for anything else."""
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        return msgpack.Timestamp.from_datetime(value)
+    if isinstance(value, datetime.date):
+        return msgpack.ExtType(DATE_EXT, struct.pack(">i", value.toordinal()))
+    if isinstance(value, datetime.time):
+        seconds = value.hour * 3600 + value.minute * 60 + value.second
+        if value.microsecond:
+            return msgpack.ExtType(TIME_EXT, struct.pack(">Q", seconds * 1_000_000 + value.microsecond))
+        return msgpack.ExtType(TIME_EXT, struct.pack(">I", seconds))
+    raise TypeError(f"Cannot encode {type(value).__name__} as MessagePack")
+
+
+def ext_hook(code: int, data: bytes):
+    if code == DATE_EXT:
+        return datetime.date.fromordinal(struct.unpack(">i", data)[0])
+    if code == TIME_EXT:
+        if len(data) == 8:
+            seconds, micros = divmod(struct.unpack(">Q", data)[0], 1_000_000)
+        else:
+            seconds, micros = struct.unpack(">I", data)[0], 0
+        return datetime.time(seconds // 3600, seconds // 60 % 60, seconds % 60, micros)
+    return msgpack.ExtType(code, data)
+
+
+def packb(content: Any, default=encode_ext) -> bytes:
+    return msgpack.packb(content, default=default, use_bin_type=True)
+
+
+def unpackb(body: bytes) -> Any:
+    return msgpack.unpackb(body, ext_hook=ext_hook, timestamp=3, raw=False)
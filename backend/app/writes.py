@@ -0,0 +1,67 @@
+"""
+Single-statement writes for the route handlers.
+
+Creates are one INSERT ... RETURNING and updates one UPDATE ... RETURNING, so
+a write costs one round trip plus the commit; sessions do not expire on
+commit, so nothing is reloaded afterwards.
+
+Models with a `version` column get optimistic concurrency: an update that
+names the version it read only matches that version and bumps it. If no row
+matched, one extra SELECT (only on that failure path) tells a missing row
+(404) from a concurrent change (409).
+"""
+
+from typing import Callable, Optional
+from fastapi import HTTPException
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+from app.group_commit import GROUP_COMMIT_ENABLED, group_writer
+from app.sharding import allocate_ids
+
+def insert_returning(db: Session, model, values: dict):
+    """INSERT the row and return it as a loaded `model` instance."""
+    ids = allocate_ids(db, model, 1)
+    if ids:
+        values = dict(values, id=ids[0])
+    return db.execute(insert(model).values(**values).returning(model)).scalar_one()
+
+def create_row(db: Session, model, values: dict, check: Optional[Callable] = None):
+    """INSERT and commit one row; batched with concurrent inserts when group
+    commit is enabled (app/group_commit.py).
+
+    `check` repeats the caller's conflict check inside the batch, where rows
+    queued by concurrent requests are visible (see GroupCommitWriter.insert).
+    """
+    if GROUP_COMMIT_ENABLED:
+        return group_writer.insert(model, values, bind=db.get_bind(), check=check,
+                                   timeout_ms=db.info.get("statement_timeout_ms"))
+    row = insert_returning(db, model, values)
+    db.commit()
+    return row
+
+def update_returning(db: Session, model, row_id: int, values: dict,
+                     expected_version: Optional[int] = None, name: Optional[str] = None):
+    """UPDATE one row by id and return it, raising 404/409 when nothing matched."""
+    criteria = [model.id == row_id]
+    values = dict(values)
+    if hasattr(model, "version"):
+        values["version"] = model.version + 1
+        if expected_version is not None:
+            criteria.append(model.version == expected_version)
+    statement = (
+        update(model).where(*criteria).values(**values).returning(model)
+        .execution_options(synchronize_session=False)
+    )
+    row = db.execute(statement).scalar_one_or_none()
+    if row is not None:
+        return row
+
+    name = name or model.__name__
+    current = db.execute(select(model.version).where(model.id == row_id)).scalar_one_or_none() \
+        if hasattr(model, "version") else None
+    if current is None:
+        raise HTTPException(status_code=404, detail=f"{name} not found")
+    raise HTTPException(
+        status_code=409,
+        detail=f"{name} {row_id} was changed by someone else (version {current}, expected {expected_version})",
+    )
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Archive Script
+Moves closed months of timesheets and emails out of the database into
+compressed JSONL files (see app/archive.py), and makes sure the Postgres
+month partitions for the coming months exist.
+
+Usage:
+    python archive_periods.py                  # archive everything older than 2 months
+    python archive_periods.py --keep-months 6
+    python archive_periods.py --table emails --dry-run
+"""
+
+import argparse
+import os
+import sys
+
+# Add the parent directory to Python path so we can import our app modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import SessionLocal, shard_engines
+from app.archive import ARCHIVED_MODELS, ARCHIVE_DIR, archive_month, closed_months
+from app.partitioning import ensure_month_partitions
+
+def archive_periods(tables, keep_months: int, dry_run: bool):
+    # Timesheets and emails may be spread over several shards; archive each in turn
+    for index, bind in enumerate(shard_engines):
+        if len(shard_engines) > 1:
+            print(f"📋 shard{index}")
+        archive_shard(bind, tables, keep_months, dry_run)
+
+def archive_shard(bind, tables, keep_months: int, dry_run: bool):
+    ensure_month_partitions(bind)
+    db = SessionLocal(bind=bind)
+    try:
+        for table in tables:
+            months = closed_months(db, table, keep_months)
+            if not months:
+                print(f"📋 {table}: nothing to archive")
+                continue
+            for month in months:
+                if dry_run:
+                    print(f"📋 {table} {month:%Y-%m}: would be archived")
+                    continue
+                moved = archive_month(db, table, month)
+                print(f"✅ {table} {month:%Y-%m}: archived {moved} rows to {ARCHIVE_DIR}")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error archiving: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive closed months of timesheets and emails")
+    parser.add_argument("--table", choices=sorted(ARCHIVED_MODELS), action="append",
+                        help="Table to archive (repeatable, default: all)")
+    parser.add_argument("--keep-months", type=int, default=2,
+                        help="Months kept in the database, including the current one")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the months that would be archived")
+    args = parser.parse_args()
+    if args.keep_months < 1:
+        parser.error("--keep-months must be at least 1")
+    archive_periods(args.table or sorted(ARCHIVED_MODELS), args.keep_months, args.dry_run)
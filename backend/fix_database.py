@@ -6,6 +6,7 @@ Recreates all database tables with the updated schema.
 
 import os
 import sys
+from datetime import date, time
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 
@@ -13,7 +14,7 @@ from sqlalchemy.orm import sessionmaker
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.database import DATABASE_URL, Base
-from app.models import Timesheet, Leave, Email, Task, Job
+from app.models import Timesheet, Leave, Email, Task, Job, IdempotencyKey
 
 def reset_database():
     """Drop all tables and recreate them with the new schema"""
@@ -45,8 +46,11 @@ def reset_database():
             sample_timesheet = Timesheet(
                 user_id="user123",
                 email="user@example.com",
-                date="2024-01-15",
-                hours="8",
+                date=date(2024, 1, 15),
+                from_time=time(9, 0),
+                to_time=time(17, 0),
+                task_summary="Development",
+                hours=8.0,
                 description="Development work on AI Assistant",
                 submitted=False
             )
@@ -56,7 +60,8 @@ def reset_database():
             sample_leave = Leave(
                 user_id="user123",
                 email="user@example.com",
-                date="2024-01-20",
+                start_date=date(2024, 1, 20),
+                end_date=date(2024, 1, 22),
                 leave_type="Sick Leave",
                 reason="Medical appointment",
                 status="Pending"
@@ -96,8 +101,8 @@ def reset_database():
             
         print("🎉 Database reset completed successfully!")
         print("\n📋 Updated Schema Summary:")
-        print("- Timesheets: user_id, email, date, hours, description, submitted, approved_by")
-        print("- Leaves: user_id, email, date, leave_type, reason, status, approved_by, approval_comment")
+        print("- Timesheets: user_id, email, date, from_time, to_time, task_summary, hours, description, submitted, approved_by")
+        print("- Leaves: user_id, email, start_date, end_date, leave_type, reason, status, approved_by, approval_comment")
         print("- Emails: user_id, email, subject, message, type, status")
         print("- Tasks: user_id, email, title, description, priority, status")
         
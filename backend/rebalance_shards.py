@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Shard Rebalancer
+Moves timesheets and emails to the shard that owns their user_id after
+DATABASE_SHARD_URLS changed (see app/sharding.py), in small batches, while
+the API keeps serving.
+
+Moving rows online needs the API's help. Restart it with the new shard list
+and SHARD_PREVIOUS_COUNT set to the number of shards before the append, and
+run this script with the same settings. The API then writes new rows to the
+new owner and reads a user's rows, and checks timesheet overlaps, on both
+the previous and the new owner. Once this script reports that every row is
+on its shard, unset SHARD_PREVIOUS_COUNT and restart the API. With the API
+stopped, --offline runs it without SHARD_PREVIOUS_COUNT.
+
+Each batch is inserted on the target shard and committed before it is
+deleted from the source, so a crash never loses rows; re-running skips rows
+that were already copied. A source row is only deleted if it still equals
+the copy, so one updated in the meantime is copied again on the next pass.
+Emails still in the outbox (queued or sending) stay where they are, since
+both shards' dispatchers would send the copies; re-run once they are sent.
+
+Usage:
+    python rebalance_shards.py --dry-run                         # show what would move
+    SHARD_PREVIOUS_COUNT=2 python rebalance_shards.py --batch-size 500
+    python rebalance_shards.py --offline                         # API stopped
+"""
+
+import argparse
+import os
+import sys
+from collections import Counter
+
+# Add the parent directory to Python path so we can import our app modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import Date, DateTime, Time, delete, insert, or_, select, update
+from app.database import SessionLocal, shard_engines
+from app.cache import invalidate
+from app.models.timesheet import Timesheet
+from app.models.emails import Email
+from app.outbox import QUEUED, SENDING
+from app.sharding import ENGINES_BY_NAME, REBALANCING, SHARD_NAMES, ensure_shards, shard_name
+
+SHARDED_MODELS = (Timesheet, Email)
+
+def movable(model, user_id):
+    """Criteria for the rows of `user_id` that can move now."""
+    table = model.__table__
+    criteria = [table.c.user_id == user_id]
+    if model is Email:
+        criteria.append(or_(table.c.delivery_status.is_(None), table.c.delivery_status.notin_((QUEUED, SENDING))))
+    return criteria
+
+def misplaced_users(source, model):
+    """user_id -> owning shard, for users whose rows are on the wrong shard."""
+    with SessionLocal(bind=source) as db:
+        users = [row[0] for row in db.execute(select(model.user_id).distinct())]
+    here = SHARD_NAMES[shard_engines.index(source)]
+    return {user_id: shard_name(user_id) for user_id in users if shard_name(user_id) != here}
+
+def move_user(source, target, model, user_id, batch_size: int) -> int:
+    table = model.__table__
+    moved = 0
+    with SessionLocal(bind=source) as src, SessionLocal(bind=target) as dst:
+        while True:
+            rows = [
+                dict(row._mapping) for row in src.execute(
+                    select(table).where(*movable(model, user_id)).order_by(table.c.id).limit(batch_size)
+                )
+            ]
+            if not rows:
+                return moved
+            ids = [row["id"] for row in rows]
+            # Ids are unique across shards, so an id already on the target is
+            # a copy from an interrupted run or from a pass before the row was
+            # updated; bring it up to date
+            copied = set(dst.scalars(select(table.c.id).where(table.c.id.in_(ids))))
+            fresh = [row for row in rows if row["id"] not in copied]
+            if fresh:
+                dst.execute(insert(table), fresh)
+            for row in rows:
+                if row["id"] in copied:
+                    dst.execute(update(table).where(table.c.id == row["id"]).values(**row))
+            dst.commit()
+            # Delete only rows that still equal their copy; a row the API
+            # updated meanwhile stays and is copied again on the next pass.
+            # Dates and times are left out: their stored text need not round
+            # trip on SQLite, and updates change other columns (version) too
+            deleted = 0
+            for row in rows:
+                unchanged = [
+                    table.c[name] == value for name, value in row.items()
+                    if not isinstance(table.c[name].type, (Date, DateTime, Time))
+                ]
+                deleted += src.execute(delete(table).where(*unchanged)).rowcount
+            src.commit()
+            if not deleted:
+                # Rows that change on every pass; leave them for a re-run
+                return moved
+            moved += deleted
+
+def left_behind() -> int:
+    """Rows still on a shard that does not own their user."""
+    count = 0
+    for source in shard_engines:
+        for model in SHARDED_MODELS:
+            for user_id in misplaced_users(source, model):
+                with SessionLocal(bind=source) as db:
+                    count += db.query(model).filter(model.user_id == user_id).count()
+    return count
+
+def rebalance(batch_size: int, dry_run: bool):
+    ensure_shards()
+    plan = Counter()
+    for source in shard_engines:
+        source_name = SHARD_NAMES[shard_engines.index(source)]
+        for model in SHARDED_MODELS:
+            for user_id, target_name in misplaced_users(source, model).items():
+                if dry_run:
+                    with SessionLocal(bind=source) as db:
+                        count = db.query(model).filter(model.user_id == user_id).count()
+                    plan[(model.__tablename__, source_name, target_name)] += count
+                    continue
+                moved = move_user(source, ENGINES_BY_NAME[target_name], model, user_id, batch_size)
+                plan[(model.__tablename__, source_name, target_name)] += moved
+
+    if not plan:
+        print("✅ Every row is already on its shard")
+        return
+    for (table, source_name, target_name), count in sorted(plan.items()):
+        verb = "would move" if dry_run else "moved"
+        print(f"{'📋' if dry_run else '✅'} {table}: {verb} {count} rows {source_name} -> {target_name}")
+    if not dry_run:
+        invalidate("timesheets", "emails")
+        remaining = left_behind()
+        if remaining:
+            print(f"⚠️ {remaining} rows could not move yet (emails in the outbox, rows being updated); re-run later")
+        else:
+            print("✅ Every row is on its shard; unset SHARD_PREVIOUS_COUNT and restart the API")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move timesheets and emails to the shard owning their user")
+    parser.add_argument("--batch-size", type=int, default=500, help="Rows copied per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would move")
+    parser.add_argument("--offline", action="store_true",
+                        help="The API is stopped, so SHARD_PREVIOUS_COUNT is not needed")
+    args = parser.parse_args()
+    if len(shard_engines) < 2:
+        parser.error("set DATABASE_SHARD_URLS to at least two databases")
+    if not (REBALANCING or args.offline or args.dry_run):
+        parser.error("run the API and this script with SHARD_PREVIOUS_COUNT set to the shard count before "
+                     "the append, or stop the API and pass --offline")
+    rebalance(args.batch_size, args.dry_run)
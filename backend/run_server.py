@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+API Server
+Serves the backend on TCP and, optionally, on a Unix domain socket at the
+same time: browsers and remote clients use the TCP port, while a co-located
+Rasa action server can talk to the socket and skip the loopback TCP stack
+(set BACKEND_UDS to the same path for the actions, see actions/backend.py).
+
+With --http2 the app runs on hypercorn instead of uvicorn and accepts HTTP/2
+(h2 over TLS when --certfile/--keyfile are given, otherwise h2c with prior
+knowledge) alongside HTTP/1.1, so remote action servers can multiplex their
+calls over one connection. hypercorn is an optional dependency:
+    pip install hypercorn
+
+Usage:
+    python run_server.py                               # 0.0.0.0:8000, like uvicorn
+    python run_server.py --uds /tmp/dialogiq.sock      # plus a Unix socket
+    python run_server.py --http2 --certfile cert.pem --keyfile key.pem
+
+For several worker processes, gunicorn takes the same two listeners:
+    gunicorn app.main:app -k uvicorn.workers.UvicornWorker -w 4 \\
+        --bind 0.0.0.0:$PORT --bind unix:/tmp/dialogiq.sock
+"""
+
+import argparse
+import os
+import socket
+import stat
+import sys
+
+# Add the parent directory to Python path so we can import our app modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def tcp_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    # asyncio only turns off Nagle (TCP_NODELAY) on accepted sockets whose
+    # proto is IPPROTO_TCP; without it, delayed ACKs add ~40ms per response
+    sock = socket.socket(family, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    return sock
+
+def unix_socket(path: str) -> socket.socket:
+    # A socket file left behind by a previous run would make bind() fail
+    if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+        os.unlink(path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(path)
+    os.chmod(path, 0o660)
+    return sock
+
+def run_uvicorn(args):
+    import uvicorn
+    config = uvicorn.Config("app.main:app", log_level=args.log_level, proxy_headers=True)
+    server = uvicorn.Server(config)
+    sockets = [tcp_socket(args.host, args.port)]
+    if args.uds:
+        sockets.append(unix_socket(args.uds))
+    print(f"🚀 Serving on http://{args.host}:{args.port}" + (f" and unix:{args.uds}" if args.uds else ""))
+    try:
+        server.run(sockets=sockets)
+    finally:
+        if args.uds and os.path.exists(args.uds):
+            os.unlink(args.uds)
+
+def run_hypercorn(args):
+    try:
+        import asyncio
+        from hypercorn.asyncio import serve
+        from hypercorn.config import Config
+    except ImportError:
+        sys.exit("❌ --http2 needs hypercorn: pip install hypercorn")
+    from app.main import app
+
+    config = Config()
+    config.bind = [f"{args.host}:{args.port}"] + ([f"unix:{args.uds}"] if args.uds else [])
+    config.certfile, config.keyfile = args.certfile, args.keyfile
+    # The action server keeps one multiplexed connection open; hypercorn's
+    # default of closing it after 1000 requests would cut off in-flight calls
+    config.keep_alive_max_requests = 1_000_000
+    config.loglevel = args.log_level.upper()
+    scheme = "https" if args.certfile else "http"
+    print(f"🚀 Serving HTTP/2 and HTTP/1.1 on {scheme}://{args.host}:{args.port}" + (f" and unix:{args.uds}" if args.uds else ""))
+    asyncio.run(serve(app, config))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the backend API server")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--uds", default=os.getenv("BACKEND_UDS") or None,
+                        help="Also listen on this Unix domain socket path")
+    parser.add_argument("--http2", action="store_true", default=os.getenv("BACKEND_HTTP2", "false").lower() == "true",
+                        help="Serve HTTP/2 as well (requires hypercorn)")
+    parser.add_argument("--certfile", help="TLS certificate for h2 (HTTP/2 over TLS)")
+    parser.add_argument("--keyfile", help="TLS private key for h2")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    if args.http2:
+        run_hypercorn(args)
+    else:
+        run_uvicorn(args)
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Job Worker
+Runs background job queue workers outside the API process.
+
+Usage:
+    python run_worker.py            # one worker thread
+    python run_worker.py --threads 4
+    python run_worker.py --threads 0 --outbox 5   # only the email outbox
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add the parent directory to Python path so we can import our app modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import Base, engine
+from app.job_queue import start_workers, stop_workers
+from app.outbox import start_outbox_dispatcher, stop_outbox_dispatcher
+from app import job_handlers  # registers background job handlers
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run background job workers")
+    parser.add_argument("--threads", type=int, default=1, help="Number of worker threads")
+    parser.add_argument("--outbox", type=float, default=0, metavar="SECONDS",
+                        help="Also run the email outbox dispatcher, polling every SECONDS")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    start_workers(args.threads)
+    start_outbox_dispatcher(args.outbox)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("🛑 Stopping job workers...")
+        stop_outbox_dispatcher()
+        stop_workers()
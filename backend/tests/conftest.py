@@ -0,0 +1,12 @@
+"""
+Test setup: a throwaway SQLite database, configured before the app is
+imported. Run from backend/ with `python -m pytest`.
+"""
+
+import os
+import tempfile
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="backend-tests-"), "test.db")
+# Empty values win over a developer's .env (load_dotenv does not override)
+os.environ["DATABASE_SHARD_URLS"] = ""
+os.environ["DATABASE_REPLICA_URLS"] = ""
@@ -0,0 +1,86 @@
+"""
+Admission control: requests beyond a lane's limit and queue, or that wait
+longer than its timeout, get a fast 503 with Retry-After; lanes are separate.
+"""
+
+import asyncio
+from app.admission import AdmissionControlMiddleware, Lane, classify
+
+def make_middleware(limit=1, queue=1, timeout=0.2):
+    release = asyncio.Event()
+
+    async def app(scope, receive, send):
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    lanes = {name: Lane(name, limit, queue, timeout) for name in ("priority", "read", "write", "bulk")}
+    return AdmissionControlMiddleware(app, lanes=lanes, enabled=True), release
+
+async def request(middleware, method="GET", path="/timesheets/"):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+    await middleware({"type": "http", "method": method, "path": path, "query_string": b""}, receive, send)
+    start = sent[0]
+    return start["status"], dict(start["headers"])
+
+def test_full_queue_is_rejected_at_once_with_retry_after():
+    async def scenario():
+        middleware, release = make_middleware(limit=1, queue=1, timeout=5)
+        running = asyncio.ensure_future(request(middleware))
+        queued = asyncio.ensure_future(request(middleware))
+        await asyncio.sleep(0.05)
+
+        status, headers = await asyncio.wait_for(request(middleware), timeout=1)
+        release.set()
+        return status, headers, await running, await queued, middleware.lanes["read"].stats()
+
+    status, headers, running, queued, stats = asyncio.run(scenario())
+    assert status == 503 and headers[b"retry-after"] == b"5"
+    assert running[0] == queued[0] == 200
+    assert stats["admitted"] == 2 and stats["rejected"] == 1
+    assert stats["active"] == stats["waiting"] == 0
+
+def test_queued_request_times_out_and_gives_its_place_back():
+    async def scenario():
+        middleware, release = make_middleware(limit=1, queue=1, timeout=0.2)
+        running = asyncio.ensure_future(request(middleware))
+        await asyncio.sleep(0.05)
+        timed_out = await request(middleware)
+        release.set()
+        await running
+        # The lane is whole again: the next request goes straight through
+        return timed_out, await request(middleware), middleware.lanes["read"].stats()
+
+    (status, headers), after, stats = asyncio.run(scenario())
+    assert status == 503 and headers[b"retry-after"] == b"1"
+    assert after[0] == 200
+    assert stats["active"] == 0 and stats["rejected"] == 1
+
+def test_busy_lane_does_not_hold_up_other_lanes():
+    async def scenario():
+        middleware, release = make_middleware(limit=1, queue=0, timeout=0.2)
+        reads = asyncio.ensure_future(request(middleware))
+        await asyncio.sleep(0.05)
+        rejected_read = await request(middleware)
+        health = asyncio.ensure_future(request(middleware, path="/health"))
+        write = asyncio.ensure_future(request(middleware, method="POST"))
+        await asyncio.sleep(0.05)
+        release.set()
+        return rejected_read, await health, await write, await reads
+
+    rejected_read, health, write, read = asyncio.run(scenario())
+    assert rejected_read[0] == 503
+    assert health[0] == write[0] == read[0] == 200
+
+def test_classify():
+    assert classify("GET", "/health/admission") == "priority"
+    assert classify("POST", "/timesheets/send-pending/") == "bulk"
+    assert classify("GET", "/timesheets/", b"include_archive=true") == "bulk"
+    assert classify("DELETE", "/tasks/3") == "write"
+    assert classify("GET", "/tasks/") == "read"
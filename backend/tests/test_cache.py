@@ -0,0 +1,91 @@
+"""
+Response cache: generations and invalidation across workers, with a second
+in-process cache on a shared LocalBroadcaster standing in for another worker.
+"""
+
+import os
+import tempfile
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from app import cache
+from app.cache import LocalBroadcaster, ResponseCache, cached, invalidate, response_cache, set_broadcaster
+from app.database import SessionLocal, replica_engines
+from app.replicas import REPLICA_LAG_WINDOW
+
+@pytest.fixture
+def other_worker():
+    broadcaster = LocalBroadcaster()
+    set_broadcaster(broadcaster)
+    other = ResponseCache()
+    broadcaster.subscribe(other.invalidate_local)
+    response_cache.clear()
+    yield other
+    response_cache.clear()
+
+@pytest.fixture
+def route():
+    calls = []
+
+    @cached("things")
+    def list_things(db: Session = None, during=None):
+        calls.append(db)
+        if during:
+            during()
+        return {"call": len(calls)}
+    list_things.calls = calls
+    return list_things
+
+@pytest.fixture
+def replica(monkeypatch):
+    engine = create_engine("sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="replica-"), "replica.db"))
+    monkeypatch.setattr(cache, "replica_engines", [*replica_engines, engine])
+    session = SessionLocal(bind=engine)
+    yield session
+    session.close()
+    engine.dispose()
+
+def key_for(**params):
+    return cache._cache_key("tests.test_cache.list_things", params)
+
+def test_invalidation_reaches_every_worker(other_worker, route):
+    assert route().body == b'{"call":1}'
+    assert route().body == b'{"call":1}'
+    other_worker.set(key_for(), b"other", ("things",), other_worker.generation(["things"]))
+
+    invalidate("things")
+
+    assert other_worker.get(key_for()) is None
+    assert response_cache.generation(["things"]) == other_worker.generation(["things"]) != (0,)
+    assert route().body == b'{"call":2}'
+
+def test_fill_overlapping_an_invalidation_is_not_stored(other_worker, route):
+    # A write commits while the read is running: its result may predate the write
+    assert route(during=lambda: invalidate("things")).body == b'{"call":1}'
+    assert route().body == b'{"call":2}'
+    assert route().body == b'{"call":2}'
+
+def test_entries_from_an_older_generation_are_refused(other_worker):
+    generation = response_cache.generation(["things"])
+    invalidate("things")
+    response_cache.set("stale", b"old", ("things",), generation)
+    assert response_cache.get("stale") is None
+
+def test_replica_fill_soon_after_invalidation_is_not_stored(other_worker, route, replica):
+    invalidate("things")
+    # The replica may not have the write yet: answer, but do not cache
+    assert route(db=replica).body == b'{"call":1}'
+    assert route(db=replica).body == b'{"call":2}'
+
+    response_cache.invalidated_at["things"] -= REPLICA_LAG_WINDOW
+    assert route(db=replica).body == b'{"call":3}'
+    assert route(db=replica).body == b'{"call":3}'
+
+def test_primary_fill_after_invalidation_is_stored(other_worker, route):
+    invalidate("things")
+    db = SessionLocal()
+    try:
+        assert route(db=db).body == b'{"call":1}'
+        assert route(db=db).body == b'{"call":1}'
+    finally:
+        db.close()
@@ -0,0 +1,65 @@
+"""
+Group commit: concurrent inserts share one batch and commit, a bad row only
+fails its own caller, and each caller's statement timeout reaches the batch.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.database import Base, SessionLocal, engine
+from app.group_commit import GroupCommitWriter
+from app.models.tasks import Task
+
+@pytest.fixture
+def writer():
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.query(Task).delete()
+        db.commit()
+    return GroupCommitWriter(window_ms=100)
+
+def insert_together(writer, rows, **kwargs):
+    with ThreadPoolExecutor(max_workers=len(rows)) as executor:
+        futures = [executor.submit(writer.insert, Task, values, **kwargs.get(values["title"], {})) for values in rows]
+        return [future.exception() or future.result() for future in futures]
+
+def task(title):
+    return {"user_id": "u1", "email": "u1@example.com", "title": title, "priority": "Low"}
+
+def test_concurrent_inserts_share_one_batch(writer):
+    results = insert_together(writer, [task(f"Task {i}") for i in range(8)])
+
+    assert writer.stats()["batches"] == 1 and writer.stats()["rows"] == 8
+    assert sorted(row.title for row in results) == [f"Task {i}" for i in range(8)]
+    with SessionLocal() as db:
+        assert {row.id: row.title for row in db.query(Task)} == {row.id: row.title for row in results}
+
+def test_rejected_row_only_fails_its_caller(writer):
+    def reject(db, values):
+        if values["title"] == "Bad":
+            raise ValueError("rejected")
+
+    rows = [task("Good 1"), task("Bad"), task("Good 2")]
+    results = insert_together(writer, rows, **{row["title"]: {"check": reject} for row in rows})
+
+    assert isinstance(results[1], ValueError)
+    assert [results[0].title, results[2].title] == ["Good 1", "Good 2"]
+    with SessionLocal() as db:
+        assert sorted(row.title for row in db.query(Task)) == ["Good 1", "Good 2"]
+
+def test_batch_session_has_the_callers_statement_timeout(writer):
+    seen = {}
+
+    def record(db, values):
+        seen[values["title"]] = db.info.get("statement_timeout_ms")
+
+    rows = [task("Fast"), task("Also fast"), task("Slow")]
+    options = {
+        "Fast": {"check": record, "timeout_ms": 500},
+        "Also fast": {"check": record, "timeout_ms": 500},
+        "Slow": {"check": record, "timeout_ms": None},
+    }
+    insert_together(writer, rows, **options)
+
+    assert seen == {"Fast": 500, "Also fast": 500, "Slow": None}
+    # Different timeouts are never written in the same batch
+    assert writer.stats()["batches"] == 2
@@ -0,0 +1,84 @@
+"""
+Idempotency-Key: a retry replays the stored outcome (including a 4xx) without
+running the route again, concurrent retries create one row, and reusing a
+key for a different request is a 422.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import uuid
+import pytest
+from fastapi.testclient import TestClient
+from app import ratelimit
+from app.database import SessionLocal
+from app.main import app
+from app.models.leaves import Leave
+from app.models.timesheet import Timesheet
+
+LEAVE = {"user_id": "idem", "email": "idem@example.com", "start_date": "2024-05-06", "end_date": "2024-05-08",
+         "leave_type": "Vacation", "reason": "Trip"}
+TIMESHEET = {"user_id": "idem", "email": "idem@example.com", "date": "2024-05-06", "from_time": "09:00:00",
+             "to_time": "11:00:00", "task_summary": "Coding", "description": "Coding"}
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_ENABLED", False)
+    with SessionLocal() as db:
+        db.query(Leave).filter(Leave.user_id == "idem").delete()
+        db.query(Timesheet).filter(Timesheet.user_id == "idem").delete()
+        db.commit()
+    return TestClient(app)
+
+def key():
+    return {"Idempotency-Key": uuid.uuid4().hex}
+
+def leave_count():
+    with SessionLocal() as db:
+        return db.query(Leave).filter(Leave.user_id == "idem").count()
+
+def test_retry_replays_the_first_response(client):
+    headers = key()
+    first = client.post("/leaves/", json=LEAVE, headers=headers)
+    retry = client.post("/leaves/", json=LEAVE, headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert "idempotent-replayed" not in first.headers
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert leave_count() == 1
+
+    # Without a key the same body is a new request
+    assert client.post("/leaves/", json=LEAVE).status_code == 200
+    assert leave_count() == 2
+
+def test_concurrent_retries_create_one_row(client):
+    headers = key()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        responses = list(executor.map(lambda _: client.post("/leaves/", json=LEAVE, headers=headers), range(4)))
+
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.json()["id"] for response in responses}) == 1
+    assert leave_count() == 1
+
+def test_reusing_a_key_for_a_different_request_is_rejected(client):
+    headers = key()
+    assert client.post("/leaves/", json=LEAVE, headers=headers).status_code == 200
+    response = client.post("/leaves/", json=dict(LEAVE, reason="Something else"), headers=headers)
+
+    assert response.status_code == 422
+    assert "different request" in response.json()["detail"]
+    assert leave_count() == 1
+
+def test_client_errors_are_replayed_too(client):
+    first = client.post("/timesheets/", json=TIMESHEET)
+    assert first.status_code == 200
+    overlapping = dict(TIMESHEET, from_time="10:00:00", to_time="12:00:00")
+    headers = key()
+    assert client.post("/timesheets/", json=overlapping, headers=headers).status_code == 409
+
+    # The conflict is gone, but the retry still gets the outcome of the first attempt
+    with SessionLocal() as db:
+        db.query(Timesheet).filter(Timesheet.id == first.json()["id"]).delete()
+        db.commit()
+    retry = client.post("/timesheets/", json=overlapping, headers=headers)
+    assert retry.status_code == 409
+    assert retry.headers["idempotent-replayed"] == "true"
@@ -0,0 +1,154 @@
+"""
+Outbox dispatcher against the in-process SMTP sink: batching, connection
+reuse, per-domain limits, retry with backoff and dropped connections.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import smtplib
+import pytest
+from app import outbox
+from app.database import Base, SessionLocal, engine
+from app.models.emails import Email
+from app.outbox import FAILED, QUEUED, SENT, DomainRateLimiter, SMTPPool, dispatch_batch
+from app.smtp_sink import LocalSMTPSink
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    session.query(Email).delete()
+    session.commit()
+    yield session
+    session.close()
+
+@pytest.fixture
+def sink():
+    sink = LocalSMTPSink(port=0).start()
+    yield sink
+    sink.stop()
+
+@pytest.fixture
+def pool(sink):
+    pool = SMTPPool(sink.host, sink.port, size=2, user=None, password=None, starttls=False)
+    yield pool
+    pool.close()
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        yield executor
+
+def queue_emails(db, *recipients):
+    rows = [
+        Email(user_id="u1", email=recipient, subject=f"Hello {i}", message="Body",
+              type="outgoing", status="Unread", delivery_status=QUEUED)
+        for i, recipient in enumerate(recipients)
+    ]
+    db.add_all(rows)
+    db.commit()
+    return [row.id for row in rows]
+
+def load(db, ids):
+    db.expire_all()
+    return [db.get(Email, row_id) for row_id in ids]
+
+def unlimited():
+    return DomainRateLimiter(rate=0)
+
+def test_batch_sends_every_due_email(db, sink, pool, executor):
+    ids = queue_emails(db, *[f"user{i}@a.example" for i in range(5)])
+
+    assert dispatch_batch(db, pool, unlimited(), executor) == {SENT: 5}
+
+    assert sorted(message["to"][0] for message in sink.messages) == [f"<user{i}@a.example>" for i in range(5)]
+    for row in load(db, ids):
+        assert row.delivery_status == SENT
+        assert row.delivery_attempts == 1
+        assert row.sent_at is not None
+    assert dispatch_batch(db, pool, unlimited(), executor) == {}
+
+def test_batch_size_caps_each_claim(db, sink, pool, executor):
+    ids = queue_emails(db, *[f"user{i}@a.example" for i in range(5)])
+
+    assert dispatch_batch(db, pool, unlimited(), executor, batch_size=2) == {SENT: 2}
+    assert [row.delivery_status for row in load(db, ids)] == [SENT, SENT, QUEUED, QUEUED, QUEUED]
+    assert dispatch_batch(db, pool, unlimited(), executor, batch_size=10) == {SENT: 3}
+
+def test_connections_are_reused_across_batches(db, sink, pool, executor):
+    queue_emails(db, *[f"user{i}@a.example" for i in range(12)])
+
+    for _ in range(4):
+        assert dispatch_batch(db, pool, unlimited(), executor, batch_size=3) == {SENT: 3}
+
+    assert len(sink.messages) == 12
+    assert sink.connections <= pool.size
+
+def test_domain_rate_limit_requeues_without_using_an_attempt(db, sink, pool, executor):
+    slow = queue_emails(db, *[f"user{i}@slow.example" for i in range(4)])
+    other = queue_emails(db, "someone@other.example")
+
+    counts = dispatch_batch(db, pool, DomainRateLimiter(rate=1, burst=2), executor)
+
+    assert counts == {SENT: 3, QUEUED: 2}
+    statuses = [row.delivery_status for row in load(db, slow)]
+    assert statuses.count(SENT) == 2
+    for row in load(db, slow):
+        if row.delivery_status == QUEUED:
+            assert not row.delivery_attempts
+            assert row.next_attempt_at > datetime.utcnow()
+    assert load(db, other)[0].delivery_status == SENT
+
+def test_rejected_recipient_backs_off_exponentially_then_fails(db, sink, pool, executor, monkeypatch):
+    monkeypatch.setattr(outbox, "OUTBOX_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(outbox, "OUTBOX_RETRY_BASE_SECONDS", 30)
+    sink.rejected_domains.add("bounce.example")
+    ids = queue_emails(db, "nobody@bounce.example")
+
+    for attempt, delay in ((1, 30), (2, 60)):
+        started = datetime.utcnow()
+        assert dispatch_batch(db, pool, unlimited(), executor) == {QUEUED: 1}
+        row = load(db, ids)[0]
+        assert row.delivery_attempts == attempt
+        assert "No such user" in row.last_error
+        assert timedelta(seconds=delay - 1) < row.next_attempt_at - started < timedelta(seconds=delay + 5)
+        # Not due yet
+        assert dispatch_batch(db, pool, unlimited(), executor) == {}
+        row.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+
+    assert dispatch_batch(db, pool, unlimited(), executor) == {FAILED: 1}
+    row = load(db, ids)[0]
+    assert row.delivery_attempts == 3
+    assert sink.messages == []
+    # The refused recipient did not cost the connection
+    assert sink.connections == 1
+
+def test_dropped_idle_connection_is_replaced_without_using_an_attempt(db, sink, pool, executor):
+    queue_emails(db, "first@a.example")
+    assert dispatch_batch(db, pool, unlimited(), executor) == {SENT: 1}
+
+    sink.drop_connections()
+    ids = queue_emails(db, "second@a.example")
+
+    assert dispatch_batch(db, pool, unlimited(), executor) == {SENT: 1}
+    row = load(db, ids)[0]
+    assert row.delivery_attempts == 1
+    assert row.last_error is None
+    assert sink.connections == 2
+    assert len(sink.messages) == 2
+
+def test_failed_reset_after_rejection_gives_the_connection_back(db, sink, pool, executor, monkeypatch):
+    sink.rejected_domains.add("bounce.example")
+    queue_emails(db, "nobody@bounce.example")
+
+    def reset_fails(conn):
+        raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+    monkeypatch.setattr(smtplib.SMTP, "rset", reset_fails)
+    assert dispatch_batch(db, pool, unlimited(), executor) == {QUEUED: 1}
+    assert pool.opened == 0 and pool.idle.empty()
+
+    monkeypatch.undo()
+    queue_emails(db, "someone@a.example")
+    assert dispatch_batch(db, pool, unlimited(), executor) == {SENT: 1}
+    assert sink.connections == 2
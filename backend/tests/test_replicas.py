@@ -0,0 +1,76 @@
+"""
+Replica routing: reads go to healthy replicas, writes to the primary, and a
+client that just wrote reads from the primary (and past the response cache)
+until READ_YOUR_WRITES_SECONDS have passed.
+"""
+
+import os
+import tempfile
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+from app.cache import cached, response_cache
+from app.database import SessionLocal
+from app.replicas import ReplicaRouter
+
+def request(method="GET", ip="10.0.0.1"):
+    return Request({"type": "http", "method": method, "path": "/timesheets/", "headers": [],
+                    "query_string": b"", "client": (ip, 50000)})
+
+@pytest.fixture
+def engines():
+    folder = tempfile.mkdtemp(prefix="replicas-")
+    primary, replica = (create_engine("sqlite:///" + os.path.join(folder, name)) for name in ("primary.db", "replica.db"))
+    yield primary, replica
+    primary.dispose()
+    replica.dispose()
+
+@pytest.fixture
+def router(engines):
+    primary, replica = engines
+    return ReplicaRouter(primary, [replica], sticky_seconds=60)
+
+def test_reads_go_to_the_replica_and_writes_to_the_primary(router, engines):
+    primary, replica = engines
+    assert router.route(request("GET")) == (replica, False)
+    assert router.route(request("HEAD")) == (replica, False)
+    assert router.route(request("POST", ip="10.0.0.9")) == (primary, False)
+
+def test_client_reads_its_own_writes_from_the_primary(router, engines):
+    primary, replica = engines
+    write = request("POST")
+    router.route(write)
+    router.after_request(write)
+
+    assert router.route(request("GET")) == (primary, True)
+    # Other clients keep reading from the replica
+    assert router.route(request("GET", ip="10.0.0.2")) == (replica, False)
+
+    router.sticky_seconds = 0
+    assert router.route(request("GET")) == (replica, False)
+
+def test_unhealthy_replica_falls_back_to_the_primary(router, engines):
+    primary, replica = engines
+    router.healthy[id(replica)] = False
+    assert router.route(request("GET")) == (primary, False)
+
+    router.check_all()
+    assert router.healthy[id(replica)]
+    assert router.route(request("GET")) == (replica, False)
+
+def test_pinned_reads_bypass_the_response_cache():
+    response_cache.clear()
+    calls = []
+
+    @cached("things")
+    def list_things(db: Session = None):
+        calls.append(1)
+        return {"call": len(calls)}
+
+    with SessionLocal() as db:
+        assert list_things(db=db).body == b'{"call":1}'
+        assert list_things(db=db).body == b'{"call":1}'
+    with SessionLocal(info={"read_your_writes": True}) as pinned:
+        assert list_things(db=pinned).body == b'{"call":2}'
+    response_cache.clear()
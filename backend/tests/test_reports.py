@@ -0,0 +1,72 @@
+"""
+Detailed reports: following next_cursor visits every row once, in group
+then row order, even when pages end inside a group.
+"""
+
+from datetime import date, time, timedelta
+import pytest
+from fastapi import HTTPException
+from app import reports
+from app.database import Base, SessionLocal, engine
+from app.models.timesheet import Timesheet
+from app.reports import report_page
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    session.query(Timesheet).delete()
+    # Uneven groups, with several rows on the same date
+    for user, entries in (("alice", 7), ("bob", 1), ("carol", 4)):
+        for i in range(entries):
+            session.add(Timesheet(
+                user_id=user, email=f"{user}@example.com", date=date(2024, 3, 1) + timedelta(days=i // 2),
+                from_time=time(9), to_time=time(10), task_summary="Work", hours=1,
+                description="Work", submitted=i % 2 == 0,
+            ))
+    session.commit()
+    yield session
+    session.close()
+
+def walk(db, limit):
+    pages, cursor = [], None
+    while True:
+        page = report_page(db, "timesheets", cursor, limit)
+        pages.append(page)
+        cursor = page.next_cursor
+        if cursor is None:
+            return pages
+
+def expected(db):
+    rows = db.query(Timesheet).order_by(Timesheet.user_id, Timesheet.date.desc(), Timesheet.id.desc()).all()
+    return [(row.user_id, row.id) for row in rows]
+
+@pytest.mark.parametrize("limit", [1, 3, 5, 100])
+def test_pages_cover_every_row_once(db, limit):
+    pages = walk(db, limit)
+    seen = [(group.key, item["id"]) for page in pages for group in page.groups for item in group.items]
+    assert seen == expected(db)
+    assert all(sum(len(group.items) for group in page.groups) <= limit for page in pages)
+
+def test_page_continues_inside_a_group(db):
+    first = report_page(db, "timesheets", None, 3)
+    assert [group.key for group in first.groups] == ["alice"]
+    assert first.groups[0].count == 7 and first.groups[0].totals == {"hours": 7, "pending": 3}
+
+    second = report_page(db, "timesheets", first.next_cursor, 3)
+    assert second.groups[0].key == "alice" and second.groups[0].continued
+
+    # Resuming after the first row of a page skips only that row
+    resumed = report_page(db, "timesheets", first.groups[0].item_cursors[0], 3)
+    assert [item["id"] for item in resumed.groups[0].items] == [item["id"] for item in first.groups[0].items[1:]] + [second.groups[0].items[0]["id"]]
+
+def test_page_bytes_cap(db, monkeypatch):
+    monkeypatch.setattr(reports, "MAX_PAGE_BYTES", 1)
+    pages = walk(db, 100)
+    assert len(pages) == len(expected(db))
+    assert all(len(page.groups) == 1 and len(page.groups[0].items) == 1 for page in pages)
+
+def test_invalid_cursor(db):
+    with pytest.raises(HTTPException) as error:
+        report_page(db, "timesheets", "bm90IGEgY3Vyc29y", 3)
+    assert error.value.status_code == 400
@@ -0,0 +1,73 @@
+"""
+Full-text search over emails and tasks: stemmed matches, the index following
+inserts, updates and deletes, per-user filtering, merged pagination, and
+user input that cannot break the query syntax.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from app import ratelimit
+from app.database import Base, SessionLocal, engine
+from app.models.emails import Email
+from app.models.tasks import Task
+from app.search import ensure_search_index, search
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    session = SessionLocal()
+    session.query(Email).delete()
+    session.query(Task).delete()
+    session.add_all([
+        Email(user_id="alice", email="alice@example.com", subject="Invoice for March",
+              message="Please find the invoice attached.", type="outgoing", status="Unread"),
+        Email(user_id="bob", email="bob@example.com", subject="Lunch",
+              message="Are we still on for lunch? Bring the invoices.", type="outgoing", status="Unread"),
+        Task(user_id="alice", title="Send invoices", description="Monthly billing run", priority="High"),
+        Task(user_id="bob", title="Release notes", description="Write up the changes", priority="Low"),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+def found(hits):
+    return sorted((hit["kind"], hit["title"]) for hit in hits)
+
+def test_stemmed_matches_across_kinds(db):
+    hits = search(db, "invoice", ["emails", "tasks"])
+    assert found(hits) == [("emails", "Invoice for March"), ("emails", "Lunch"), ("tasks", "Send invoices")]
+    assert [hit["rank"] for hit in hits] == sorted((hit["rank"] for hit in hits), reverse=True)
+    assert all("[" in hit["snippet"] for hit in hits if hit["title"] == "Lunch")
+
+def test_terms_are_anded_and_filtered_by_user(db):
+    assert found(search(db, "invoice attached", ["emails"])) == [("emails", "Invoice for March")]
+    assert found(search(db, "invoice", ["emails", "tasks"], user_id="bob")) == [("emails", "Lunch")]
+
+def test_index_follows_updates_and_deletes(db):
+    task = db.query(Task).filter(Task.title == "Release notes").one()
+    task.description = "Changelog and invoice summary"
+    db.commit()
+    assert ("tasks", "Release notes") in found(search(db, "invoice", ["tasks"]))
+
+    db.delete(task)
+    db.commit()
+    assert found(search(db, "changelog", ["tasks"])) == []
+
+def test_pagination_after_merging(db):
+    everything = search(db, "invoice", ["emails", "tasks"])
+    pages = search(db, "invoice", ["emails", "tasks"], limit=2) + search(db, "invoice", ["emails", "tasks"], limit=2, offset=2)
+    assert [(hit["kind"], hit["id"]) for hit in pages] == [(hit["kind"], hit["id"]) for hit in everything]
+
+@pytest.mark.parametrize("q", ['"', "invoice OR", "NEAR(invoice", "title:invoice", "*", "-invoice"])
+def test_query_syntax_in_user_input_is_harmless(db, q):
+    search(db, q, ["emails", "tasks"])
+
+def test_route_rejects_unknown_kinds(db, monkeypatch):
+    from app.main import app
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_ENABLED", False)
+    client = TestClient(app)
+    response = client.get("/search/", params={"q": "invoice", "kind": "calendar"})
+    assert response.status_code == 400
+    hits = client.get("/search/", params={"q": "invoice", "kind": "tasks", "user_id": "alice"}).json()
+    assert [hit["title"] for hit in hits] == ["Send invoices"]
@@ -0,0 +1,134 @@
+"""
+Shard placement and id allocation: the hash ring spreads users evenly and
+an appended shard only takes users over, find_shard locates rows, each
+shard hands out ids in its own residue class modulo SHARD_ID_STRIDE, and
+restarting never hands out an id twice.
+
+Runs against SQLite; set TEST_POSTGRES_URL to an empty scratch database to
+run the Postgres sequence path too.
+"""
+
+import os
+import tempfile
+import pytest
+from collections import Counter
+from datetime import date, time
+from sqlalchemy import create_engine, text
+from app import sharding
+from app.database import Base, SessionLocal
+from app.models.timesheet import Timesheet
+from app.sharding import SHARD_ID_STRIDE, SHARDED_TABLES, HashRing, _ensure_id_sequences, find_shard
+
+BACKENDS = ["sqlite"] + (["postgresql"] if os.getenv("TEST_POSTGRES_URL") else [])
+SHARD = 1
+
+@pytest.fixture(params=BACKENDS)
+def shard(request):
+    if request.param == "sqlite":
+        bind = create_engine("sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="shard-"), "shard.db"))
+        id_column = "id INTEGER PRIMARY KEY"
+    else:
+        bind = create_engine(os.environ["TEST_POSTGRES_URL"])
+        id_column = "id SERIAL PRIMARY KEY"
+    with bind.begin() as conn:
+        for table in SHARDED_TABLES:
+            conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+            conn.execute(text(f"CREATE TABLE {table} ({id_column})"))
+    yield bind
+    bind.dispose()
+
+def next_id(bind, table):
+    """The id the shard hands to its next new row, as the app takes it."""
+    with bind.begin() as conn:
+        if bind.dialect.name == "postgresql":
+            new_id = conn.execute(text(f"SELECT nextval('{table}_id_seq')")).scalar()
+        else:
+            new_id = conn.execute(
+                text("UPDATE shard_id_sequences SET value = value + :n WHERE name = :name RETURNING value"),
+                {"n": SHARD_ID_STRIDE, "name": table},
+            ).scalar()
+        conn.execute(text(f"INSERT INTO {table} (id) VALUES ({new_id})"))
+    return new_id
+
+def ids_in_residue(*multiples):
+    return [m * SHARD_ID_STRIDE + SHARD + 1 for m in multiples]
+
+def test_ids_continue_after_existing_rows(shard):
+    with shard.begin() as conn:
+        # The shard's own rows, plus one moved in from shard 0 by a rebalance
+        for row_id in ids_in_residue(0, 1, 2) + [3 * SHARD_ID_STRIDE + 1]:
+            conn.execute(text(f"INSERT INTO emails (id) VALUES ({row_id})"))
+
+    _ensure_id_sequences(shard, SHARD)
+    _ensure_id_sequences(shard, SHARD)
+
+    assert [next_id(shard, "emails") for _ in range(2)] == ids_in_residue(3, 4)
+    assert next_id(shard, "timesheets") == ids_in_residue(0)[0]
+
+def test_restart_never_reissues_ids(shard):
+    _ensure_id_sequences(shard, SHARD)
+    issued = [next_id(shard, "emails") for _ in range(3)]
+    assert issued == ids_in_residue(0, 1, 2)
+
+    # Archiving moved the newest rows away, so MAX(id) is now below them
+    with shard.begin() as conn:
+        conn.execute(text(f"DELETE FROM emails WHERE id > {issued[0]}"))
+    _ensure_id_sequences(shard, SHARD)
+    _ensure_id_sequences(shard, SHARD)
+
+    assert next_id(shard, "emails") == ids_in_residue(3)[0]
+
+USERS = [f"user{i}" for i in range(10_000)]
+
+def test_ring_spreads_users_evenly_and_stably():
+    nodes = [f"shard{i}" for i in range(4)]
+    ring = HashRing(nodes)
+    placement = {user: ring.node_for(user) for user in USERS}
+
+    counts = Counter(placement.values())
+    assert set(counts) == set(nodes)
+    assert all(0.18 < count / len(USERS) < 0.32 for count in counts.values())
+    # Placement depends only on the node names, not on the process
+    assert all(HashRing(nodes).node_for(user) == node for user, node in list(placement.items())[:100])
+
+def test_appended_shard_only_takes_users_over():
+    before = HashRing([f"shard{i}" for i in range(4)])
+    after = HashRing([f"shard{i}" for i in range(5)])
+    moved = [user for user in USERS if before.node_for(user) != after.node_for(user)]
+
+    assert all(after.node_for(user) == "shard4" for user in moved)
+    assert 0.12 < len(moved) / len(USERS) < 0.28
+
+@pytest.fixture
+def two_shards(monkeypatch):
+    folder = tempfile.mkdtemp(prefix="shards-")
+    engines = [create_engine("sqlite:///" + os.path.join(folder, f"shard{i}.db")) for i in range(2)]
+    for bind in engines:
+        Base.metadata.create_all(bind=bind, tables=[Timesheet.__table__])
+    monkeypatch.setattr(sharding, "SHARDED", True)
+    monkeypatch.setattr(sharding, "shard_engines", engines)
+    yield engines
+    for bind in engines:
+        bind.dispose()
+
+def add_timesheet(bind, row_id):
+    with SessionLocal(bind=bind) as db:
+        db.add(Timesheet(id=row_id, user_id="u1", email="u1@example.com", date=date(2024, 3, 1),
+                         from_time=time(9), to_time=time(10), task_summary="Work", hours=1, description="Work"))
+        db.commit()
+
+def test_find_shard_locates_rows(two_shards):
+    first, second = two_shards
+    add_timesheet(first, 1)              # allocated by shard 0
+    add_timesheet(second, 2)             # allocated by shard 1
+    add_timesheet(second, SHARD_ID_STRIDE + 1)  # allocated by shard 0, then moved
+
+    with SessionLocal(bind=first) as db:
+        try:
+            assert find_shard(db, Timesheet, 1) is db
+            assert find_shard(db, Timesheet, 2).get_bind() is second
+            assert find_shard(db, Timesheet, SHARD_ID_STRIDE + 1).get_bind() is second
+            # Not found anywhere: the request session, which then answers 404
+            assert find_shard(db, Timesheet, 999) is db
+        finally:
+            sharding.close_shard_sessions(db)
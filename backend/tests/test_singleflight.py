@@ -0,0 +1,57 @@
+"""
+Single-flight: identical concurrent calls run once and share the result or
+the error; nothing is remembered once the call is over.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+from app.singleflight import SingleFlight
+
+def run_together(flight, key, fn, callers=5):
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        # Long enough for the other callers to join
+        time.sleep(0.2)
+        return fn()
+
+    with ThreadPoolExecutor(max_workers=callers) as executor:
+        leader = executor.submit(flight.do, key, slow)
+        started.wait()
+        followers = [executor.submit(flight.do, key, slow) for _ in range(callers - 1)]
+        return [future.exception() or future.result() for future in [leader, *followers]]
+
+def test_concurrent_calls_share_one_execution():
+    flight, calls = SingleFlight(), []
+    results = run_together(flight, "k", lambda: calls.append(1) or {"rows": len(calls)})
+
+    assert calls == [1]
+    assert results == [{"rows": 1}] * 5
+    # Every caller gets the very same object
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {"executed": 1, "coalesced": 4, "in_flight": 0}
+
+def test_error_is_shared_and_not_remembered():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("database down")
+    results = run_together(flight, "k", fail)
+    assert all(isinstance(result, ValueError) for result in results)
+
+    assert flight.do("k", lambda: "recovered") == "recovered"
+    assert flight.stats()["executed"] == 2
+
+def test_different_keys_and_later_calls_run_again():
+    flight, calls = SingleFlight(), []
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(flight.do, key, lambda key=key: calls.append(key) or time.sleep(0.1))
+                   for key in ("a", "b")]
+        for future in futures:
+            future.result()
+    flight.do("a", lambda: calls.append("a again"))
+
+    assert sorted(calls) == ["a", "a again", "b"]
+    assert flight.stats()["coalesced"] == 0
@@ -0,0 +1,60 @@
+"""
+Statement timeouts and cancellation: a session with statement_timeout_ms
+aborts long statements, cancel_session() aborts one from another thread,
+and sessions without a timeout are not limited.
+
+Runs against SQLite; set TEST_POSTGRES_URL to run against Postgres too.
+"""
+
+import os
+import threading
+import time
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from app.database import SessionLocal, cancel_session, engine
+
+BACKENDS = ["sqlite"] + (["postgresql"] if os.getenv("TEST_POSTGRES_URL") else [])
+
+@pytest.fixture(params=BACKENDS)
+def bind(request):
+    if request.param == "sqlite":
+        yield engine
+    else:
+        pg = create_engine(os.environ["TEST_POSTGRES_URL"])
+        yield pg
+        pg.dispose()
+
+def slow_query(bind, seconds):
+    if bind.dialect.name == "postgresql":
+        return text(f"SELECT pg_sleep({seconds})")
+    # Counting rows of an unbounded recursive CTE up to a limit keeps SQLite busy
+    return text(f"WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) "
+                f"SELECT count(*) FROM (SELECT x FROM c LIMIT {int(seconds * 5_000_000)})")
+
+def test_statement_timeout_aborts_long_statements(bind):
+    with SessionLocal(bind=bind, info={"statement_timeout_ms": 100}) as db:
+        started = time.monotonic()
+        with pytest.raises(OperationalError):
+            db.execute(slow_query(bind, 5))
+        assert time.monotonic() - started < 2
+        db.rollback()
+        # The session is usable again afterwards
+        assert db.execute(text("SELECT 1")).scalar() == 1
+
+def test_sessions_without_timeout_are_not_limited(bind):
+    with SessionLocal(bind=bind) as db:
+        db.execute(slow_query(bind, 0.3))
+
+def test_cancel_session_from_another_thread(bind):
+    with SessionLocal(bind=bind) as db:
+        timer = threading.Timer(0.2, cancel_session, [db])
+        timer.start()
+        started = time.monotonic()
+        try:
+            with pytest.raises(OperationalError):
+                db.execute(slow_query(bind, 5))
+        finally:
+            timer.cancel()
+        assert time.monotonic() - started < 2
+        assert db.info["cancelled"]
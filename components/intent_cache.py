@@ -0,0 +1,291 @@
+# Intent and entity cache for repeated utterances.
+#
+# Much of the traffic is the same canned phrases ("show my timesheets",
+# "submit my pending timesheets", "show all data"), and each of them used to
+# go through featurization and DIET inference. Two pipeline components
+# (config.yml) short-circuit that:
+#
+#   IntentCache           placed first; normalizes the text (case, spacing,
+#                         surrounding punctuation) and looks it up in a bounded
+#                         LRU. On a hit it sets intent, intent ranking and
+#                         entities and marks the message as served.
+#   CachedDIETClassifier  DIETClassifier that skips served messages, so only
+#                         novel utterances reach the neural classifier. Its
+#                         predictions go back into the cache when the intent and
+#                         every entity are at least `confidence_threshold`.
+#
+# The tokenizer and the sparse featurizers between the two still run for
+# every message; they are cheap next to DIET inference and the graph offers
+# no way to skip a node per message.
+#
+# At training time IntentCache is seeded with the annotated examples of
+# data/nlu.yml (texts annotated with two different intents are left out); the
+# seed is stored in the model and loaded with it, so a new model starts with
+# a fresh cache. Cached entities keep only their text span and are located in
+# the new message again, so their offsets are always correct; if a span can't
+# be found the message goes to DIET like any other.
+#
+# Hit rate, entries and evictions are logged every `log_every` lookups and
+# returned by stats().
+
+import logging
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Text, Tuple
+
+from rasa.engine.graph import ExecutionContext, GraphComponent
+from rasa.engine.recipes.default_recipe import DefaultV1Recipe
+from rasa.engine.storage.resource import Resource
+from rasa.engine.storage.storage import ModelStorage
+from rasa.nlu.classifiers.diet_classifier import DIETClassifier
+from rasa.nlu.constants import ENTITY_ATTRIBUTE_CONFIDENCE_TYPE
+from rasa.shared.nlu.constants import (
+    ENTITIES,
+    ENTITY_ATTRIBUTE_END,
+    ENTITY_ATTRIBUTE_GROUP,
+    ENTITY_ATTRIBUTE_ROLE,
+    ENTITY_ATTRIBUTE_START,
+    ENTITY_ATTRIBUTE_TYPE,
+    ENTITY_ATTRIBUTE_VALUE,
+    EXTRACTOR,
+    INTENT,
+    INTENT_NAME_KEY,
+    INTENT_RANKING_KEY,
+    PREDICTED_CONFIDENCE_KEY,
+    TEXT,
+)
+from rasa.shared.nlu.training_data.message import Message
+from rasa.shared.nlu.training_data.training_data import TrainingData
+import rasa.shared.utils.io
+
+logger = logging.getLogger(__name__)
+
+# Set on messages answered from the cache
+CACHE_HIT = "intent_cache_hit"
+SEED_FILE = "intent_cache_seed.json"
+
+_caches: Dict[Text, "IntentLRU"] = {}
+
+
+def normalize(text: Text) -> Text:
+    """Cache key for an utterance: "Show my  Timesheets!" -> "show my timesheets"."""
+    text = unicodedata.normalize("NFKC", text).replace("’", "'").lower()
+    return re.sub(r"\s+", " ", text).strip(" \t\n.,!?;")
+
+
+def stats(name: Text = "default") -> Dict[Text, Any]:
+    cache = _caches.get(name)
+    return cache.stats() if cache else {}
+
+
+class IntentLRU:
+    """normalized text -> (intent, confidence, entities), bounded by entry count."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Text, Tuple[Text, float, List[Dict[Text, Any]]]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def get(self, key: Text) -> Optional[Tuple[Text, float, List[Dict[Text, Any]]]]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def miss(self):
+        # A hit whose entities could not be placed in the message
+        with self.lock:
+            self.hits -= 1
+            self.misses += 1
+
+    def seed(self, examples: List[List[Any]]):
+        with self.lock:
+            for key, intent, spans in examples[-self.max_entries:]:
+                self.entries[key] = (intent, 1.0, spans)
+
+    def set(self, key: Text, intent: Text, confidence: float, entities: List[Dict[Text, Any]]):
+        with self.lock:
+            self.entries[key] = (intent, confidence, entities)
+            self.entries.move_to_end(key)
+            self.stores += 1
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[Text, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
+
+
+def _spans(text: Text, entities: List[Dict[Text, Any]]) -> List[Dict[Text, Any]]:
+    """Entities reduced to what can be placed in another spelling of the text."""
+    spans = []
+    for entity in sorted(entities, key=lambda e: e[ENTITY_ATTRIBUTE_START]):
+        span = {ENTITY_ATTRIBUTE_TYPE: entity[ENTITY_ATTRIBUTE_TYPE],
+                TEXT: text[entity[ENTITY_ATTRIBUTE_START]:entity[ENTITY_ATTRIBUTE_END]]}
+        for key in (ENTITY_ATTRIBUTE_ROLE, ENTITY_ATTRIBUTE_GROUP):
+            if entity.get(key) is not None:
+                span[key] = entity[key]
+        spans.append(span)
+    return spans
+
+
+def _place(text: Text, spans: List[Dict[Text, Any]]) -> Optional[List[Dict[Text, Any]]]:
+    """Locate the cached spans in `text`, left to right; None if one is missing."""
+    entities, position, lowered = [], 0, text.lower()
+    for span in spans:
+        start = lowered.find(span[TEXT].lower(), position)
+        if start < 0:
+            return None
+        end = start + len(span[TEXT])
+        entity = {ENTITY_ATTRIBUTE_TYPE: span[ENTITY_ATTRIBUTE_TYPE], ENTITY_ATTRIBUTE_START: start,
+                  ENTITY_ATTRIBUTE_END: end, ENTITY_ATTRIBUTE_VALUE: text[start:end],
+                  EXTRACTOR: IntentCache.__name__}
+        for key in (ENTITY_ATTRIBUTE_ROLE, ENTITY_ATTRIBUTE_GROUP):
+            if key in span:
+                entity[key] = span[key]
+        entities.append(entity)
+        position = end
+    return entities
+
+
+@DefaultV1Recipe.register(
+    [DefaultV1Recipe.ComponentType.INTENT_CLASSIFIER, DefaultV1Recipe.ComponentType.ENTITY_EXTRACTOR],
+    is_trainable=True,
+)
+class IntentCache(GraphComponent):
+    """Serves intents and entities of known utterances from an LRU."""
+
+    @staticmethod
+    def get_default_config() -> Dict[Text, Any]:
+        return {
+            # Shared with the CachedDIETClassifier that fills the cache
+            "cache": "default",
+            "max_entries": 5000,
+            "log_every": 1000,
+        }
+
+    def __init__(self, config: Dict[Text, Any], model_storage: ModelStorage, resource: Resource,
+                 seed: Optional[List[List[Any]]] = None):
+        self._config = config
+        self._model_storage = model_storage
+        self._resource = resource
+        self._seed = seed or []
+        self._lookups = 0
+        self._cache = IntentLRU(config["max_entries"])
+        self._cache.seed(self._seed)
+        _caches[config["cache"]] = self._cache
+
+    @classmethod
+    def create(cls, config: Dict[Text, Any], model_storage: ModelStorage, resource: Resource,
+               execution_context: ExecutionContext) -> "IntentCache":
+        return cls(config, model_storage, resource)
+
+    @classmethod
+    def load(cls, config: Dict[Text, Any], model_storage: ModelStorage, resource: Resource,
+             execution_context: ExecutionContext, **kwargs: Any) -> "IntentCache":
+        try:
+            with model_storage.read_from(resource) as model_dir:
+                seed = rasa.shared.utils.io.read_json_file(model_dir / SEED_FILE)
+        except (ValueError, FileNotFoundError):
+            logger.warning("No intent cache seed in the model, starting with an empty cache")
+            seed = []
+        return cls(config, model_storage, resource, seed)
+
+    def train(self, training_data: TrainingData) -> Resource:
+        seed: Dict[Text, List[Any]] = {}
+        conflicting = set()
+        for example in training_data.intent_examples:
+            text = example.get(TEXT)
+            key = normalize(text)
+            entry = [key, example.get(INTENT), _spans(text, example.get(ENTITIES) or [])]
+            if seed.get(key, entry) != entry:
+                conflicting.add(key)
+            seed[key] = entry
+        for key in conflicting:
+            del seed[key]
+        if conflicting:
+            logger.info(f"Intent cache: {len(conflicting)} examples with conflicting annotations not seeded")
+        with self._model_storage.write_to(self._resource) as model_dir:
+            rasa.shared.utils.io.dump_obj_as_json_to_file(model_dir / SEED_FILE, list(seed.values()))
+        return self._resource
+
+    def process(self, messages: List[Message]) -> List[Message]:
+        for message in messages:
+            text = message.get(TEXT)
+            if not text:
+                continue
+            entry = self._cache.get(normalize(text))
+            if entry is not None:
+                intent, confidence, spans = entry
+                entities = _place(text, spans)
+                if entities is None:
+                    self._cache.miss()
+                else:
+                    message.set(INTENT, {INTENT_NAME_KEY: intent, PREDICTED_CONFIDENCE_KEY: confidence},
+                                add_to_output=True)
+                    message.set(INTENT_RANKING_KEY, [{INTENT_NAME_KEY: intent, PREDICTED_CONFIDENCE_KEY: confidence}],
+                                add_to_output=True)
+                    message.set(ENTITIES, message.get(ENTITIES, []) + entities, add_to_output=True)
+                    message.set(CACHE_HIT, True)
+            self._lookups += 1
+            if self._lookups % self._config["log_every"] == 0:
+                logger.info(f"Intent cache: {self._cache.stats()}")
+        return messages
+
+
+@DefaultV1Recipe.register(
+    [DefaultV1Recipe.ComponentType.INTENT_CLASSIFIER, DefaultV1Recipe.ComponentType.ENTITY_EXTRACTOR],
+    is_trainable=True,
+)
+class CachedDIETClassifier(DIETClassifier):
+    """DIETClassifier for the messages IntentCache could not answer."""
+
+    @staticmethod
+    def get_default_config() -> Dict[Text, Any]:
+        return {
+            **DIETClassifier.get_default_config(),
+            "cache": "default",
+            # Lowest intent (and entity) confidence a prediction is cached with
+            "confidence_threshold": 0.95,
+        }
+
+    def process(self, messages: List[Message]) -> List[Message]:
+        novel = [message for message in messages if not message.get(CACHE_HIT)]
+        if novel:
+            super().process(novel)
+        cache = _caches.get(self.component_config["cache"])
+        if cache is not None:
+            for message in novel:
+                self._remember(cache, message)
+        return messages
+
+    def _remember(self, cache: IntentLRU, message: Message):
+        threshold = self.component_config["confidence_threshold"]
+        intent = message.get(INTENT) or {}
+        if not intent.get(INTENT_NAME_KEY) or intent.get(PREDICTED_CONFIDENCE_KEY, 0.0) < threshold:
+            return
+        entities = [entity for entity in message.get(ENTITIES, []) if entity.get(EXTRACTOR) == self.name]
+        if any(entity.get(ENTITY_ATTRIBUTE_CONFIDENCE_TYPE, 0.0) < threshold for entity in entities):
+            return
+        text = message.get(TEXT)
+        cache.set(normalize(text), intent[INTENT_NAME_KEY], intent[PREDICTED_CONFIDENCE_KEY], _spans(text, entities))
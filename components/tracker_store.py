@@ -0,0 +1,329 @@
+# Compact SQL tracker store: bounded conversations, batched writes.
+#
+# The default in-memory store loses conversations on restart and keeps every
+# event in RAM forever; the stock SQLTrackerStore persists every event and
+# reads the whole session back on each message. This store keeps, per
+# conversation:
+#
+#   snapshot   slot values (those differing from their initial value) and the
+#              active loop, as of the oldest event still kept
+#   tail       the last `max_events` events, cut at a turn boundary
+#              (action_listen) where possible
+#
+# A tracker is rebuilt as SlotSet/ActiveLoop events for the snapshot followed
+# by the tail, so loading it costs the same after 10 or 10,000 turns. Events
+# that fall out of the tail are folded into the snapshot; a session start or
+# restart drops everything before it, as the last session is all that
+# retrieve() returns. retrieve_full_tracker() returns the same, since older
+# events are not kept.
+#
+# Writes go through an in-process LRU of `lru_size` hot conversations, which
+# is also what reads are served from. New events are buffered and written in
+# one transaction for all conversations, every `flush_interval` seconds or
+# once `batch_size` events are waiting (and at exit). flush_interval: 0
+# writes on every save. Only written conversations leave the LRU: while the
+# database is unavailable it grows past lru_size and keeps retrying. Run one Rasa server per set of conversations (sticky
+# sessions), as with the in-memory store; with several servers answering the
+# same conversation set lru_size: 0.
+#
+# endpoints.yml:
+#   tracker_store:
+#     type: components.tracker_store.CompactSQLTrackerStore
+#     url: sqlite:///rasa_trackers.db   # default TRACKER_STORE_URL, then DATABASE_URL
+#     max_events: 100
+#     lru_size: 1000
+
+import asyncio
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Text
+
+import sqlalchemy as sa
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from rasa.core.brokers.broker import EventBroker
+from rasa.core.tracker_store import SerializedTrackerAsText, TrackerStore
+from rasa.shared.core.constants import ACTION_LISTEN_NAME
+from rasa.shared.core.domain import Domain
+from rasa.shared.core.trackers import DialogueStateTracker
+
+logger = logging.getLogger(__name__)
+
+# Events that reset the conversation; nothing before the last one is needed
+RESET_EVENTS = ("session_started", "restart")
+
+Base = declarative_base()
+
+
+class CompactTrackerConversation(Base):
+    __tablename__ = "compact_tracker_conversations"
+
+    sender_id = sa.Column(sa.String(255), primary_key=True)
+    # JSON: {"slots": {...}, "active_loop": name or null, "timestamp": float}
+    snapshot = sa.Column(sa.Text, nullable=False)
+    # Sequence number of the oldest kept event and of the next one to append
+    first_seq = sa.Column(sa.Integer, nullable=False)
+    next_seq = sa.Column(sa.Integer, nullable=False)
+    updated_at = sa.Column(sa.Float, nullable=False)
+
+
+class CompactTrackerEvent(Base):
+    __tablename__ = "compact_tracker_events"
+
+    sender_id = sa.Column(sa.String(255), primary_key=True)
+    seq = sa.Column(sa.Integer, primary_key=True)
+    data = sa.Column(sa.Text, nullable=False)
+
+
+def _same(event: Dict[Text, Any], other: Dict[Text, Any]) -> bool:
+    return event.get("event") == other.get("event") and event.get("timestamp") == other.get("timestamp")
+
+
+class _Conversation:
+    def __init__(self, sender_id: Text, snapshot: Optional[Dict[Text, Any]] = None,
+                 events: Optional[List[Dict[Text, Any]]] = None, first_seq: int = 0):
+        self.sender_id = sender_id
+        self.snapshot = snapshot or {"slots": {}, "active_loop": None, "timestamp": None}
+        self.events = events or []
+        self.first_seq = first_seq
+        # Events from this sequence number on are not written yet
+        self.persisted_seq = first_seq + len(self.events)
+        # The stored tail no longer matches: delete it and write `events` again
+        self.rewrite = False
+
+    @property
+    def next_seq(self) -> int:
+        return self.first_seq + len(self.events)
+
+    @property
+    def dirty(self) -> bool:
+        return self.rewrite or self.persisted_seq < self.next_seq
+
+    def snapshot_events(self) -> List[Dict[Text, Any]]:
+        timestamp = self.snapshot["timestamp"]
+        events = [{"event": "slot", "name": name, "value": value, "timestamp": timestamp}
+                  for name, value in self.snapshot["slots"].items()]
+        if self.snapshot["active_loop"]:
+            events.append({"event": "active_loop", "name": self.snapshot["active_loop"], "timestamp": timestamp})
+        return events
+
+
+class CompactSQLTrackerStore(TrackerStore, SerializedTrackerAsText):
+    """SQL tracker store keeping a slot snapshot and the last N events."""
+
+    def __init__(
+        self,
+        domain: Optional[Domain] = None,
+        host: Optional[Text] = None,
+        event_broker: Optional[EventBroker] = None,
+        max_events: int = 100,
+        lru_size: int = 1000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        **kwargs: Dict[Text, Any],
+    ) -> None:
+        url = host or os.getenv("TRACKER_STORE_URL") or os.getenv("DATABASE_URL", "sqlite:///rasa_trackers.db")
+        connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+        self.engine = sa.create_engine(url, connect_args=connect_args, pool_pre_ping=True)
+        Base.metadata.create_all(self.engine)
+        self.sessionmaker = sessionmaker(bind=self.engine)
+        self.max_events = int(max_events)
+        self.lru_size = int(lru_size)
+        self.batch_size = int(batch_size)
+        self.flush_interval = float(flush_interval)
+        self.conversations: "OrderedDict[Text, _Conversation]" = OrderedDict()
+        self.lock = threading.RLock()
+        self._flusher: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.flushes = 0
+        atexit.register(self.flush)
+        logger.debug(f"Compact tracker store on {self.engine.url!r}")
+        super().__init__(domain, event_broker, **kwargs)
+
+    async def keys(self) -> Iterable[Text]:
+        with self.sessionmaker() as session:
+            stored = session.execute(sa.select(CompactTrackerConversation.sender_id)).scalars().all()
+        with self.lock:
+            return list(set(stored) | set(self.conversations))
+
+    async def retrieve(self, sender_id: Text) -> Optional[DialogueStateTracker]:
+        with self.lock:
+            conversation = self._conversation(sender_id)
+            if conversation is None or not conversation.events:
+                return None
+            events = conversation.snapshot_events() + conversation.events
+        return DialogueStateTracker.from_dict(sender_id, events, self.domain.slots)
+
+    async def retrieve_full_tracker(self, conversation_id: Text) -> Optional[DialogueStateTracker]:
+        return await self.retrieve(conversation_id)
+
+    async def save(self, tracker: DialogueStateTracker) -> None:
+        await self.stream_events(tracker)
+        events = [event.as_dict() for event in tracker.events]
+        with self.lock:
+            conversation = self._conversation(tracker.sender_id)
+            if conversation is None:
+                conversation = _Conversation(tracker.sender_id)
+                self._remember(conversation)
+            known = conversation.snapshot_events() + conversation.events
+            if len(events) >= len(known) and (not known or _same(events[len(known) - 1], known[-1])):
+                conversation.events.extend(events[len(known):])
+            else:
+                # Not built from what we stored (e.g. events replaced through
+                # the HTTP API): start over from this tracker
+                conversation.snapshot = _Conversation(tracker.sender_id).snapshot
+                conversation.first_seq = conversation.next_seq
+                conversation.events = events
+                conversation.rewrite = True
+            self._compact(conversation)
+            waiting = sum(conversation.next_seq - conversation.persisted_seq
+                          for conversation in self.conversations.values() if conversation.dirty)
+        if self.flush_interval <= 0 or waiting >= self.batch_size or self.lru_size <= 0:
+            self.flush()
+        else:
+            self._schedule_flush()
+
+    def _conversation(self, sender_id: Text) -> Optional[_Conversation]:
+        conversation = self.conversations.get(sender_id)
+        # Without an LRU only conversations not written yet are kept
+        if conversation is not None and (self.lru_size > 0 or conversation.dirty):
+            self.conversations.move_to_end(sender_id)
+            self.hits += 1
+            return conversation
+        self.misses += 1
+        conversation = self._load(sender_id)
+        if conversation is not None:
+            self._remember(conversation)
+        return conversation
+
+    def _remember(self, conversation: _Conversation):
+        self.conversations[conversation.sender_id] = conversation
+        limit = max(self.lru_size, 1)
+        if len(self.conversations) <= limit:
+            return
+        if any(cached.dirty for cached in self.conversations.values()):
+            self.flush()
+        # Least recently used first; a conversation the flush could not write
+        # stays until a later flush succeeds
+        evictable = [sender_id for sender_id, cached in self.conversations.items()
+                     if not cached.dirty and cached is not conversation]
+        for sender_id in evictable[:len(self.conversations) - limit]:
+            del self.conversations[sender_id]
+        if len(self.conversations) > limit:
+            logger.warning(f"{len(self.conversations) - limit} unwritten conversation(s) kept past lru_size")
+
+    def _load(self, sender_id: Text) -> Optional[_Conversation]:
+        with self.sessionmaker() as session:
+            row = session.get(CompactTrackerConversation, sender_id)
+            if row is None:
+                return None
+            # Only the tail is stored, so this reads at most max_events rows
+            data = session.execute(
+                sa.select(CompactTrackerEvent.data)
+                .where(CompactTrackerEvent.sender_id == sender_id, CompactTrackerEvent.seq >= row.first_seq)
+                .order_by(CompactTrackerEvent.seq)
+            ).scalars().all()
+        logger.debug(f"Loaded tracker '{sender_id}' with {len(data)} events")
+        return _Conversation(sender_id, json.loads(row.snapshot), [json.loads(item) for item in data], row.first_seq)
+
+    def _compact(self, conversation: _Conversation):
+        events = conversation.events
+        reset = max((i for i, event in enumerate(events) if event.get("event") in RESET_EVENTS), default=0)
+        if reset > 0:
+            conversation.snapshot = _Conversation(conversation.sender_id).snapshot
+            self._drop(conversation, reset)
+        overflow = len(conversation.events) - self.max_events
+        if overflow <= 0:
+            return
+        # Cut where a turn starts, so the tail does not begin half-way through one
+        cut = next((i for i in range(overflow, len(conversation.events))
+                    if conversation.events[i].get("event") == "action"
+                    and conversation.events[i].get("name") == ACTION_LISTEN_NAME), overflow)
+        if cut >= len(conversation.events) - 1:
+            cut = overflow
+        replay = DialogueStateTracker.from_dict(
+            conversation.sender_id, conversation.snapshot_events() + conversation.events[:cut], self.domain.slots
+        )
+        conversation.snapshot = {
+            "slots": {name: slot.value for name, slot in replay.slots.items() if slot.value != slot.initial_value},
+            "active_loop": replay.active_loop_name,
+            "timestamp": conversation.events[cut - 1].get("timestamp"),
+        }
+        self._drop(conversation, cut)
+
+    @staticmethod
+    def _drop(conversation: _Conversation, count: int):
+        conversation.events = conversation.events[count:]
+        conversation.first_seq += count
+        if conversation.persisted_seq < conversation.first_seq:
+            conversation.persisted_seq = conversation.first_seq
+
+    def _schedule_flush(self):
+        if self._flusher is not None and not self._flusher.done():
+            return
+        try:
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_later())
+        except RuntimeError:
+            self.flush()
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        self.flush()
+
+    def flush(self):
+        """Write all buffered changes in one transaction."""
+        with self.lock:
+            dirty = [conversation for conversation in self.conversations.values() if conversation.dirty]
+            if not dirty:
+                return
+            now = time.time()
+            rows, conversations = [], []
+            for conversation in dirty:
+                start = conversation.first_seq if conversation.rewrite else conversation.persisted_seq
+                rows.extend(
+                    {"sender_id": conversation.sender_id, "seq": seq, "data": json.dumps(event)}
+                    for seq, event in enumerate(conversation.events[start - conversation.first_seq:], start)
+                )
+                conversations.append({
+                    "sender_id": conversation.sender_id, "snapshot": json.dumps(conversation.snapshot),
+                    "first_seq": conversation.first_seq, "next_seq": conversation.next_seq, "updated_at": now,
+                })
+            try:
+                with self.sessionmaker() as session:
+                    for conversation in dirty:
+                        # Events that left the tail, or the whole old tail on a rewrite
+                        delete = sa.delete(CompactTrackerEvent).where(CompactTrackerEvent.sender_id == conversation.sender_id)
+                        if not conversation.rewrite:
+                            delete = delete.where(CompactTrackerEvent.seq < conversation.first_seq)
+                        session.execute(delete)
+                    session.execute(sa.delete(CompactTrackerConversation).where(
+                        CompactTrackerConversation.sender_id.in_([c.sender_id for c in dirty])))
+                    session.execute(sa.insert(CompactTrackerConversation), conversations)
+                    if rows:
+                        session.execute(sa.insert(CompactTrackerEvent), rows)
+                    session.commit()
+            except Exception as e:
+                # Kept in memory; the next flush tries again
+                logger.error(f"Error writing trackers: {e}")
+                return
+            for conversation in dirty:
+                conversation.persisted_seq = conversation.next_seq
+                conversation.rewrite = False
+            self.flushes += 1
+        logger.debug(f"Wrote {len(rows)} events of {len(dirty)} conversations")
+
+    def stats(self) -> Dict[Text, Any]:
+        with self.lock:
+            return {
+                "conversations": len(self.conversations),
+                "hits": self.hits,
+                "misses": self.misses,
+                "flushes": self.flushes,
+                "unwritten_events": sum(c.next_seq - c.persisted_seq for c in self.conversations.values()),
+            }
@@ -244,7 +244,7 @@ const AdminPanel = ({ onLogout }) => {
                         <TableRow key={leave.id}>
                           <TableCell>{leave.user_id || leave.username || 'Unknown'}</TableCell>
                           <TableCell>{leave.leave_type}</TableCell>
-                          <TableCell>{formatDate(leave.date)}</TableCell>
+                          <TableCell>{formatDate(leave.start_date)}{leave.end_date && leave.end_date !== leave.start_date ? ` - ${formatDate(leave.end_date)}` : ''}</TableCell>
                           <TableCell>{leave.reason}</TableCell>
                           <TableCell>
                             <Chip
@@ -306,7 +306,7 @@ const AdminPanel = ({ onLogout }) => {
                         <TableRow key={leave.id}>
                           <TableCell>{leave.user_id || leave.username || 'Unknown'}</TableCell>
                           <TableCell>{leave.leave_type}</TableCell>
-                          <TableCell>{formatDate(leave.date)}</TableCell>
+                          <TableCell>{formatDate(leave.start_date)}{leave.end_date && leave.end_date !== leave.start_date ? ` - ${formatDate(leave.end_date)}` : ''}</TableCell>
                           <TableCell>{leave.reason}</TableCell>
                           <TableCell>
                             <Chip